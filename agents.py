@@ -1,19 +1,31 @@
 from state import EvaluationState
-from prompts import SYNTAX_STYLE_TEMPLATE, REQUIREMENTS_TEMPlATE, VISUALIZATION_TEMPLATE
-from pydantic_objects import SyntaxStyleEvaluation, RequirementsEvaluation, VisualizationEvaluation
-import re
-import tempfile
-import subprocess
-import sys
-import os
-from langchain_openai import ChatOpenAI
-from langchain.output_parsers import PydanticOutputParser
+from pydantic_objects import SyntaxStyleEvaluation, CriterionJudgment, RequirementsEvaluation, VisualizationEvaluation, CombinedEvaluation
+from concurrency import sandbox_slot
+from sandbox import get_sandbox_pool, sandbox_limits
+from execution_cache import get_execution_cache, execution_key
+from static_analysis import analyze_code
+from static_scoring import score_syntax_style
+from duplicates import fingerprint_code
+from criterion_index import get_criterion_index, match_criteria, record_judgments
+from prompt_compaction import compact_for_agent, count_tokens
 import re
 import json
-
-syntax_style_parser = PydanticOutputParser(pydantic_object=SyntaxStyleEvaluation)
-requirements_parser = PydanticOutputParser(pydantic_object=RequirementsEvaluation)
-visualization_parser = PydanticOutputParser(pydantic_object=VisualizationEvaluation)
+import time
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from llm import invoke_llm, ainvoke_llm
+from rate_limiter import LLMUnavailableError
+from incremental import mark_fallback
+from report import SECTIONS, grade_for, unpack_feedback
+import config
+import tracing
+
+def _prompts():
+    """Returns the shared templates and parsers, importing langchain only when a prompt is first needed."""
+    import prompts
+    return prompts
 
 def extract_json_from_backticks(text):
     # Extracts content between ```json and ```
@@ -23,48 +35,24 @@ def extract_json_from_backticks(text):
     else:
         return text  # fallback: return original if not wrapped
 
+def _parses(parser_name: str):
+    """Validator for invoke_llm: a completion is only cached once the named parser accepts it."""
+    return lambda content: getattr(_prompts(), parser_name).parse(extract_json_from_backticks(content))
+
 def input_node(state: EvaluationState) -> EvaluationState:
     """Processes the initial student code submission and extracts metadata."""
     print(f"Processing submission for student: {state['student_name']}")
     
-    code = state["student_code"]
+    # Single AST pass, cached by code hash so later nodes can reuse it
+    metadata = analyze_code(state["student_code"])
     
-    # File size
-    code_size_kb = len(code) / 1024
+    code_size_kb = metadata["code_size_kb"]
     print(f"Code size: {code_size_kb:.2f} KB")
     
-    # Extract imports
-    import_pattern = r'^import\s+(\w+)|^from\s+(\w+).*import'
-    imports = set()
-    for line in code.split('\n'):
-        match = re.search(import_pattern, line)
-        if match:
-            # Get whichever group matched (import X or from X import)
-            module = match.group(1) if match.group(1) else match.group(2)
-            imports.add(module)
-    
-    # Detect visualization libraries
-    viz_libraries = {'matplotlib', 'seaborn', 'plotly', 'bokeh', 'altair', 'pygal'}
-    has_viz = bool(imports.intersection(viz_libraries))
-    
-    # Extract visualization imports specifically
-    viz_imports = list(imports.intersection(viz_libraries))
-    
-    # Count functions defined in the code
-    function_pattern = r'^def\s+(\w+)'
-    functions = []
-    for line in code.split('\n'):
-        match = re.search(function_pattern, line)
-        if match:
-            functions.append(match.group(1))
-    
-    # Count classes defined in the code
-    class_pattern = r'^class\s+(\w+)'
-    classes = []
-    for line in code.split('\n'):
-        match = re.search(class_pattern, line)
-        if match:
-            classes.append(match.group(1))
+    imports = metadata["imports"]
+    functions = metadata["functions"]
+    classes = metadata["classes"]
+    has_viz = metadata["has_visualizations"]
     
     print(f"Found {len(imports)} imports, {len(functions)} functions, and {len(classes)} classes")
     if has_viz:
@@ -73,51 +61,98 @@ def input_node(state: EvaluationState) -> EvaluationState:
     # Create a new state with all important data as top-level keys
     return {
         **state,
+        "code_metadata": metadata,
         "has_visualizations": has_viz,
-        "viz_imports": viz_imports,
+        "viz_imports": metadata["viz_imports"],
         "import_count": len(imports),
         "function_count": len(functions),
         "class_count": len(classes),
         "code_size_kb": code_size_kb
     }
 
+def fingerprint_node(state: EvaluationState) -> EvaluationState:
+    """Fingerprints the normalized code so duplicates across a cohort share their evaluations."""
+    return {"normalized_hash": fingerprint_code(state["student_code"])["normalized_hash"]}
+
+def compact_code_node(state: EvaluationState) -> EvaluationState:
+    """Builds a reduced view of the code for each agent's prompt within its token budget."""
+    code = state["student_code"]
+    tokens_before = count_tokens(code)
+    
+    agent_code = {}
+    prompt_tokens = {}
+    for agent, budget in config.PROMPT_TOKEN_BUDGETS.items():
+        agent_code[agent] = compact_for_agent(code, agent, budget)
+        prompt_tokens[agent] = {"before": tokens_before, "after": count_tokens(agent_code[agent])}
+    
+    summary = ", ".join(f"{agent} {counts['after']}" for agent, counts in prompt_tokens.items())
+    print(f"Prompt code tokens: {tokens_before} -> {summary}")
+    
+    return {
+        "agent_code": agent_code,
+        "prompt_tokens": prompt_tokens
+    }
+
+def _agent_code(state: EvaluationState, agent: str) -> str:
+    """Returns the compacted code for an agent, or the full submission if none was built."""
+    return (state.get("agent_code") or {}).get(agent, state["student_code"])
+
+def _execution_options(state: EvaluationState) -> Dict:
+    """Builds sandbox options, e.g. serving HTTP from the assignment's recorded fixtures."""
+    options = {}
+    network = state["requirements"].get("network")
+    mode = config.NETWORK_MODE or (network or {}).get("mode", "auto")
+    if network and mode != "live":
+        options["network"] = {"mode": mode, "fixtures": network["fixtures"]}
+    return options
+
+def _execution_cache_key(state: EvaluationState, path: str, options: Dict) -> Optional[str]:
+    """Returns the execution cache key, or None when the run may depend on the live network.
+
+    Only runs whose HTTP traffic is intercepted (replay or auto mode) can be
+    cached; without a network block the code may fetch anything.
+    """
+    network = options.get("network")
+    if network is None or network["mode"] == "record":
+        return None
+    return execution_key(state['student_code'], state.get('file_path'), {**options, "path": path}, sandbox_limits())
+
 def code_execution_node(state: EvaluationState) -> EvaluationState:
     """Executes the student code to check for runtime errors."""
     print(f"Executing code for {state['student_name']}...")
     
-    # Create a temporary file to execute the code
-    with tempfile.NamedTemporaryFile(suffix='.py', mode='w', delete=False) as temp_file:
-        temp_file_path = temp_file.name
-        temp_file.write(state['student_code'])
-    
     try:
-        # Execute the code with a timeout
-        result = subprocess.run(
-            [sys.executable, temp_file_path],
-            capture_output=True,
-            text=True,
-            timeout=30  # 30 second timeout
-        )
-        
-        # Check if execution was successful
-        if result.returncode == 0:
-            state['execution_result'] = {
-                'success': True,
-                'output': result.stdout,
-                'error': None
-            }
-        else:
-            state['execution_result'] = {
-                'success': False,
-                'output': result.stdout,
-                'error': result.stderr
-            }
-    except subprocess.TimeoutExpired:
-        state['execution_result'] = {
-            'success': False,
-            'output': '',
-            'error': 'Code execution timed out after 30 seconds'
-        }
+        path = state.get('file_path') or '<submission>'
+        options = _execution_options(state)
+        cache = get_execution_cache()
+        key = _execution_cache_key(state, path, options) if cache is not None else None
+        with tracing.span("sandbox", kind="sandbox") as attributes:
+            cached = cache.get(key) if key is not None else None
+            if cached is not None:
+                attributes["cache_hit"] = True
+                attributes["success"] = cached["success"]
+                state['execution_result'] = cached
+                return state
+
+            # Execute the code on a warm sandbox worker with a timeout
+            waiting = time.perf_counter()
+            with sandbox_slot():
+                attributes["queue_wait_ms"] = (time.perf_counter() - waiting) * 1000
+                result = get_sandbox_pool().run(
+                    state['student_code'],
+                    path=path,
+                    timeout=config.SANDBOX_TIMEOUT,
+                    options=options
+                )
+            resources = result.pop('resources', None)
+            attributes.update({k: v for k, v in (resources or {}).items() if v is not None})
+            attributes["success"] = result["success"]
+            state['execution_result'] = result
+
+        # Timeouts and crashed workers come back without resource usage and are not cached, nor are
+        # runs that reached the live network: a failed fetch would otherwise be replayed for weeks
+        if key is not None and resources is not None and resources.get("live_requests") == 0:
+            cache.put(key, result)
     except Exception as e:
         state['execution_result'] = {
             'success': False,
@@ -125,9 +160,6 @@ def code_execution_node(state: EvaluationState) -> EvaluationState:
             'error': str(e)
         }
     
-    # Clean up the temporary file
-    os.unlink(temp_file_path)
-    
     return state
 
 def analyze_errors(state: EvaluationState) -> EvaluationState:
@@ -149,6 +181,12 @@ def analyze_errors(state: EvaluationState) -> EvaluationState:
         analysis = "Your code attempts to access list indices or dictionary keys that don't exist."
     elif "ZeroDivisionError" in error_message:
         analysis = "Your code attempts to divide by zero."
+    elif "CPUTimeLimitExceeded" in error_message:
+        analysis = f"Your code used more than {config.SANDBOX_CPU_SECONDS} seconds of CPU time. Check for infinite loops or very slow computations."
+    elif "MemoryError" in error_message:
+        analysis = "Your code ran out of memory. Check for unbounded lists or very large data structures."
+    elif "Too many open files" in error_message:
+        analysis = "Your code opened too many files at once. Close files when you are done with them, e.g. with a `with` block."
     elif "timeout" in error_message.lower():
         analysis = "Your code took too long to execute (>30 seconds). Check for infinite loops."
     else:
@@ -162,233 +200,741 @@ def analyze_errors(state: EvaluationState) -> EvaluationState:
     
     return state
 
-def syntax_style_agent(state: EvaluationState) -> EvaluationState:
-    """Evaluates code syntax and style according to best practices."""
-    print(f"Evaluating syntax and style for {state['student_name']}...")
+def _local_scores(state: EvaluationState) -> Optional[Dict]:
+    """Static syntax/style scores, unless the LLM is configured to produce them."""
+    return score_syntax_style(state["student_code"]) if config.SYNTAX_STYLE_MODE != "llm" else None
+
+def _syntax_style_prompt(state: EvaluationState, local: Optional[Dict] = None) -> Tuple[str, str]:
+    """Renders the syntax and style prompt, or the explanation-only prompt when scores are local."""
+    if local is None:
+        return "syntax_style", _prompts().SYNTAX_STYLE_TEMPLATE.format(code=_agent_code(state, "syntax_style"))
+    
+    findings = local["syntax_findings"] + local["style_findings"]
+    return "syntax_style_explain", _prompts().SYNTAX_STYLE_EXPLAIN_TEMPLATE.format(
+        syntax_score=local["syntax_score"],
+        style_score=local["style_score"],
+        findings="\n".join(f"- {finding}" for finding in findings) or "- No issues found.",
+        code=_agent_code(state, "syntax_style")
+    )
+
+def _syntax_style_local_update(local: Dict) -> Dict:
+    """Turns static scoring results into state updates without an LLM explanation."""
+    syntax_score = local["syntax_score"]
+    style_score = local["style_score"]
+    metrics = local["metrics"]
     
-    code = state["student_code"]
+    print(f"Syntax score: {syntax_score}/60, Style score: {style_score}/40 (static analysis)")
     
-    # Initialize the LLM
-    llm = ChatOpenAI(
-        model="gpt-3.5-turbo",
-        temperature=0.1
+    if local["syntax_findings"]:
+        syntax_explanation = f"The code compiles, with {len(local['syntax_findings'])} warning(s) from the compiler."
+    else:
+        syntax_explanation = "The code compiles cleanly with no syntax errors or warnings."
+    style_explanation = (
+        f"Layout {metrics['layout']}/15 ({metrics['pep8_violations']} PEP 8 issues), "
+        f"naming {metrics['naming']}/10, comments and docstrings {metrics['documentation']}/8, "
+        f"structure {metrics['structure']}/7."
     )
     
+    return {
+        "syntax_score": syntax_score,
+        "style_score": style_score,
+        "syntax_feedback": {
+            "score": syntax_score,
+            "explanation": syntax_explanation,
+            "improvements": local["syntax_findings"]
+        },
+        "style_feedback": {
+            "score": style_score,
+            "explanation": style_explanation,
+            "improvements": local["style_findings"][:5]
+        }
+    }
+
+def _syntax_style_update(state: EvaluationState, raw_content: str, local: Optional[Dict] = None) -> Dict:
+    """Parses the syntax and style response into state updates, keeping local scores if given."""
+    clean_json_str = extract_json_from_backticks(raw_content)
+
+    # Now parse the clean JSON
+    evaluation = _prompts().syntax_style_parser.parse(clean_json_str)
+    return _syntax_style_fields(state, evaluation, local)
+
+def _syntax_style_fields(state: EvaluationState, evaluation: SyntaxStyleEvaluation, local: Optional[Dict] = None) -> Dict:
+    """Maps a syntax and style evaluation onto state updates."""
     execution_success = state["execution_result"]["success"]
     
     # Shouldn't be used now since if code fails, it goes directly to feedback
     max_syntax_score = 40 if not execution_success else 60
     
+    # Cap
+    syntax_score = min(evaluation.syntax_score, max_syntax_score)
+    style_score = evaluation.style_score
+    if local is not None:
+        syntax_score = local["syntax_score"]
+        style_score = local["style_score"]
+    
+    print(f"Syntax score: {syntax_score}/60, Style score: {style_score}/40")
+    
+    return {
+        "syntax_score": syntax_score,
+        "style_score": style_score,
+        "syntax_feedback": {
+            "score": syntax_score,
+            "explanation": evaluation.syntax_feedback,
+            "improvements": evaluation.syntax_improvements
+        },
+        "style_feedback": {
+            "score": style_score,
+            "explanation": evaluation.style_feedback,
+            "improvements": evaluation.style_improvements
+        }
+    }
+
+def _syntax_style_fallback(state: EvaluationState, error: Exception) -> Dict:
+    """Builds fallback syntax and style scores when the evaluation fails."""
+    print(f"Error in syntax_style_agent: {str(error)}")
+    mark_fallback()
+    
+    execution_success = state["execution_result"]["success"]
+    fallback_syntax_score = 30 if execution_success else 20
+    fallback_style_score = 20
+    
+    return {
+        "syntax_score": fallback_syntax_score,
+        "style_score": fallback_style_score,
+        "syntax_feedback": {
+            "score": fallback_syntax_score,
+            "explanation": "An error occurred during evaluation.",
+            "improvements": ["Review your code for syntax errors."]
+        },
+        "style_feedback": {
+            "score": fallback_style_score,
+            "explanation": "An error occurred during evaluation.",
+            "improvements": ["Review your code for style issues."]
+        }
+    }
+
+def syntax_style_agent(state: EvaluationState) -> EvaluationState:
+    """Evaluates code syntax and style according to best practices."""
+    print(f"Evaluating syntax and style for {state['student_name']}...")
+    
+    local = _local_scores(state)
+    if config.SYNTAX_STYLE_MODE == "local":
+        return _syntax_style_local_update(local)
+    
     try:
+        template_id, prompt = _syntax_style_prompt(state, local)
+        content = invoke_llm(template_id, prompt, schema=SyntaxStyleEvaluation,
+                             validate=_parses("syntax_style_parser"))
+        return _syntax_style_update(state, content, local)
+    except LLMUnavailableError:
+        if local is None:
+            raise
+        print("LLM unavailable for syntax_style_agent explanation, using static analysis only")
+        mark_fallback()
+        return _syntax_style_local_update(local)
+    except Exception as e:
+        if local is not None:
+            print(f"Error in syntax_style_agent explanation, using static analysis only: {str(e)}")
+            mark_fallback()
+            return _syntax_style_local_update(local)
+        return _syntax_style_fallback(state, e)
+
+async def asyntax_style_agent(state: EvaluationState) -> EvaluationState:
+    """Async variant of syntax_style_agent using the shared client's ainvoke."""
+    print(f"Evaluating syntax and style for {state['student_name']}...")
+    
+    local = _local_scores(state)
+    if config.SYNTAX_STYLE_MODE == "local":
+        return _syntax_style_local_update(local)
+    
+    try:
+        template_id, prompt = _syntax_style_prompt(state, local)
+        content = await ainvoke_llm(template_id, prompt, schema=SyntaxStyleEvaluation,
+                                    validate=_parses("syntax_style_parser"))
+        return _syntax_style_update(state, content, local)
+    except LLMUnavailableError:
+        if local is None:
+            raise
+        print("LLM unavailable for syntax_style_agent explanation, using static analysis only")
+        mark_fallback()
+        return _syntax_style_local_update(local)
+    except Exception as e:
+        if local is not None:
+            print(f"Error in syntax_style_agent explanation, using static analysis only: {str(e)}")
+            mark_fallback()
+            return _syntax_style_local_update(local)
+        return _syntax_style_fallback(state, e)
+
+def _requirements_text(state: EvaluationState) -> str:
+    """Numbers the assignment criteria for inclusion in a prompt."""
+    requirements_text = ""
+    for i, req in enumerate(state["requirements"].get("criteria", []), 1):
+        requirements_text += f"{i}. {req}\n"
+    
+    if not requirements_text:
+        requirements_text = "Read the data files and extract metrics and visualizations to provide significant insights from it."
+    return requirements_text
+
+def _criterion_matches(state: EvaluationState) -> Optional[List[Dict]]:
+    """Looks up the closest past judgment of each assignment criterion, if the index is enabled."""
+    index = get_criterion_index()
+    criteria = state["requirements"].get("criteria", [])
+    if index is None or not criteria:
+        return None
+    return match_criteria(index, criteria, _agent_code(state, "requirements"), state["execution_result"]["success"])
+
+def _few_shot_matches(matches: Optional[List[Dict]]) -> List[Dict]:
+    """Keeps the matches with a past judgment at or above CRITERION_FEW_SHOT_SIMILARITY."""
+    return [match for match in matches or []
+            if match["judgment"] is not None and match["similarity"] >= config.CRITERION_FEW_SHOT_SIMILARITY]
+
+def _calibration_text(matches: Optional[List[Dict]]) -> str:
+    """Formats past judgments of similar code as calibration examples for the requirements prompt."""
+    examples = _few_shot_matches(matches)
+    if not examples:
+        return ""
+    lines = ["\nFor consistency, these requirements were judged before on very similar code:"]
+    for match in examples:
+        judgment = match["judgment"]
+        lines.append(f"- {match['criterion']} ({match['similarity']:.0%} similar): "
+                     f"{judgment['score']}/100. {judgment['rationale']}")
+    return "\n".join(lines)
+
+def _reuse_requirements(state: EvaluationState, matches: Optional[List[Dict]]) -> Optional[Dict]:
+    """Builds the requirements evaluation from past judgments when every criterion has a near-identical match.
+
+    Also tallies on the index how this submission's criteria were handled.
+    """
+    index = get_criterion_index()
+    if not matches or index is None:
+        return None
+    if any(match["judgment"] is None or match["similarity"] < config.CRITERION_REUSE_SIMILARITY for match in matches):
+        few_shot = len(_few_shot_matches(matches))
+        index.tally(few_shot=few_shot, cold=len(matches) - few_shot)
+        return None
+
+    index.tally(reused=len(matches))
+    print(f"Reusing past judgments for all {len(matches)} requirements (near-identical code)")
+    tracing.annotate(criteria_reused=len(matches))
+    judgments = [CriterionJudgment(criterion=match["criterion"], **match["judgment"]) for match in matches]
+    return _requirements_fields(state, _evaluation_from_judgments(judgments))
+
+def _evaluation_from_judgments(judgments: List[CriterionJudgment]) -> RequirementsEvaluation:
+    """Aggregates per-criterion judgments into a requirements evaluation scored by their mean."""
+    met = [judgment for judgment in judgments if judgment.score >= 70]
+    missed = [judgment for judgment in judgments if judgment.score < 70]
+    return RequirementsEvaluation(
+        requirements_score=round(sum(judgment.score for judgment in judgments) / len(judgments)),
+        overall_assessment="\n".join(f"{judgment.criterion}: {judgment.rationale}" for judgment in judgments),
+        strengths=[f"{judgment.criterion}: {judgment.rationale}" for judgment in met] or ["N/A"],
+        weaknesses=[f"{judgment.criterion}: {judgment.rationale}" for judgment in missed] or ["N/A"],
+        improvement_suggestions=[f"Revisit the requirement: {judgment.criterion}" for judgment in missed]
+        or ["All requirements are met; consider refining edge cases and presentation."],
+        criteria=judgments
+    )
 
-        prompt = SYNTAX_STYLE_TEMPLATE.format(code=code)
+def _record_criteria(state: EvaluationState, evaluation: RequirementsEvaluation,
+                     matches: Optional[List[Dict]] = None) -> None:
+    """Adds the per-criterion judgments of a fresh evaluation to the criterion index."""
+    if not evaluation.criteria:
+        return
+    matches = matches or _criterion_matches(state)
+    if matches:
+        record_judgments(get_criterion_index(), matches, [judgment.model_dump() for judgment in evaluation.criteria])
+
+def _requirements_prompt(state: EvaluationState, matches: Optional[List[Dict]] = None) -> str:
+    """Renders the requirements prompt for a submission."""
+    execution_success = state["execution_result"]["success"]
+    
+    return _prompts().REQUIREMENTS_TEMPlATE.format(
+        requirements_text=_requirements_text(state),
+        code=_agent_code(state, "requirements"),
+        execution_status="Successful" if execution_success else "Failed",
+        calibration=_calibration_text(matches)
+    )
 
-        response = llm.invoke(prompt)
-        
-        raw_content = response.content  
-        clean_json_str = extract_json_from_backticks(raw_content)
+def _requirements_update(state: EvaluationState, raw_content: str, matches: Optional[List[Dict]] = None) -> Dict:
+    """Parses the requirements response into state updates."""
+    clean_json_str = extract_json_from_backticks(raw_content)
+    evaluation = _prompts().requirements_parser.parse(clean_json_str)
+    _record_criteria(state, evaluation, matches)
+    return _requirements_fields(state, evaluation)
 
-        # Now parse the clean JSON
-        evaluation = syntax_style_parser.parse(clean_json_str)
-        
-        # print("\n--- RAW LLM evaluation for syntax_style_agent (Try block) ---")
-        # print(evaluation)
-        # evaluation = syntax_style_parser.parse(response.content)
-        
-        # Cap
-        syntax_score = min(evaluation.syntax_score, max_syntax_score)
-        style_score = evaluation.style_score
-        
-        print(f"Syntax score: {syntax_score}/60, Style score: {style_score}/40")
+def _requirements_fields(state: EvaluationState, evaluation: RequirementsEvaluation) -> Dict:
+    """Maps a requirements evaluation onto state updates."""
+    execution_success = state["execution_result"]["success"]
+    
+    # Apply a penalty if code execution failed
+    requirements_score = evaluation.requirements_score
+    if not execution_success:
+        requirements_score = min(requirements_score, 60)
         
-        return {
-            **state,
-            "syntax_score": syntax_score,
-            "style_score": style_score,
-            "syntax_feedback": {
-                "score": syntax_score,
-                "explanation": evaluation.syntax_feedback,
-                "improvements": evaluation.syntax_improvements
-            },
-            "style_feedback": {
-                "score": style_score,
-                "explanation": evaluation.style_feedback,
-                "improvements": evaluation.style_improvements
-            }
-        }
+    print(f"Requirements score: {requirements_score}/100")
     
-    except Exception as e:
+    return {
+        "requirements_score": requirements_score,
+        "requirements_feedback": {
+            "score": requirements_score,
+            "overall_assessment": evaluation.overall_assessment,
+            "strengths": evaluation.strengths,
+            "weaknesses": evaluation.weaknesses,
+            "improvement_suggestions": evaluation.improvement_suggestions
+        }
+    }
 
-        print(f"Error in syntax_style_agent: {str(e)}")
-        
-        fallback_syntax_score = 30 if execution_success else 20
-        fallback_style_score = 20
-        
-        return {
-            **state,
-            "syntax_score": fallback_syntax_score,
-            "style_score": fallback_style_score,
-            "syntax_feedback": {
-                "score": fallback_syntax_score,
-                "explanation": "An error occurred during evaluation.",
-                "improvements": ["Review your code for syntax errors."]
-            },
-            "style_feedback": {
-                "score": fallback_style_score,
-                "explanation": "An error occurred during evaluation.",
-                "improvements": ["Review your code for style issues."]
-            }
+def _requirements_fallback(state: EvaluationState, error: Exception) -> Dict:
+    """Builds a fallback requirements score when the evaluation fails."""
+    print(f"Error in requirements_agent: {str(error)}")
+    mark_fallback()
+    default_score = 50 if state["execution_result"]["success"] else 30
+    
+    return {
+        "requirements_score": default_score,
+        "requirements_feedback": {
+            "score": default_score,
+            "overall_assessment": "An error occurred during evaluation.",
+            "strengths": ["N/A"],
+            "weaknesses": ["N/A"],
+            "improvement_suggestions": ["Review assignment requirements and ensure your code addresses them."]
         }
+    }
+
+def _criterion_prompt(state: EvaluationState, task: Dict) -> str:
+    """Renders the prompt that judges a single assignment requirement."""
+    execution_success = state["execution_result"]["success"]
+    
+    return _prompts().CRITERION_TEMPLATE.format(
+        criterion=task["criterion"],
+        code=_agent_code(state, "requirements"),
+        execution_status="Successful" if execution_success else "Failed",
+        calibration=_calibration_text([task])
+    )
+
+def _criterion_judgment(task: Dict, raw_content: str) -> CriterionJudgment:
+    """Parses a single-requirement response, keeping the requirement text as given."""
+    clean_json_str = extract_json_from_backticks(raw_content)
+    judgment = _prompts().criterion_parser.parse(clean_json_str)
+    return judgment.model_copy(update={"criterion": task["criterion"]})
+
+def _judge_criterion(state: EvaluationState, task: Dict) -> CriterionJudgment:
+    """Judges one requirement with its own small LLM call."""
+    content = invoke_llm("requirements_criterion", _criterion_prompt(state, task), schema=CriterionJudgment,
+                         validate=_parses("criterion_parser"))
+    return _criterion_judgment(task, content)
+
+async def _ajudge_criterion(state: EvaluationState, task: Dict) -> CriterionJudgment:
+    """Async variant of _judge_criterion."""
+    content = await ainvoke_llm("requirements_criterion", _criterion_prompt(state, task), schema=CriterionJudgment,
+                                validate=_parses("criterion_parser"))
+    return _criterion_judgment(task, content)
+
+def _criterion_tasks(state: EvaluationState) -> List[Dict]:
+    """One task per requirement, carrying its closest past judgment when the criterion index is enabled."""
+    return _criterion_matches(state) or [
+        {"criterion": criterion, "similarity": 0.0, "judgment": None} for criterion in state["requirements"]["criteria"]
+    ]
+
+def _start_criteria(state: EvaluationState) -> Tuple[List[Dict], Dict[int, CriterionJudgment], List[int]]:
+    """Lists one task per requirement and takes what it can from the criterion index.
+
+    Returns the tasks, the judgments reused so far by position, and the positions
+    that still need an LLM call.
+    """
+    index = get_criterion_index()
+    tasks = _criterion_tasks(state)
+    judgments = {
+        position: CriterionJudgment(criterion=task["criterion"], **task["judgment"])
+        for position, task in enumerate(tasks)
+        if task["judgment"] is not None and task["similarity"] >= config.CRITERION_REUSE_SIMILARITY
+    }
+    pending = [position for position in range(len(tasks)) if position not in judgments]
+    if index is not None:
+        few_shot = len(_few_shot_matches([tasks[position] for position in pending]))
+        index.tally(reused=len(judgments), few_shot=few_shot, cold=len(pending) - few_shot)
+    if judgments:
+        print(f"Reusing past judgments for {len(judgments)} of {len(tasks)} requirements")
+    return tasks, judgments, pending
+
+def _collect_criteria(tasks: List[Dict], judgments: Dict[int, CriterionJudgment], pending: List[int],
+                      outcomes: List) -> List[int]:
+    """Keeps the judgments that succeeded and returns the positions that failed."""
+    index = get_criterion_index()
+    failed = []
+    for position, outcome in zip(pending, outcomes):
+        if isinstance(outcome, LLMUnavailableError):
+            raise outcome
+        if isinstance(outcome, Exception):
+            print(f"Error judging requirement {position + 1}: {str(outcome)}")
+            failed.append(position)
+            continue
+        judgments[position] = outcome
+        if index is not None:
+            record_judgments(index, [tasks[position]], [outcome.model_dump()])
+    return failed
+
+def _per_criterion_update(state: EvaluationState, tasks: List[Dict], judgments: Dict[int, CriterionJudgment],
+                          failed: List[int]) -> Dict:
+    """Aggregates the per-requirement judgments, giving default scores to requirements that kept failing."""
+    tracing.annotate(criteria=len(tasks), criteria_failed=len(failed))
+    if not judgments:
+        return _requirements_fallback(state, RuntimeError(f"all {len(tasks)} requirement evaluations failed"))
+    if failed:
+        mark_fallback()
+        default_score = 50 if state["execution_result"]["success"] else 30
+        for position in failed:
+            judgments[position] = CriterionJudgment(
+                criterion=tasks[position]["criterion"], score=default_score,
+                rationale="This requirement could not be evaluated automatically."
+            )
+    evaluation = _evaluation_from_judgments([judgments[position] for position in range(len(tasks))])
+    return _requirements_fields(state, evaluation)
+
+def _per_criterion_requirements(state: EvaluationState) -> Dict:
+    """Judges every requirement in parallel, retrying only the ones that failed."""
+    tasks, judgments, pending = _start_criteria(state)
+    for attempt in range(config.REQUIREMENTS_CRITERION_RETRIES + 1):
+        if not pending:
+            break
+        if attempt:
+            print(f"Retrying {len(pending)} failed requirement(s) (attempt {attempt + 1})")
+        # Each call runs in a copy of this context so its spans nest under the node
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, _judge_criterion, state, tasks[position])
+                       for position in pending]
+            outcomes = [future.exception() or future.result() for future in futures]
+        pending = _collect_criteria(tasks, judgments, pending, outcomes)
+    return _per_criterion_update(state, tasks, judgments, pending)
+
+async def _aper_criterion_requirements(state: EvaluationState) -> Dict:
+    """Async variant of _per_criterion_requirements."""
+    tasks, judgments, pending = _start_criteria(state)
+    for attempt in range(config.REQUIREMENTS_CRITERION_RETRIES + 1):
+        if not pending:
+            break
+        if attempt:
+            print(f"Retrying {len(pending)} failed requirement(s) (attempt {attempt + 1})")
+        outcomes = await asyncio.gather(
+            *(_ajudge_criterion(state, tasks[position]) for position in pending), return_exceptions=True
+        )
+        pending = _collect_criteria(tasks, judgments, pending, outcomes)
+    return _per_criterion_update(state, tasks, judgments, pending)
+
+def _per_criterion_enabled(state: EvaluationState) -> bool:
+    """Whether requirements are judged one criterion per call (REQUIREMENTS_MODE with a non-empty rubric)."""
+    return config.REQUIREMENTS_MODE == "per_criterion" and bool(state["requirements"].get("criteria"))
 
 def requirements_agent(state: EvaluationState) -> EvaluationState:
     """Evaluates how well the code meets the assignment requirements."""
     print(f"Evaluating requirements fulfillment for {state['student_name']}...")
     
-    code = state["student_code"]
-    requirements = state["requirements"]
+    try:
+        if _per_criterion_enabled(state):
+            return _per_criterion_requirements(state)
+        matches = _criterion_matches(state)
+        reused = _reuse_requirements(state, matches)
+        if reused is not None:
+            return reused
+        prompt = _requirements_prompt(state, matches)
+        content = invoke_llm("requirements", prompt, schema=RequirementsEvaluation,
+                             validate=_parses("requirements_parser"))
+        return _requirements_update(state, content, matches)
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        return _requirements_fallback(state, e)
+
+async def arequirements_agent(state: EvaluationState) -> EvaluationState:
+    """Async variant of requirements_agent using the shared client's ainvoke."""
+    print(f"Evaluating requirements fulfillment for {state['student_name']}...")
+    
+    try:
+        if _per_criterion_enabled(state):
+            return await _aper_criterion_requirements(state)
+        matches = _criterion_matches(state)
+        reused = _reuse_requirements(state, matches)
+        if reused is not None:
+            return reused
+        prompt = _requirements_prompt(state, matches)
+        content = await ainvoke_llm("requirements", prompt, schema=RequirementsEvaluation,
+                                    validate=_parses("requirements_parser"))
+        return _requirements_update(state, content, matches)
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        return _requirements_fallback(state, e)
+
+def _figures_text(state: EvaluationState) -> str:
+    """Serializes the figure summaries captured in the sandbox for a prompt."""
+    figures = state["execution_result"].get("figures")
+    return json.dumps(figures, separators=(",", ":")) if figures else "No figures were captured."
+
+def _visualization_prompt(state: EvaluationState) -> str:
+    """Renders the visualization prompt for a submission."""
     execution_success = state["execution_result"]["success"]
+    viz_libraries = state.get("viz_imports", [])
     
-    llm = ChatOpenAI(
-        model="gpt-3.5-turbo",
-        temperature=0.1
+    return _prompts().VISUALIZATION_TEMPLATE.format(
+        libraries=", ".join(viz_libraries),
+        execution_status="Successful" if execution_success else "Failed",
+        figures=_figures_text(state),
+        code=_agent_code(state, "visualization")
     )
-    
-    requirements_text = ""
-    for i, req in enumerate(requirements.get("criteria", []), 1):
-        requirements_text += f"{i}. {req}\n"
-    
-    if not requirements_text:
-        requirements_text = "Read the data files and extract metrics and visualizations to provide significant insights from it."
-    
-    try:
-        prompt = REQUIREMENTS_TEMPlATE.format(
-            requirements_text=requirements_text,
-            code=code,
-            execution_status="Successful" if execution_success else "Failed"
-        )
-        
-        response = llm.invoke(prompt)
-        
-        raw_content = response.content  
-        clean_json_str = extract_json_from_backticks(raw_content)
 
-        evaluation = requirements_parser.parse(clean_json_str)
-        # print("\n--- RAW LLM evaluation for requirements_agent (Try block) ---")
-        # print(evaluation)
-        # evaluation = requirements_parser.parse(response.content)
-        
-        # Apply a penalty if code execution failed
-        requirements_score = evaluation.requirements_score
-        if not execution_success:
-            requirements_score = min(requirements_score, 60)
-            
-        print(f"Requirements score: {requirements_score}/100")
+def _visualization_update(state: EvaluationState, raw_content: str) -> Dict:
+    """Parses the visualization response into state updates."""
+    clean_json_str = extract_json_from_backticks(raw_content)
+    evaluation = _prompts().visualization_parser.parse(clean_json_str)
+    return _visualization_fields(state, evaluation)
+
+def _visualization_fields(state: EvaluationState, evaluation: VisualizationEvaluation) -> Dict:
+    """Maps a visualization evaluation onto state updates."""
+    execution_success = state["execution_result"]["success"]
+    
+    visualization_score = evaluation.visualization_score
+    if not execution_success:
+        visualization_score = min(visualization_score, 50)
         
-        return {
-            **state,
-            "requirements_score": requirements_score,
-            "requirements_feedback": {
-                "score": requirements_score,
-                "overall_assessment": evaluation.overall_assessment,
-                "strengths": evaluation.strengths,
-                "weaknesses": evaluation.weaknesses,
-                "improvement_suggestions": evaluation.improvement_suggestions
-            }
+    print(f"Visualization score: {visualization_score}/100")
+    
+    return {
+        "visualization_score": visualization_score,
+        "visualization_feedback": {
+            "score": visualization_score,
+            "clarity_assessment": evaluation.clarity_assessment,
+            "insight_assessment": evaluation.insight_assessment,
+            "technical_assessment": evaluation.technical_assessment,
+            "strengths": evaluation.strengths,
+            "improvement_suggestions": evaluation.improvement_suggestions
         }
+    }
+
+def _visualization_fallback(state: EvaluationState, error: Exception) -> Dict:
+    """Builds a fallback visualization score when the evaluation fails."""
+    print(f"Error in visualization_agent: {str(error)}")
+    mark_fallback()
+    default_score = 50 if state["execution_result"]["success"] else 30
     
-    except Exception as e:
-        print(f"Error in requirements_agent: {str(e)}")
-        default_score = 50 if execution_success else 30
-        
-        return {
-            **state,
-            "requirements_score": default_score,
-            "requirements_feedback": {
-                "score": default_score,
-                "overall_assessment": "An error occurred during evaluation.",
-                "strengths": ["N/A"],
-                "weaknesses": ["N/A"],
-                "improvement_suggestions": ["Review assignment requirements and ensure your code addresses them."]
-            }
+    return {
+        "visualization_score": default_score,
+        "visualization_feedback": {
+            "score": default_score,
+            "clarity_assessment": "An error occurred during evaluation.",
+            "insight_assessment": "An error occurred during evaluation.",
+            "technical_assessment": "An error occurred during evaluation.",
+            "strengths": ["Visualization libraries were imported correctly."],
+            "improvement_suggestions": ["Review visualization best practices."]
         }
+    }
 
 def visualization_agent(state: EvaluationState) -> EvaluationState:
-
     """Evaluates the quality and effectiveness of data visualizations."""
     print(f"Evaluating visualizations for {state['student_name']}...")
     
-    code = state["student_code"]
-    execution_success = state["execution_result"]["success"]
-    
     # Check if visualizations were detected
-    has_viz = state.get("has_visualizations", False)
-    if not has_viz:
+    if not state.get("has_visualizations", False):
         print("No visualizations detected, skipping visualization evaluation")
+        return {"visualization_score": None}
+    
+    try:
+        prompt = _visualization_prompt(state)
+        content = invoke_llm("visualization", prompt, schema=VisualizationEvaluation,
+                             validate=_parses("visualization_parser"))
+        return _visualization_update(state, content)
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        return _visualization_fallback(state, e)
 
-        return {
-            **state,
-            "visualization_score": None
-        }
+async def avisualization_agent(state: EvaluationState) -> EvaluationState:
+    """Async variant of visualization_agent using the shared client's ainvoke."""
+    print(f"Evaluating visualizations for {state['student_name']}...")
     
-    viz_libraries = state.get("viz_imports", [])
+    if not state.get("has_visualizations", False):
+        print("No visualizations detected, skipping visualization evaluation")
+        return {"visualization_score": None}
     
-    llm = ChatOpenAI(
-        model="gpt-3.5-turbo",
-        temperature=0.1
+    try:
+        prompt = _visualization_prompt(state)
+        content = await ainvoke_llm("visualization", prompt, schema=VisualizationEvaluation,
+                                    validate=_parses("visualization_parser"))
+        return _visualization_update(state, content)
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        return _visualization_fallback(state, e)
+
+def _combined_prompt(state: EvaluationState) -> str:
+    """Renders the fused prompt that carries the code once for every section."""
+    execution_success = state["execution_result"]["success"]
+    
+    if state.get("has_visualizations", False):
+        visualization_section = _prompts().COMBINED_VISUALIZATION_SECTION.format(
+            libraries=", ".join(state.get("viz_imports", [])),
+            figures=_figures_text(state)
+        )
+    else:
+        visualization_section = _prompts().COMBINED_NO_VISUALIZATION_SECTION
+    
+    return _prompts().COMBINED_TEMPLATE.format(
+        requirements_text=_requirements_text(state),
+        visualization_section=visualization_section,
+        execution_status="Successful" if execution_success else "Failed",
+        code=_agent_code(state, "requirements")
     )
+
+def _combined_update(state: EvaluationState, raw_content: str, local: Optional[Dict] = None) -> Dict:
+    """Parses the fused response and spreads it into the per-section state fields."""
+    clean_json_str = extract_json_from_backticks(raw_content)
+    evaluation = _prompts().combined_parser.parse(clean_json_str)
+    _record_criteria(state, evaluation.requirements)
+    
+    update = {
+        **_syntax_style_fields(state, evaluation.syntax_style, local),
+        **_requirements_fields(state, evaluation.requirements)
+    }
+    if state.get("has_visualizations", False):
+        if evaluation.visualization is None:
+            update.update(_visualization_fallback(state, ValueError("Fused response has no visualization section")))
+        else:
+            update.update(_visualization_fields(state, evaluation.visualization))
+    return update
+
+def _combined_fallback(state: EvaluationState, error: Exception, local: Optional[Dict] = None) -> Dict:
+    """Builds fallback values for every section when the fused evaluation fails."""
+    mark_fallback()
+    update = {
+        **(_syntax_style_local_update(local) if local is not None else _syntax_style_fallback(state, error)),
+        **_requirements_fallback(state, error)
+    }
+    if state.get("has_visualizations", False):
+        update.update(_visualization_fallback(state, error))
+    return update
+
+def combined_evaluator_agent(state: EvaluationState) -> EvaluationState:
+    """Evaluates syntax/style, requirements and visualizations with one fused LLM call."""
+    print(f"Evaluating all sections in one call for {state['student_name']}...")
+    
+    local = _local_scores(state)
     
     try:
-        prompt = VISUALIZATION_TEMPLATE.format(
-            libraries=", ".join(viz_libraries),
-            execution_status="Successful" if execution_success else "Failed",
-            code=code
-        )
-        
-        response = llm.invoke(prompt)
-        raw_content = response.content  
-        clean_json_str = extract_json_from_backticks(raw_content)
-
-        evaluation = visualization_parser.parse(clean_json_str)
-        # print("\n--- RAW LLM evaluation for visualization_agent (Try block) ---")
-        # print(evaluation)
-        # evaluation = visualization_parser.parse(response.content)
-        
-        visualization_score = evaluation.visualization_score
-        if not execution_success:
-            visualization_score = min(visualization_score, 50)
-            
-        print(f"Visualization score: {visualization_score}/100")
-        
-        # Return new state with updated values
-        return {
-            **state,
-            "visualization_score": visualization_score,
-            "visualization_feedback": {
-                "score": visualization_score,
-                "clarity_assessment": evaluation.clarity_assessment,
-                "insight_assessment": evaluation.insight_assessment,
-                "technical_assessment": evaluation.technical_assessment,
-                "strengths": evaluation.strengths,
-                "improvement_suggestions": evaluation.improvement_suggestions
-            }
-        }
+        content = invoke_llm("combined", _combined_prompt(state), schema=CombinedEvaluation,
+                             validate=_parses("combined_parser"))
+        return _combined_update(state, content, local)
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error in combined_evaluator_agent: {str(e)}")
+        return _combined_fallback(state, e, local)
+
+async def acombined_evaluator_agent(state: EvaluationState) -> EvaluationState:
+    """Async variant of combined_evaluator_agent using the shared client's ainvoke."""
+    print(f"Evaluating all sections in one call for {state['student_name']}...")
+    
+    local = _local_scores(state)
     
+    try:
+        content = await ainvoke_llm("combined", _combined_prompt(state), schema=CombinedEvaluation,
+                                    validate=_parses("combined_parser"))
+        return _combined_update(state, content, local)
+    except LLMUnavailableError:
+        raise
     except Exception as e:
-        print(f"Error in visualization_agent: {str(e)}")
-        default_score = 50 if execution_success else 30
-        
-        return {
-            **state,
-            "visualization_score": default_score,
-            "visualization_feedback": {
-                "score": default_score,
-                "clarity_assessment": "An error occurred during evaluation.",
-                "insight_assessment": "An error occurred during evaluation.",
-                "technical_assessment": "An error occurred during evaluation.",
-                "strengths": ["Visualization libraries were imported correctly."],
-                "improvement_suggestions": ["Review visualization best practices."]
-            }
-        }
+        print(f"Error in combined_evaluator_agent: {str(e)}")
+        return _combined_fallback(state, e, local)
+
+def render_llm_requests(state: EvaluationState) -> List[Dict]:
+    """Lists the prompts the evaluators would send for a submission that executed successfully.
+
+    Used to grade offline through a provider batch endpoint instead of the graph's
+    LLM nodes; each entry is {"section", "template_id", "prompt"}. In per-criterion
+    mode requirements become "requirements_criterion" entries with a "criterion"
+    position, answered together through apply_criterion_responses; criteria reused
+    from the index carry their "judgment" instead of a prompt.
+    """
+    local = _local_scores(state)
+    if config.EVALUATION_MODE == "fused":
+        return [{"section": "combined", "template_id": "combined", "prompt": _combined_prompt(state)}]
+    
+    requests = []
+    if config.SYNTAX_STYLE_MODE != "local":
+        template_id, prompt = _syntax_style_prompt(state, local)
+        requests.append({"section": "syntax_style", "template_id": template_id, "prompt": prompt})
+    if _per_criterion_enabled(state):
+        requests.extend(_criterion_requests(state))
+    else:
+        requests.append({"section": "requirements", "template_id": "requirements", "prompt": _requirements_prompt(state)})
+    if state.get("has_visualizations", False):
+        requests.append({"section": "visualization", "template_id": "visualization", "prompt": _visualization_prompt(state)})
+    return requests
+
+def _criterion_requests(state: EvaluationState) -> List[Dict]:
+    """Per-criterion requirement requests; criteria reused from the index carry their judgment instead of a prompt."""
+    tasks, judgments, pending = _start_criteria(state)
+    requests = [{"section": "requirements_criterion", "criterion": position, "judgment": judgment.model_dump()}
+                for position, judgment in judgments.items()]
+    for position in pending:
+        requests.append({
+            "section": "requirements_criterion",
+            "template_id": "requirements_criterion",
+            "criterion": position,
+            "prompt": _criterion_prompt(state, tasks[position])
+        })
+    return sorted(requests, key=lambda request: request["criterion"])
+
+def apply_criterion_responses(state: EvaluationState, reused: Dict[int, Dict],
+                              responses: Dict[int, object]) -> Tuple[Dict, List[int]]:
+    """Aggregates per-criterion responses rendered by render_llm_requests into requirements updates.
+
+    reused maps positions to judgments taken from the index; responses maps the
+    other positions to response text or the error that replaced it. Returns the
+    state updates and the positions whose response parsed.
+    """
+    tasks = _criterion_tasks(state)
+    judgments = {position: CriterionJudgment(**judgment) for position, judgment in reused.items()}
+    pending = sorted(responses)
+    outcomes = []
+    for position in pending:
+        outcome = responses[position]
+        if isinstance(outcome, str):
+            try:
+                outcome = _criterion_judgment(tasks[position], outcome)
+            except Exception as e:
+                outcome = e
+        outcomes.append(outcome)
+    failed = _collect_criteria(tasks, judgments, pending, outcomes)
+    return _per_criterion_update(state, tasks, judgments, failed), [p for p in pending if p not in failed]
+
+def local_evaluation_updates(state: EvaluationState) -> Dict:
+    """State updates that need no LLM call (locally scored syntax/style, skipped visualization)."""
+    update = {}
+    if config.EVALUATION_MODE != "fused" and config.SYNTAX_STYLE_MODE == "local":
+        update.update(_syntax_style_local_update(_local_scores(state)))
+    if not state.get("has_visualizations", False):
+        update["visualization_score"] = None
+    return update
+
+def apply_llm_response(state: EvaluationState, section: str, content: str) -> Dict:
+    """Parses a response rendered by render_llm_requests into state updates."""
+    if section == "syntax_style":
+        return _syntax_style_update(state, content, _local_scores(state))
+    if section == "requirements":
+        return _requirements_update(state, content)
+    if section == "visualization":
+        return _visualization_update(state, content)
+    if section == "combined":
+        return _combined_update(state, content, _local_scores(state))
+    raise ValueError(f"Unknown evaluation section: {section}")
+
+def apply_llm_failure(state: EvaluationState, section: str, error: Exception) -> Dict:
+    """Fallback state updates for a section whose response was missing or unparseable."""
+    if section == "syntax_style":
+        local = _local_scores(state)
+        return _syntax_style_local_update(local) if local is not None else _syntax_style_fallback(state, error)
+    if section == "requirements":
+        return _requirements_fallback(state, error)
+    if section == "visualization":
+        return _visualization_fallback(state, error)
+    return _combined_fallback(state, error, _local_scores(state))
 
 def feedback_agent(state: EvaluationState) -> EvaluationState:
     """Synthesizes all evaluations into coherent feedback and a final score."""
@@ -428,7 +974,7 @@ def feedback_agent(state: EvaluationState) -> EvaluationState:
     feedback = []
     feedback.append(f"# Evaluation for {state['student_name']}")
     feedback.append(f"## Overall Score: {final_score}/100")
-    grade = "A" if final_score >= 90 else "B" if final_score >= 80 else "C" if final_score >= 70 else "D" if final_score >= 60 else "F"
+    grade = grade_for(final_score)
     feedback.append(f"## Grade: {grade}")
     feedback.append("## Summary")
 
@@ -440,49 +986,13 @@ def feedback_agent(state: EvaluationState) -> EvaluationState:
     strengths = []
     improvements = []
 
-    def unpack_feedback(feedback_entry, score_title):
-        section = []
-        if isinstance(feedback_entry, dict):
-            score = feedback_entry.get("score")
-            explanation = feedback_entry.get("explanation") or feedback_entry.get("overall_assessment", "")
-            if score is not None:
-                section.append(f"\n## {score_title}: {score}")
-            if explanation:
-                section.append(explanation)
-
-            if "improvements" in feedback_entry:
-                for imp in feedback_entry.get("improvements", []):
-                    improvements.append(f"{score_title}: {imp}")
-            if "strengths" in feedback_entry:
-                for strength in feedback_entry.get("strengths", []):
-                    strengths.append(strength)
-            if "weaknesses" in feedback_entry:
-                for weakness in feedback_entry.get("weaknesses", []):
-                    improvements.append(f"{score_title}: {weakness}")
-            if "improvement_suggestions" in feedback_entry:
-                for suggestion in feedback_entry.get("improvement_suggestions", []):
-                    improvements.append(f"{score_title}: {suggestion}")
-
-            if "clarity_assessment" in feedback_entry:
-                section.append("### Visual Clarity\n" + feedback_entry["clarity_assessment"])
-            if "insight_assessment" in feedback_entry:
-                section.append("### Insight Generation\n" + feedback_entry["insight_assessment"])
-            if "technical_assessment" in feedback_entry:
-                section.append("### Technical Implementation\n" + feedback_entry["technical_assessment"])
-        elif isinstance(feedback_entry, str):
-            section.append(f"\n## {score_title}")
-            section.append(feedback_entry)
-        else:
-            section.append(f"\n## {score_title}")
-            section.append("No feedback available.")
-        return section
-
-    feedback += unpack_feedback(state.get("syntax_feedback"), "Syntax Evaluation")
-    feedback += unpack_feedback(state.get("style_feedback"), "Style Evaluation")
-    feedback += unpack_feedback(state.get("requirements_feedback"), "Requirements Evaluation")
-    
-    if has_viz:
-        feedback += unpack_feedback(state.get("visualization_feedback"), "Visualization Evaluation")
+    for field, title in SECTIONS:
+        if field == "visualization_feedback" and not has_viz:
+            continue
+        section, section_strengths, section_improvements = unpack_feedback(state.get(field), title)
+        feedback += section
+        strengths += section_strengths
+        improvements += section_improvements
 
     if strengths:
         feedback.append("\n## Strengths")
@@ -0,0 +1,353 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from state import EvaluationState
+from agents import input_node, fingerprint_node, compact_code_node, code_execution_node, analyze_errors, feedback_agent
+from agents import render_llm_requests, local_evaluation_updates, apply_llm_response, apply_llm_failure
+from agents import apply_criterion_responses
+from llm import get_cache, complete_text
+from llm_cache import LLMCache
+import config
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+# Sections graded from the normalized code, so exact duplicates share one request (as in the graph)
+SHARED_SECTIONS = ("requirements", "requirements_criterion", "visualization")
+
+# Per-criterion requirement responses are parsed together once the whole submission is back
+CRITERION_SECTION = "requirements_criterion"
+
+class LocalBatchBackend:
+    """Stand-in for a provider batch endpoint with the same JSONL file contract.
+
+    Each request line is answered with the regular chat client, so a batch run
+    can be exercised end to end without a provider account. Like a provider it
+    bypasses the completion cache; collect_batch caches the answers that parse.
+    """
+
+    name = "local"
+
+    def __init__(self, work_dir: str):
+        self.work_dir = work_dir
+
+    def _output_path(self, batch_id: str) -> str:
+        return os.path.join(self.work_dir, f"{batch_id}_output.jsonl")
+
+    def _answer(self, line: Dict) -> Dict:
+        prompt = line["body"]["messages"][-1]["content"]
+        try:
+            content = complete_text(prompt)
+        except Exception as e:
+            return {"custom_id": line["custom_id"], "response": None, "error": {"message": str(e)}}
+        body = {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+        return {"custom_id": line["custom_id"], "response": {"status_code": 200, "body": body}, "error": None}
+
+    def submit(self, input_path: str) -> str:
+        """Answers every request in the file and returns the id of the finished batch."""
+        batch_id = f"local_batch_{int(time.time() * 1000)}"
+        with open(input_path, "r") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        with ThreadPoolExecutor(max_workers=config.LLM_CONCURRENCY) as executor:
+            answers = list(executor.map(self._answer, lines))
+        with open(self._output_path(batch_id), "w") as f:
+            for answer in answers:
+                f.write(json.dumps(answer) + "\n")
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        return "completed" if os.path.exists(self._output_path(batch_id)) else "failed"
+
+    def download(self, batch_id: str, output_path: str) -> None:
+        with open(self._output_path(batch_id), "r") as src, open(output_path, "w") as dst:
+            dst.write(src.read())
+
+class OpenAIBatchBackend:
+    """Submits the JSONL file to the OpenAI Batch API (half price, separate rate limits)."""
+
+    name = "openai"
+
+    def __init__(self, work_dir: str):
+        from openai import OpenAI
+        self.work_dir = work_dir
+        self.client = OpenAI()
+
+    def submit(self, input_path: str) -> str:
+        """Uploads the request file and creates a batch for it."""
+        with open(input_path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=config.BATCH_API_COMPLETION_WINDOW
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def download(self, batch_id: str, output_path: str) -> None:
+        """Writes the output file, followed by the error file's lines if there is one."""
+        batch = self.client.batches.retrieve(batch_id)
+        with open(output_path, "w") as f:
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    text = self.client.files.content(file_id).text
+                    f.write(text if text.endswith("\n") else text + "\n")
+
+BACKENDS = {
+    "local": LocalBatchBackend,
+    "openai": OpenAIBatchBackend,
+}
+
+def get_backend(name: str, work_dir: str):
+    """Instantiates a batch backend by name."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown batch backend: {name}")
+    return BACKENDS[name](work_dir)
+
+def _prepare(state: EvaluationState) -> EvaluationState:
+    """Runs the graph's pre-LLM nodes; failed executions are finished here like in the graph."""
+    state = input_node(state)
+    state = {**state, **fingerprint_node(state)}
+    state = {**state, **compact_code_node(state)}
+    state = code_execution_node(state)
+    if not state["execution_result"]["success"]:
+        state = feedback_agent(analyze_errors(state))
+    return state
+
+def _apply(state: EvaluationState, section: str, content: str) -> Tuple[Dict, bool]:
+    """Parses one response, falling back like the graph's agents when it does not parse.
+
+    Returns the state updates and whether the response parsed.
+    """
+    try:
+        return apply_llm_response(state, section, content), True
+    except Exception as e:
+        print(f"Error parsing {section} response for {state['student_name']}: {str(e)}")
+        return apply_llm_failure(state, section, e), False
+
+def _apply_criteria(state: EvaluationState, requests: List[Dict], results: Dict[str, Dict],
+                    cache: Optional[LLMCache], model: str) -> Dict:
+    """Aggregates a submission's per-criterion responses into its requirements section.
+
+    Responses that parsed are cached; answers that came from the cache but no
+    longer parse are dropped from it.
+    """
+    reused = {request["criterion"]: request["judgment"] for request in requests if "judgment" in request}
+    responses = {}
+    for request in requests:
+        if "judgment" in request:
+            continue
+        if "content" in request:
+            responses[request["criterion"]] = request["content"]
+            continue
+        result = results.get(request["custom_id"], {"error": "missing from batch output"})
+        if "content" in result:
+            responses[request["criterion"]] = result["content"]
+        else:
+            print(f"Batch request {request['custom_id']} failed: {result['error']}")
+            responses[request["criterion"]] = RuntimeError(result["error"])
+    update, parsed = apply_criterion_responses(state, reused, responses)
+    if cache is not None:
+        for request in requests:
+            if "cache_key" not in request:
+                continue
+            if request["criterion"] not in parsed:
+                cache.invalidate(request["cache_key"])
+            elif "content" not in request:
+                cache.put(request["cache_key"], responses[request["criterion"]],
+                          template_id=request["template_id"], model=model)
+    return update
+
+def _request_line(custom_id: str, prompt: str) -> Dict:
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": config.LLM_MODEL,
+            "temperature": config.LLM_TEMPERATURE,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+    }
+
+def _manifest_path(work_dir: str) -> str:
+    return os.path.join(work_dir, "manifest.json")
+
+def submit_batch(states: List[EvaluationState], backend_name: str, work_dir: str) -> str:
+    """Prepares every submission, writes the pending prompts to a JSONL file and submits it.
+
+    Prompts already in the LLM cache are answered immediately, and exact duplicates
+    share their requirements and visualization requests. Returns the path of
+    the manifest that collect_batch needs to finish grading, possibly in a later run.
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    cache = get_cache()
+    input_path = os.path.join(work_dir, "batch_input.jsonl")
+
+    # Executions run concurrently on the sandbox pool; map keeps the cohort's order
+    with ThreadPoolExecutor(max_workers=config.SANDBOX_CONCURRENCY) as executor:
+        prepared = list(executor.map(_prepare, states))
+
+    submissions = []
+    shared = {}
+    pending = 0
+    with open(input_path, "w") as f:
+        for index, state in enumerate(prepared):
+            entry = {"state": state, "requests": []}
+            submissions.append(entry)
+            if state.get("error_analysis"):
+                continue
+
+            state.update(local_evaluation_updates(state))
+            for request in render_llm_requests(state):
+                if "judgment" in request:
+                    # Reused from the criterion index, nothing to send
+                    entry["requests"].append(request)
+                    continue
+                key = LLMCache.make_key(request["template_id"], config.LLM_MODEL, config.LLM_TEMPERATURE,
+                                        request["prompt"])
+                cached = cache.get(key) if cache is not None else None
+                if cached is not None and request["section"] == CRITERION_SECTION:
+                    entry["requests"].append({"section": CRITERION_SECTION, "criterion": request["criterion"],
+                                              "cache_key": key, "content": cached})
+                    continue
+                if cached is not None:
+                    try:
+                        state.update(apply_llm_response(state, request["section"], cached))
+                        continue
+                    except Exception:
+                        # An answer that no longer parses is asked for again
+                        cache.invalidate(key)
+                share_key = (state["normalized_hash"], state["execution_result"]["success"],
+                             request["section"], request["template_id"], request.get("criterion"))
+                record = {
+                    "section": request["section"],
+                    "template_id": request["template_id"],
+                    "cache_key": key
+                }
+                if "criterion" in request:
+                    record["criterion"] = request["criterion"]
+                if request["section"] in SHARED_SECTIONS and share_key in shared:
+                    entry["requests"].append({"custom_id": shared[share_key], **record})
+                    continue
+                custom_id = f"{index}:{request['section']}:{request['template_id']}"
+                if "criterion" in request:
+                    custom_id += f":{request['criterion']}"
+                shared[share_key] = custom_id
+                f.write(json.dumps(_request_line(custom_id, request["prompt"])) + "\n")
+                entry["requests"].append({"custom_id": custom_id, **record})
+                pending += 1
+
+    batch_id = None
+    if pending:
+        print(f"Submitting {pending} prompts for {len(states)} submissions to the {backend_name} batch backend...")
+        batch_id = get_backend(backend_name, work_dir).submit(input_path)
+        print(f"Batch id: {batch_id}")
+    else:
+        print("No prompts to submit; every evaluation was answered locally or from the cache.")
+
+    manifest = {
+        "backend": backend_name,
+        "batch_id": batch_id,
+        "input_file": input_path,
+        "model": config.LLM_MODEL,
+        "temperature": config.LLM_TEMPERATURE,
+        "evaluation_mode": config.EVALUATION_MODE,
+        "syntax_style_mode": config.SYNTAX_STYLE_MODE,
+        "requirements_mode": config.REQUIREMENTS_MODE,
+        "submissions": submissions
+    }
+    with open(_manifest_path(work_dir), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return _manifest_path(work_dir)
+
+def wait_for_batch(backend, batch_id: str, poll_seconds: Optional[float] = None,
+                   timeout: Optional[float] = None) -> str:
+    """Polls until the batch reaches a terminal status and returns that status."""
+    poll_seconds = config.BATCH_API_POLL_SECONDS if poll_seconds is None else poll_seconds
+    start = time.monotonic()
+    while True:
+        status = backend.status(batch_id)
+        if status in TERMINAL_STATUSES:
+            return status
+        if timeout is not None and time.monotonic() - start > timeout:
+            raise TimeoutError(f"Batch {batch_id} still {status} after {timeout} seconds")
+        print(f"Batch {batch_id} is {status}; checking again in {poll_seconds:.0f}s...")
+        time.sleep(poll_seconds)
+
+def parse_batch_output(output_path: str) -> Dict[str, Dict]:
+    """Maps each custom_id to {"content": ...} or {"error": ...} from a batch output file."""
+    results = {}
+    with open(output_path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                error = record.get("error") or response.get("body", {}).get("error") or "request failed"
+                results[record["custom_id"]] = {"error": json.dumps(error) if not isinstance(error, str) else error}
+            else:
+                results[record["custom_id"]] = {"content": response["body"]["choices"][0]["message"]["content"]}
+    return results
+
+def collect_batch(manifest_path: str, poll_seconds: Optional[float] = None,
+                  timeout: Optional[float] = None) -> List[EvaluationState]:
+    """Waits for a submitted batch, parses its responses and finishes every evaluation."""
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+
+    results = {}
+    if manifest["batch_id"]:
+        work_dir = os.path.dirname(manifest_path)
+        backend = get_backend(manifest["backend"], work_dir)
+        status = wait_for_batch(backend, manifest["batch_id"], poll_seconds, timeout)
+        if status == "completed":
+            output_path = os.path.join(work_dir, "batch_output.jsonl")
+            backend.download(manifest["batch_id"], output_path)
+            results = parse_batch_output(output_path)
+        else:
+            print(f"Batch {manifest['batch_id']} ended as {status}; using fallback evaluations")
+
+    # Responses are parsed with the same modes the prompts were rendered for,
+    # then the process's own modes are restored for any later grading
+    modes = (config.EVALUATION_MODE, config.SYNTAX_STYLE_MODE, config.REQUIREMENTS_MODE)
+    config.EVALUATION_MODE = manifest["evaluation_mode"]
+    config.SYNTAX_STYLE_MODE = manifest["syntax_style_mode"]
+    config.REQUIREMENTS_MODE = manifest.get("requirements_mode", "single")
+    try:
+        return _finish_submissions(manifest, results)
+    finally:
+        config.EVALUATION_MODE, config.SYNTAX_STYLE_MODE, config.REQUIREMENTS_MODE = modes
+
+def _finish_submissions(manifest: Dict, results: Dict[str, Dict]) -> List[EvaluationState]:
+    """Applies each submission's responses (or fallbacks) and runs the feedback agent."""
+    cache = get_cache()
+    final_states = []
+    for entry in manifest["submissions"]:
+        state = entry["state"]
+        criteria = [request for request in entry["requests"] if request["section"] == CRITERION_SECTION]
+        if criteria:
+            state.update(_apply_criteria(state, criteria, results, cache, manifest["model"]))
+        for request in entry["requests"]:
+            if request["section"] == CRITERION_SECTION:
+                continue
+            result = results.get(request["custom_id"], {"error": "missing from batch output"})
+            if "content" in result:
+                update, parsed = _apply(state, request["section"], result["content"])
+                state.update(update)
+                # Only answers that parsed are cached, so a re-grade asks again for the others
+                if parsed and cache is not None:
+                    cache.put(request["cache_key"], result["content"], template_id=request["template_id"],
+                              model=manifest["model"])
+            else:
+                print(f"Batch request {request['custom_id']} failed: {result['error']}")
+                state.update(apply_llm_failure(state, request["section"], RuntimeError(result["error"])))
+        if not state.get("error_analysis"):
+            state = feedback_agent(state)
+        final_states.append(state)
+    return final_states
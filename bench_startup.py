@@ -0,0 +1,62 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """Runs `python -X importtime -c "import module"` and returns (name, self_us, cumulative_us) rows."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def help_wall_time(runs: int) -> float:
+    """Returns the best wall time in seconds of `python main.py --help` over several runs."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "main.py", "--help"], cwd=HERE, capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def report(module: str, top: int) -> Dict:
+    rows = import_times(module)
+    total = next(cumulative for name, _, cumulative in rows if name == module)
+    heaviest = sorted(rows, key=lambda row: row[2], reverse=True)[1:top + 1]
+    return {"module": module, "total_ms": total / 1000, "heaviest": heaviest}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Import-time regression benchmark for the CLI.')
+    parser.add_argument('--budget-ms', type=float, default=500,
+                        help='Fail if importing main takes longer than this (default: 500)')
+    parser.add_argument('--top', type=int, default=10, help='Number of heaviest imports to list (default: 10)')
+    parser.add_argument('--runs', type=int, default=3, help='Timed runs of main.py --help (default: 3)')
+    args = parser.parse_args()
+
+    result = report("main", args.top)
+    print(f"import main: {result['total_ms']:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    for name, _, cumulative in result["heaviest"]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    print(f"main.py --help: {help_wall_time(args.runs) * 1000:.0f} ms wall time (best of {args.runs})")
+
+    # These must stay out of the startup path; they are loaded by the nodes that need them
+    eager = {name for name, _, _ in import_times("main")} & {"langgraph", "langchain_openai", "openai", "prompts"}
+    if eager:
+        print(f"FAIL: imported at startup: {', '.join(sorted(eager))}")
+        sys.exit(1)
+    if result["total_ms"] > args.budget_ms:
+        print("FAIL: import time over budget")
+        sys.exit(1)
+    print("OK")
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import sqlite3
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, List
+from state import EvaluationState
+import config
+
+def grading_settings() -> List[str]:
+    """Config settings that change a grade: every evaluator's declared settings plus the graph shape."""
+    from workflow import NODE_DEPENDENCIES
+    names = {name for dependencies in NODE_DEPENDENCIES.values() for name in dependencies["settings"]}
+    return sorted(names | {"EVALUATION_MODE"})
+
+def thread_id_for(state: EvaluationState) -> str:
+    """Keys a submission's checkpoints by student and by everything that decides its grade.
+
+    Changing the code, the requirements or the evaluation settings starts a fresh
+    thread instead of resuming one graded under different conditions.
+    """
+    digest = hashlib.sha256()
+    digest.update(state["student_code"].encode("utf-8"))
+    digest.update(json.dumps(state["requirements"], sort_keys=True).encode("utf-8"))
+    settings = {name: getattr(config, name) for name in grading_settings()}
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode("utf-8"))
+    return f"{state['student_name']}:{digest.hexdigest()[:16]}"
+
+def thread_config(state: EvaluationState) -> Dict:
+    return {"configurable": {"thread_id": thread_id_for(state)}}
+
+@contextmanager
+def sqlite_checkpointer(path: str):
+    """Opens a durable SQLite checkpointer shared by every thread of a run."""
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    conn = sqlite3.connect(path, check_same_thread=False)
+    try:
+        yield SqliteSaver(conn)
+    finally:
+        conn.close()
+
+@asynccontextmanager
+async def async_sqlite_checkpointer(path: str):
+    """Async counterpart of sqlite_checkpointer for graphs driven with ainvoke."""
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    async with AsyncSqliteSaver.from_conn_string(path) as saver:
+        yield saver
+
+def invoke_checkpointed(graph, initial_state: EvaluationState) -> EvaluationState:
+    """Runs a submission on a checkpointed graph, reusing whatever an earlier run finished.
+
+    A completed thread is returned as is; an interrupted one resumes from its last
+    checkpoint, where LangGraph keeps the writes of nodes that already succeeded
+    in the interrupted step and re-runs only the others.
+    """
+    run_config = thread_config(initial_state)
+    snapshot = graph.get_state(run_config)
+    if snapshot.values and not snapshot.next:
+        print(f"Reusing checkpointed evaluation for {initial_state['student_name']}")
+        return snapshot.values
+    if snapshot.next:
+        print(f"Resuming evaluation for {initial_state['student_name']} at {', '.join(snapshot.next)}")
+        return graph.invoke(None, run_config)
+    return graph.invoke(initial_state, run_config)
+
+async def ainvoke_checkpointed(graph, initial_state: EvaluationState) -> EvaluationState:
+    """Async variant of invoke_checkpointed."""
+    run_config = thread_config(initial_state)
+    snapshot = await graph.aget_state(run_config)
+    if snapshot.values and not snapshot.next:
+        print(f"Reusing checkpointed evaluation for {initial_state['student_name']}")
+        return snapshot.values
+    if snapshot.next:
+        print(f"Resuming evaluation for {initial_state['student_name']} at {', '.join(snapshot.next)}")
+        return await graph.ainvoke(None, run_config)
+    return await graph.ainvoke(initial_state, run_config)
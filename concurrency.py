@@ -0,0 +1,47 @@
+import asyncio
+import threading
+import weakref
+from contextlib import contextmanager, asynccontextmanager
+from typing import Optional
+import config
+
+_llm_limit = config.LLM_CONCURRENCY
+_llm_semaphore = threading.BoundedSemaphore(config.LLM_CONCURRENCY)
+_sandbox_semaphore = threading.BoundedSemaphore(config.SANDBOX_CONCURRENCY)
+
+# asyncio semaphores are bound to the loop they are used on
+_async_llm_semaphores = weakref.WeakKeyDictionary()
+
+def configure_limits(llm_calls: Optional[int] = None, sandbox_runs: Optional[int] = None) -> None:
+    """Resets the limits on concurrent LLM calls and sandbox executions."""
+    global _llm_limit, _llm_semaphore, _sandbox_semaphore
+    if llm_calls:
+        _llm_limit = llm_calls
+        _llm_semaphore = threading.BoundedSemaphore(llm_calls)
+        _async_llm_semaphores.clear()
+    if sandbox_runs:
+        _sandbox_semaphore = threading.BoundedSemaphore(sandbox_runs)
+
+@contextmanager
+def llm_slot():
+    """Holds one of the shared LLM call slots for the duration of the block."""
+    semaphore = _llm_semaphore
+    with semaphore:
+        yield
+
+@asynccontextmanager
+async def allm_slot():
+    """Async counterpart of llm_slot for agents awaiting the client on an event loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _async_llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _async_llm_semaphores[loop] = asyncio.Semaphore(_llm_limit)
+    async with semaphore:
+        yield
+
+@contextmanager
+def sandbox_slot():
+    """Holds one of the shared sandbox execution slots for the duration of the block."""
+    semaphore = _sandbox_semaphore
+    with semaphore:
+        yield
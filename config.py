@@ -0,0 +1,125 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _env_int(name: str, default: int) -> int:
+    """Reads an integer setting from the environment, falling back to a default."""
+    value = os.getenv(name)
+    return int(value) if value else default
+
+# Concurrency limits used when grading many submissions at once
+LLM_CONCURRENCY = _env_int("LLM_TUTOR_LLM_CONCURRENCY", 8)
+SANDBOX_CONCURRENCY = _env_int("LLM_TUTOR_SANDBOX_CONCURRENCY", os.cpu_count() or 2)
+BATCH_WORKERS = _env_int("LLM_TUTOR_BATCH_WORKERS", LLM_CONCURRENCY + SANDBOX_CONCURRENCY)
+
+# LLM client settings shared by every evaluator agent
+LLM_MODEL = os.getenv("LLM_TUTOR_MODEL", "gpt-3.5-turbo")
+LLM_TEMPERATURE = float(os.getenv("LLM_TUTOR_TEMPERATURE", "0.1"))
+LLM_MAX_CONNECTIONS = _env_int("LLM_TUTOR_MAX_CONNECTIONS", 100)
+# Answer every prompt with a fixed valid evaluation instead of calling the provider (local testing)
+LLM_STUB = os.getenv("LLM_TUTOR_STUB_LLM", "0") == "1"
+
+# Prices used to estimate the cost of a run in trace summaries (USD per 1K tokens)
+LLM_PROMPT_PRICE_PER_1K = float(os.getenv("LLM_TUTOR_PROMPT_PRICE_PER_1K", "0.0005"))
+LLM_COMPLETION_PRICE_PER_1K = float(os.getenv("LLM_TUTOR_COMPLETION_PRICE_PER_1K", "0.0015"))
+
+# Provider rate limits enforced client-side, and retries for 429s and transient errors
+LLM_REQUESTS_PER_MINUTE = _env_int("LLM_TUTOR_REQUESTS_PER_MINUTE", 3500)
+LLM_TOKENS_PER_MINUTE = _env_int("LLM_TUTOR_TOKENS_PER_MINUTE", 160000)
+LLM_COMPLETION_TOKENS_ESTIMATE = _env_int("LLM_TUTOR_COMPLETION_TOKENS_ESTIMATE", 800)
+LLM_MAX_RETRIES = _env_int("LLM_TUTOR_MAX_RETRIES", 6)
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_TUTOR_RETRY_BASE_SECONDS", "1"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_TUTOR_RETRY_MAX_SECONDS", "60"))
+
+# Persistent cache of evaluator completions
+LLM_CACHE_ENABLED = os.getenv("LLM_TUTOR_CACHE", "1") != "0"
+LLM_CACHE_PATH = os.getenv("LLM_TUTOR_CACHE_PATH", ".llm_cache.sqlite")
+LLM_CACHE_MAX_ENTRIES = _env_int("LLM_TUTOR_CACHE_MAX_ENTRIES", 50000)
+LLM_CACHE_MAX_AGE_DAYS = float(os.getenv("LLM_TUTOR_CACHE_MAX_AGE_DAYS", "30"))
+
+# Persistent cache of sandbox execution results, so re-grades skip re-running unchanged code
+EXECUTION_CACHE_ENABLED = os.getenv("LLM_TUTOR_EXECUTION_CACHE", "1") != "0"
+EXECUTION_CACHE_PATH = os.getenv("LLM_TUTOR_EXECUTION_CACHE_PATH", ".execution_cache.sqlite")
+EXECUTION_CACHE_MAX_ENTRIES = _env_int("LLM_TUTOR_EXECUTION_CACHE_MAX_ENTRIES", 20000)
+EXECUTION_CACHE_MAX_AGE_DAYS = float(os.getenv("LLM_TUTOR_EXECUTION_CACHE_MAX_AGE_DAYS", "30"))
+
+# Stored evaluator outputs keyed by a fingerprint of each node's declared inputs, so a
+# re-grade only recomputes the nodes whose inputs changed
+INCREMENTAL_ENABLED = os.getenv("LLM_TUTOR_INCREMENTAL", "1") != "0"
+INCREMENTAL_PATH = os.getenv("LLM_TUTOR_INCREMENTAL_PATH", ".node_outputs.sqlite")
+INCREMENTAL_MAX_ENTRIES = _env_int("LLM_TUTOR_INCREMENTAL_MAX_ENTRIES", 100000)
+INCREMENTAL_MAX_AGE_DAYS = float(os.getenv("LLM_TUTOR_INCREMENTAL_MAX_AGE_DAYS", "30"))
+
+# Near-duplicate detection across a batch: MinHash over token shingles of the normalized code,
+# LSH bands to find candidate pairs, and the estimated similarity that flags a pair for review
+DUPLICATE_SHINGLE_SIZE = _env_int("LLM_TUTOR_DUPLICATE_SHINGLE_SIZE", 5)
+DUPLICATE_MINHASH_PERMUTATIONS = _env_int("LLM_TUTOR_DUPLICATE_PERMUTATIONS", 128)
+DUPLICATE_LSH_BANDS = _env_int("LLM_TUTOR_DUPLICATE_LSH_BANDS", 32)
+DUPLICATE_THRESHOLD = float(os.getenv("LLM_TUTOR_DUPLICATE_THRESHOLD", "0.8"))
+
+# Local index of past per-criterion requirement judgments: reused outright above the reuse
+# similarity, shown to the model as calibration examples above the few-shot similarity.
+# Off by default because it changes grades and prompts compared with judging every submission afresh
+CRITERION_INDEX_ENABLED = os.getenv("LLM_TUTOR_CRITERION_INDEX", "0") == "1"
+CRITERION_INDEX_PATH = os.getenv("LLM_TUTOR_CRITERION_INDEX_PATH", ".criterion_index.sqlite")
+CRITERION_INDEX_MAX_PER_CRITERION = _env_int("LLM_TUTOR_CRITERION_INDEX_MAX_PER_CRITERION", 2000)
+CRITERION_REUSE_SIMILARITY = float(os.getenv("LLM_TUTOR_CRITERION_REUSE_SIMILARITY", "0.97"))
+CRITERION_FEW_SHOT_SIMILARITY = float(os.getenv("LLM_TUTOR_CRITERION_FEW_SHOT_SIMILARITY", "0.75"))
+
+# Durable graph checkpoints used by main.py --checkpoint to resume interrupted runs
+CHECKPOINT_PATH = os.getenv("LLM_TUTOR_CHECKPOINT_PATH", ".checkpoints.sqlite")
+
+# Warm sandbox pool used by code_execution_node
+SANDBOX_TIMEOUT = float(os.getenv("LLM_TUTOR_SANDBOX_TIMEOUT", "30"))
+SANDBOX_MAX_JOBS_PER_WORKER = _env_int("LLM_TUTOR_SANDBOX_MAX_JOBS", 20)
+# Per-run resource limits for sandbox workers (0 disables a limit). Memory is headroom above
+# the warm worker's address space; the process cap counts every process of the grader's user,
+# so it is off by default
+SANDBOX_CPU_SECONDS = _env_int("LLM_TUTOR_SANDBOX_CPU_SECONDS", 20)
+SANDBOX_MEMORY_MB = _env_int("LLM_TUTOR_SANDBOX_MEMORY_MB", 2048)
+SANDBOX_MAX_OPEN_FILES = _env_int("LLM_TUTOR_SANDBOX_MAX_OPEN_FILES", 256)
+SANDBOX_MAX_PROCESSES = _env_int("LLM_TUTOR_SANDBOX_MAX_PROCESSES", 0)
+# stdout and stderr are each truncated past this many bytes
+SANDBOX_MAX_OUTPUT_BYTES = _env_int("LLM_TUTOR_SANDBOX_MAX_OUTPUT_BYTES", 1024 * 1024)
+SANDBOX_PRELOAD = [name for name in os.getenv(
+    "LLM_TUTOR_SANDBOX_PRELOAD",
+    "numpy,pandas,matplotlib,matplotlib.pyplot,seaborn,requests,bs4,spacy,textblob,wordcloud"
+).split(",") if name]
+
+# Overrides the "network" mode declared in requirements.json (live, record, replay, auto)
+NETWORK_MODE = os.getenv("LLM_TUTOR_NETWORK_MODE") or None
+
+# How syntax_style scores are produced: "llm" (graded by the LLM, the original behaviour),
+# "local" (static analysis only) or "hybrid" (local scores, LLM writes the explanation)
+SYNTAX_STYLE_MODE = os.getenv("LLM_TUTOR_SYNTAX_STYLE_MODE", "llm")
+
+# Token budgets for the code block in each agent's prompt
+PROMPT_TOKEN_BUDGETS = {
+    "syntax_style": _env_int("LLM_TUTOR_BUDGET_SYNTAX_STYLE", 6000),
+    "requirements": _env_int("LLM_TUTOR_BUDGET_REQUIREMENTS", 6000),
+    "visualization": _env_int("LLM_TUTOR_BUDGET_VISUALIZATION", 3000),
+}
+
+# "parser" asks for JSON in the prompt and parses the text; "structured" binds the
+# Pydantic models with the provider's native structured output (LLM_STRUCTURED_METHOD)
+OUTPUT_MODE = os.getenv("LLM_TUTOR_OUTPUT_MODE", "parser")
+LLM_STRUCTURED_METHOD = os.getenv("LLM_TUTOR_STRUCTURED_METHOD", "function_calling")
+
+# "separate" runs one LLM call per evaluator; "fused" sends the code once in a combined prompt
+EVALUATION_MODE = os.getenv("LLM_TUTOR_EVALUATION_MODE", "separate")
+
+# "single" judges every requirement in one call; "per_criterion" runs one small parallel call
+# per requirement and retries only the ones that failed, up to REQUIREMENTS_CRITERION_RETRIES times
+REQUIREMENTS_MODE = os.getenv("LLM_TUTOR_REQUIREMENTS_MODE", "single")
+REQUIREMENTS_CRITERION_RETRIES = _env_int("LLM_TUTOR_REQUIREMENTS_CRITERION_RETRIES", 1)
+
+# Provider batch API used for offline bulk grading (main.py --batch-api)
+BATCH_API_POLL_SECONDS = float(os.getenv("LLM_TUTOR_BATCH_API_POLL_SECONDS", "60"))
+BATCH_API_COMPLETION_WINDOW = os.getenv("LLM_TUTOR_BATCH_API_COMPLETION_WINDOW", "24h")
+
+# Long-running grading service (service.py)
+SERVICE_HOST = os.getenv("LLM_TUTOR_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = _env_int("LLM_TUTOR_SERVICE_PORT", 8000)
+SERVICE_WORKERS = _env_int("LLM_TUTOR_SERVICE_WORKERS", BATCH_WORKERS)
+SERVICE_MAX_JOBS = _env_int("LLM_TUTOR_SERVICE_MAX_JOBS", 1000)
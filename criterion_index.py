@@ -0,0 +1,162 @@
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from duplicates import normalized_tokens
+import config
+
+# Width of the hashing vectorizer; collisions at this size barely move cosine similarity
+DIMENSIONS = 1 << 20
+
+_index = None
+_index_lock = threading.Lock()
+
+def _feature(text: str) -> Tuple[int, float]:
+    digest = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+    return digest % DIMENSIONS, 1.0 if digest >> 63 else -1.0
+
+def embed_code(code: str) -> Dict[int, float]:
+    """Embeds code offline with a signed hashing vectorizer over normalized unigrams and bigrams.
+
+    Identifiers are normalized first (see duplicates.normalized_tokens), so renamed
+    variables do not lower the similarity of otherwise identical code.
+    """
+    tokens = [token for token in normalized_tokens(code) if token.strip()]
+    vector: Dict[int, float] = {}
+    for gram in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+        index, sign = _feature(gram)
+        vector[index] = vector.get(index, 0.0) + sign
+    norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+    return {index: value / norm for index, value in vector.items() if value}
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(index, 0.0) for index, value in a.items())
+
+def criterion_key(criterion: str, execution_success: bool) -> str:
+    """Groups judgments of the same criterion text, model and execution status."""
+    text = re.sub(r"\s+", " ", criterion.strip().lower())
+    payload = json.dumps([text, config.LLM_MODEL, bool(execution_success)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class CriterionIndex:
+    """Local vector index of past (criterion, code) judgments, persisted in SQLite.
+
+    Vectors are searched in memory per criterion; each criterion keeps at most
+    max_per_criterion judgments, dropping the oldest.
+    """
+
+    def __init__(self, path: str, max_per_criterion: Optional[int] = None):
+        self.path = path
+        self.max_per_criterion = max_per_criterion
+        self.reused = 0
+        self.few_shot = 0
+        self.cold = 0
+        self._lock = threading.Lock()
+        self._loaded: Dict[str, List[Tuple[Dict[int, float], Dict]]] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS judgments (
+                criterion_key TEXT,
+                criterion TEXT,
+                vector TEXT,
+                judgment TEXT,
+                created_at REAL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS judgments_by_key ON judgments (criterion_key, created_at)")
+        self._conn.commit()
+
+    def _entries(self, key: str) -> List[Tuple[Dict[int, float], Dict]]:
+        # Caller holds the lock
+        if key not in self._loaded:
+            rows = self._conn.execute(
+                "SELECT vector, judgment FROM judgments WHERE criterion_key = ? ORDER BY created_at", (key,)
+            ).fetchall()
+            self._loaded[key] = [
+                ({int(index): value for index, value in json.loads(vector).items()}, json.loads(judgment))
+                for vector, judgment in rows
+            ]
+        return self._loaded[key]
+
+    def search(self, key: str, vector: Dict[int, float], k: int = 1) -> List[Tuple[float, Dict]]:
+        """Returns the k most similar past judgments for a criterion as (similarity, judgment)."""
+        with self._lock:
+            entries = list(self._entries(key))
+        scored = [(cosine(vector, other), judgment) for other, judgment in entries]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:k]
+
+    def add(self, key: str, criterion: str, vector: Dict[int, float], judgment: Dict) -> None:
+        """Stores a judgment and trims the criterion to max_per_criterion entries."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO judgments VALUES (?, ?, ?, ?, ?)",
+                (key, criterion, json.dumps(vector), json.dumps(judgment), time.time())
+            )
+            entries = self._entries(key)
+            entries.append((vector, judgment))
+            if self.max_per_criterion is not None and len(entries) > self.max_per_criterion:
+                del entries[:len(entries) - self.max_per_criterion]
+                self._conn.execute(
+                    """DELETE FROM judgments WHERE criterion_key = ? AND rowid NOT IN (
+                        SELECT rowid FROM judgments WHERE criterion_key = ? ORDER BY created_at DESC LIMIT ?
+                    )""",
+                    (key, key, self.max_per_criterion)
+                )
+            self._conn.commit()
+
+    def tally(self, reused: int = 0, few_shot: int = 0, cold: int = 0) -> None:
+        """Counts how a submission's criteria were judged; called from concurrent evaluations."""
+        with self._lock:
+            self.reused += reused
+            self.few_shot += few_shot
+            self.cold += cold
+
+    def stats(self) -> Dict:
+        """Reports how criteria were judged in this process and the current index size."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM judgments").fetchone()[0]
+        return {"reused": self.reused, "few_shot": self.few_shot, "cold": self.cold, "entries": entries}
+
+def get_criterion_index() -> Optional[CriterionIndex]:
+    """Returns the shared criterion judgment index, opening it on first use."""
+    global _index
+    # Stub judgments must never be reused by a real run later
+    if not config.CRITERION_INDEX_ENABLED or config.LLM_STUB:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = CriterionIndex(config.CRITERION_INDEX_PATH, config.CRITERION_INDEX_MAX_PER_CRITERION)
+    return _index
+
+def match_criteria(index: CriterionIndex, criteria: List[str], code: str, execution_success: bool) -> List[Dict]:
+    """Finds the closest past judgment of each criterion for this code.
+
+    Returns one {"criterion", "key", "vector", "similarity", "judgment"} per
+    criterion; similarity is 0 and judgment None when nothing was judged yet.
+    """
+    vector = embed_code(code)
+    matches = []
+    for criterion in criteria:
+        key = criterion_key(criterion, execution_success)
+        best = index.search(key, vector, k=1)
+        similarity, judgment = best[0] if best else (0.0, None)
+        matches.append({"criterion": criterion, "key": key, "vector": vector,
+                        "similarity": similarity, "judgment": judgment})
+    return matches
+
+def record_judgments(index: CriterionIndex, matches: List[Dict], judgments: List[Dict]) -> None:
+    """Stores fresh judgments, pairing them with criteria by position (or by text if counts differ)."""
+    if len(judgments) != len(matches):
+        by_text = {re.sub(r"\s+", " ", j.get("criterion", "").strip().lower()): j for j in judgments}
+        judgments = [by_text.get(re.sub(r"\s+", " ", m["criterion"].strip().lower())) for m in matches]
+    for match, judgment in zip(matches, judgments):
+        if judgment is not None:
+            index.add(match["key"], match["criterion"], match["vector"],
+                      {"score": judgment["score"], "rationale": judgment["rationale"]})
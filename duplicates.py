@@ -0,0 +1,159 @@
+import ast
+import builtins
+import hashlib
+import io
+import random
+import threading
+import tokenize
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Tuple
+import config
+
+# Hash family for MinHash: h_i(x) = (a_i * x + b_i) mod a Mersenne prime
+_PRIME = (1 << 61) - 1
+_BUILTINS = set(dir(builtins))
+
+_CACHE_SIZE = 2048
+_cache: "OrderedDict[str, Dict]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+class _Renamer(ast.NodeTransformer):
+    """Renames the submission's own identifiers to v0, v1, ... in order of first appearance."""
+
+    def __init__(self):
+        self.names: Dict[str, str] = {}
+
+    def _canonical(self, name: str) -> str:
+        if name in _BUILTINS:
+            return name
+        if name not in self.names:
+            self.names[name] = f"v{len(self.names)}"
+        return self.names[name]
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        node.id = self._canonical(node.id)
+        return node
+
+    def visit_arg(self, node: ast.arg) -> ast.AST:
+        node.arg = self._canonical(node.arg)
+        node.annotation = None
+        return node
+
+    def visit_alias(self, node: ast.alias) -> ast.AST:
+        # Module names stay, only what they are bound to locally is renamed
+        if node.asname:
+            node.asname = self._canonical(node.asname)
+        return node
+
+    def _visit_definition(self, node):
+        node.name = self._canonical(node.name)
+        _strip_docstring(node)
+        return self.generic_visit(node)
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _visit_definition
+
+def _strip_docstring(node) -> None:
+    body = node.body
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+            and isinstance(body[0].value.value, str):
+        node.body = body[1:] or [ast.Pass()]
+
+def _raw_tokens(code: str) -> List[str]:
+    """Tokens without comments or layout, for code that does not parse."""
+    skipped = {tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT,
+               tokenize.ENCODING, tokenize.ENDMARKER}
+    try:
+        return [token.string for token in tokenize.generate_tokens(io.StringIO(code).readline)
+                if token.type not in skipped]
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return code.split()
+
+def normalized_tokens(code: str) -> List[str]:
+    """Tokenizes code after dropping comments, docstrings, formatting and identifier names.
+
+    Two files that differ only in whitespace, comments or variable names produce
+    the same token list.
+    """
+    try:
+        tree = ast.parse(code)
+        _strip_docstring(tree)
+        canonical = ast.unparse(_Renamer().visit(tree))
+    except (SyntaxError, ValueError, RecursionError):
+        return _raw_tokens(code)
+    skipped = {tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER}
+    return [token.string or tokenize.tok_name[token.type]
+            for token in tokenize.generate_tokens(io.StringIO(canonical).readline)
+            if token.type not in skipped]
+
+def _shingles(tokens: List[str], size: int) -> set:
+    if len(tokens) <= size:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+def _hash_family(count: int) -> List[Tuple[int, int]]:
+    rng = random.Random(1)
+    return [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(count)]
+
+_HASHES = _hash_family(config.DUPLICATE_MINHASH_PERMUTATIONS)
+
+def minhash(shingles: set) -> List[int]:
+    """MinHash signature of a shingle set; matching positions estimate Jaccard similarity."""
+    values = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles]
+    return [min((a * value + b) % _PRIME for value in values) for a, b in _HASHES]
+
+def fingerprint_code(code: str) -> Dict:
+    """Returns the normalized hash and MinHash signature of a submission, cached by code hash."""
+    key = hashlib.sha256(code.encode("utf-8")).hexdigest()
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    tokens = normalized_tokens(code)
+    result = {
+        "normalized_hash": hashlib.sha256(" ".join(tokens).encode("utf-8")).hexdigest(),
+        "signature": minhash(_shingles(tokens, config.DUPLICATE_SHINGLE_SIZE))
+    }
+    with _cache_lock:
+        _cache[key] = result
+        if len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+def similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+def analyze_cohort(codes: Dict[str, str], threshold: float = None) -> Dict:
+    """Groups a batch's submissions into exact (normalized) duplicates and near-duplicate pairs.
+
+    Candidate pairs come from LSH buckets over signature bands, so only likely
+    matches are compared; pairs at or above threshold are reported for review.
+    """
+    threshold = config.DUPLICATE_THRESHOLD if threshold is None else threshold
+    fingerprints = {name: fingerprint_code(code) for name, code in codes.items()}
+
+    by_hash = defaultdict(list)
+    for name, fp in fingerprints.items():
+        by_hash[fp["normalized_hash"]].append(name)
+    exact = [sorted(group) for group in by_hash.values() if len(group) > 1]
+
+    rows = max(1, len(_HASHES) // config.DUPLICATE_LSH_BANDS)
+    buckets = defaultdict(set)
+    for name, fp in fingerprints.items():
+        for band in range(0, len(_HASHES), rows):
+            buckets[(band, tuple(fp["signature"][band:band + rows]))].add(name)
+
+    candidates = set()
+    for members in buckets.values():
+        members = sorted(members)
+        candidates.update((a, b) for i, a in enumerate(members) for b in members[i + 1:])
+
+    near = []
+    for a, b in sorted(candidates):
+        if fingerprints[a]["normalized_hash"] == fingerprints[b]["normalized_hash"]:
+            continue
+        score = similarity(fingerprints[a]["signature"], fingerprints[b]["signature"])
+        if score >= threshold:
+            near.append({"files": [a, b], "similarity": round(score, 3)})
+    near.sort(key=lambda pair: pair["similarity"], reverse=True)
+    return {"exact_groups": sorted(exact), "near_duplicates": near}
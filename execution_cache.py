@@ -0,0 +1,117 @@
+import ast
+import hashlib
+import json
+import os
+import platform
+import sys
+from functools import lru_cache
+from importlib import metadata
+from typing import Dict, Iterable, List, Optional
+from sqlite_store import SQLiteStore, SharedStore
+import config
+
+# Directories referenced by a submission are hashed only up to this many files
+MAX_DIRECTORY_FILES = 500
+
+class ExecutionCache(SQLiteStore):
+    """Persistent SQLite cache of sandbox execution results keyed by code, inputs and environment."""
+
+    def __init__(self, path: str, max_entries: Optional[int] = None, max_age_seconds: Optional[float] = None):
+        super().__init__(path, "executions", "result", max_entries=max_entries, max_age_seconds=max_age_seconds)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Returns the cached execution result for a key, or None on a miss."""
+        result = super().get(key)
+        return json.loads(result) if result is not None else None
+
+    def put(self, key: str, result: Dict) -> None:
+        """Stores an execution result and evicts entries beyond the configured limits."""
+        super().put(key, json.dumps(result))
+
+_cache = SharedStore(lambda: ExecutionCache(
+    config.EXECUTION_CACHE_PATH,
+    max_entries=config.EXECUTION_CACHE_MAX_ENTRIES,
+    max_age_seconds=config.EXECUTION_CACHE_MAX_AGE_DAYS * 86400
+), enabled=config.EXECUTION_CACHE_ENABLED)
+
+def set_execution_cache_enabled(enabled: bool) -> None:
+    """Turns the persistent execution cache on or off for this process."""
+    _cache.enabled = enabled
+
+def get_execution_cache() -> Optional[ExecutionCache]:
+    """Returns the shared execution cache, opening it on first use."""
+    return _cache.get()
+
+@lru_cache(maxsize=None)
+def environment_fingerprint() -> str:
+    """Hashes the interpreter version and every installed package version."""
+    packages = sorted(
+        f"{dist.metadata['Name']}=={dist.version}".lower()
+        for dist in metadata.distributions() if dist.metadata["Name"]
+    )
+    payload = json.dumps([sys.version, platform.platform(), packages])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _string_literals(code: str) -> Iterable[str]:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    return {node.value for node in ast.walk(tree)
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and 0 < len(node.value) < 260}
+
+def _files_under(path: str) -> List[str]:
+    if os.path.isfile(path):
+        return [path]
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs.sort()
+        files.extend(os.path.join(root, name) for name in sorted(names))
+        if len(files) >= MAX_DIRECTORY_FILES:
+            break
+    return files[:MAX_DIRECTORY_FILES]
+
+def referenced_files(code: str, base_dirs: Iterable[str]) -> List[str]:
+    """Finds the data files a submission names in string literals (files or whole directories)."""
+    found = set()
+    for literal in _string_literals(code):
+        if "\n" in literal:
+            continue
+        for base in base_dirs:
+            base = os.path.normpath(base)
+            candidate = os.path.normpath(os.path.join(base, literal))
+            # Directories are only followed inside the submission or working directory
+            if os.path.isfile(candidate) or (os.path.isdir(candidate) and candidate.startswith(base + os.sep)):
+                found.update(_files_under(candidate))
+                break
+    return sorted(found)
+
+def _hash_files(digest, paths: Iterable[str]) -> None:
+    for path in paths:
+        digest.update(path.encode("utf-8"))
+        try:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        except OSError:
+            digest.update(b"<unreadable>")
+
+def execution_key(code: str, file_path: Optional[str], options: Dict, limits: Dict) -> str:
+    """Hashes everything that determines an execution result into a cache key.
+
+    Covers the code, the data files it references (looked up next to the
+    submission and in the working directory), recorded network fixtures, the
+    sandbox options and limits, and the environment fingerprint.
+    """
+    base_dirs = [os.getcwd()]
+    if file_path:
+        base_dirs.insert(0, os.path.dirname(os.path.abspath(file_path)))
+    digest = hashlib.sha256()
+    digest.update(code.encode("utf-8"))
+    _hash_files(digest, referenced_files(code, base_dirs))
+    network = options.get("network")
+    if network and os.path.isdir(network["fixtures"]):
+        _hash_files(digest, _files_under(network["fixtures"]))
+    digest.update(json.dumps([options, limits, config.SANDBOX_TIMEOUT], sort_keys=True).encode("utf-8"))
+    digest.update(environment_fingerprint().encode("utf-8"))
+    return digest.hexdigest()
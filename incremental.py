@@ -0,0 +1,168 @@
+import ast
+import functools
+import hashlib
+import inspect
+import json
+import os
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+from sqlite_store import SQLiteStore, SharedStore
+import config
+import tracing
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# The evaluator nodes live here; editing it or any local module it imports, directly or not,
+# invalidates every stored output
+EVALUATOR_MODULE = "agents"
+
+_reuse_enabled = True
+_current_run: ContextVar[Optional[Dict]] = ContextVar("current_node_run", default=None)
+
+class NodeOutputStore(SQLiteStore):
+    """Persistent SQLite store of node outputs keyed by node name and a fingerprint of its inputs."""
+
+    def __init__(self, path: str, max_entries: Optional[int] = None, max_age_seconds: Optional[float] = None):
+        super().__init__(path, "outputs", "outputs", max_entries=max_entries, max_age_seconds=max_age_seconds)
+
+    def load(self, node: str, fingerprint: str) -> Optional[Dict]:
+        """Returns the stored outputs of a node for these inputs, or None if they went stale."""
+        outputs = self.get(f"{node}:{fingerprint}")
+        return json.loads(outputs) if outputs is not None else None
+
+    def save(self, node: str, fingerprint: str, outputs: Dict) -> None:
+        """Stores a node's outputs and evicts entries beyond the configured limits."""
+        self.put(f"{node}:{fingerprint}", json.dumps(outputs))
+
+    def stats(self) -> Dict:
+        """Reports reuse counters for this process and the current store size."""
+        return {"reused": self.hits, "recomputed": self.misses, "entries": self.count()}
+
+_store = SharedStore(lambda: NodeOutputStore(
+    config.INCREMENTAL_PATH,
+    max_entries=config.INCREMENTAL_MAX_ENTRIES,
+    max_age_seconds=config.INCREMENTAL_MAX_AGE_DAYS * 86400
+), enabled=config.INCREMENTAL_ENABLED)
+
+def set_reuse_enabled(enabled: bool) -> None:
+    """With reuse off every evaluator runs again and refreshes its stored outputs."""
+    global _reuse_enabled
+    _reuse_enabled = enabled
+
+def get_node_store() -> Optional[NodeOutputStore]:
+    """Returns the shared node output store, opening it on first use."""
+    # Stub evaluations must never be reused by a real run later
+    if config.LLM_STUB:
+        return None
+    return _store.get()
+
+def code_files(module: str = EVALUATOR_MODULE) -> List[str]:
+    """Lists the repository modules a module imports, directly or not, including itself."""
+    seen = set()
+    pending = [module]
+    while pending:
+        name = pending.pop()
+        path = os.path.join(HERE, f"{name}.py")
+        if name in seen or not os.path.exists(path):
+            continue
+        seen.add(name)
+        with open(path, "rb") as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name.split(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(node.module.split(".")[0])
+    return sorted(f"{name}.py" for name in seen)
+
+@functools.lru_cache(maxsize=None)
+def _code_version() -> str:
+    digest = hashlib.sha256()
+    for name in code_files():
+        digest.update(name.encode("utf-8"))
+        with open(os.path.join(HERE, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def _lookup(state: Dict, path: str):
+    value = state
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+def fingerprint(state: Dict, inputs: List[str], settings: List[str]) -> str:
+    """Hashes the declared state inputs (dotted paths into the state), config settings and code version."""
+    payload = json.dumps({
+        "inputs": {path: _lookup(state, path) for path in inputs},
+        "settings": {name: getattr(config, name) for name in settings},
+        "code": _code_version()
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def mark_fallback() -> None:
+    """Flags the running node's output as a failure fallback, which must be recomputed next time."""
+    run = _current_run.get()
+    if run is not None:
+        run["fallback"] = True
+
+def _reuse(name: str, store: NodeOutputStore, key: str) -> Optional[Dict]:
+    if not _reuse_enabled:
+        store.misses += 1
+        return None
+    outputs = store.load(name, key)
+    if outputs is not None:
+        print(f"Reusing {name} (inputs unchanged)")
+        tracing.annotate(reused=True)
+    return outputs
+
+def _keep(name: str, store: NodeOutputStore, key: str, run: Dict, result: Dict, outputs: List[str]) -> None:
+    if not run["fallback"]:
+        store.save(name, key, {field: result[field] for field in outputs if field in result})
+
+def incremental_node(name: str, fn: Callable, inputs: List[str], outputs: List[str],
+                     settings: Optional[List[str]] = None) -> Callable:
+    """Wraps a graph node (sync or async) so it only runs when its declared inputs changed.
+
+    The node's declared outputs are stored under a fingerprint of its inputs; on a
+    re-grade with the same fingerprint they are returned as the node's update.
+    """
+    settings = settings or []
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def run_async(state):
+            store = get_node_store()
+            if store is None:
+                return await fn(state)
+            key = fingerprint(state, inputs, settings)
+            stored = _reuse(name, store, key)
+            if stored is not None:
+                return stored
+            run = {"fallback": False}
+            token = _current_run.set(run)
+            try:
+                result = await fn(state)
+            finally:
+                _current_run.reset(token)
+            _keep(name, store, key, run, result, outputs)
+            return result
+        return run_async
+
+    @functools.wraps(fn)
+    def run_sync(state):
+        store = get_node_store()
+        if store is None:
+            return fn(state)
+        key = fingerprint(state, inputs, settings)
+        stored = _reuse(name, store, key)
+        if stored is not None:
+            return stored
+        run = {"fallback": False}
+        token = _current_run.set(run)
+        try:
+            result = fn(state)
+        finally:
+            _current_run.reset(token)
+        _keep(name, store, key, run, result, outputs)
+        return result
+    return run_sync
@@ -0,0 +1,191 @@
+import time
+from functools import lru_cache
+from typing import Callable, Optional, Type
+from pydantic import BaseModel, ValidationError
+from concurrency import llm_slot, allm_slot
+from llm_cache import LLMCache
+from sqlite_store import SharedStore
+from prompt_compaction import count_tokens
+from rate_limiter import get_rate_limiter
+from structured_output import raw_arguments, broken_fields, repair_schema, repair_prompt
+import config
+import tracing
+
+_cache = SharedStore(lambda: LLMCache(
+    config.LLM_CACHE_PATH,
+    max_entries=config.LLM_CACHE_MAX_ENTRIES,
+    max_age_seconds=config.LLM_CACHE_MAX_AGE_DAYS * 86400
+), enabled=config.LLM_CACHE_ENABLED)
+
+@lru_cache(maxsize=None)
+def get_llm(model: str = config.LLM_MODEL, temperature: float = config.LLM_TEMPERATURE):
+    """Returns a long-lived chat client shared by all agents, backed by pooled HTTP connections."""
+    if config.LLM_STUB:
+        from stub_llm import StubChatModel
+        return StubChatModel()
+    # Imported here so runs that never reach an LLM node skip loading the client libraries
+    import httpx
+    from langchain_openai import ChatOpenAI
+    limits = httpx.Limits(
+        max_connections=config.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=config.LLM_MAX_CONNECTIONS
+    )
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        # Retries are handled by the shared rate limiter
+        max_retries=0,
+        http_client=httpx.Client(limits=limits),
+        http_async_client=httpx.AsyncClient(limits=limits)
+    )
+
+def set_cache_enabled(enabled: bool) -> None:
+    """Turns the persistent completion cache on or off for this process."""
+    _cache.enabled = enabled
+
+def get_cache() -> Optional[LLMCache]:
+    """Returns the shared completion cache, opening it on first use."""
+    # Stub answers must never be served to a real run later
+    if config.LLM_STUB:
+        return None
+    return _cache.get()
+
+def _estimated_tokens(prompt: str) -> int:
+    return count_tokens(prompt) + config.LLM_COMPLETION_TOKENS_ESTIMATE
+
+def _used_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+def _record_usage(response):
+    """Adds a response's token counts to the current trace span and returns it."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    tracing.add("prompt_tokens", usage.get("input_tokens", 0))
+    tracing.add("completion_tokens", usage.get("output_tokens", 0))
+    return response
+
+@lru_cache(maxsize=None)
+def _structured_llm(schema: Type[BaseModel]):
+    """Returns the shared client bound to a Pydantic schema via native structured output."""
+    return get_llm().with_structured_output(schema, method=config.LLM_STRUCTURED_METHOD, include_raw=True)
+
+def _complete(prompt: str, schema: Optional[Type[BaseModel]] = None):
+    """Sends one prompt through the rate limiter and returns the model's message."""
+    def attempt():
+        waiting = time.perf_counter()
+        with llm_slot():
+            tracing.add("queue_wait_ms", (time.perf_counter() - waiting) * 1000)
+            if schema is None:
+                return get_llm().invoke(prompt)
+            return _structured_llm(schema).invoke(prompt)["raw"]
+
+    return _record_usage(get_rate_limiter().call(attempt, tokens=_estimated_tokens(prompt), usage=_used_tokens))
+
+async def _acomplete(prompt: str, schema: Optional[Type[BaseModel]] = None):
+    """Async variant of _complete."""
+    async def attempt():
+        waiting = time.perf_counter()
+        async with allm_slot():
+            tracing.add("queue_wait_ms", (time.perf_counter() - waiting) * 1000)
+            if schema is None:
+                return await get_llm().ainvoke(prompt)
+            return (await _structured_llm(schema).ainvoke(prompt))["raw"]
+
+    return _record_usage(await get_rate_limiter().acall(attempt, tokens=_estimated_tokens(prompt), usage=_used_tokens))
+
+def _invoke_structured(prompt: str, schema: Type[BaseModel]) -> str:
+    """Gets a schema-valid response, re-asking once for just the fields that failed validation."""
+    arguments = raw_arguments(_complete(prompt, schema))
+    try:
+        return schema.model_validate(arguments).model_dump_json()
+    except ValidationError as e:
+        fields = broken_fields(schema, e)
+        print(f"Repairing {', '.join(sorted(fields))} in {schema.__name__} response")
+        fix = _complete(repair_prompt(arguments, fields, e), repair_schema(schema, fields))
+        arguments.update(raw_arguments(fix))
+        return schema.model_validate(arguments).model_dump_json()
+
+async def _ainvoke_structured(prompt: str, schema: Type[BaseModel]) -> str:
+    """Async variant of _invoke_structured."""
+    arguments = raw_arguments(await _acomplete(prompt, schema))
+    try:
+        return schema.model_validate(arguments).model_dump_json()
+    except ValidationError as e:
+        fields = broken_fields(schema, e)
+        print(f"Repairing {', '.join(sorted(fields))} in {schema.__name__} response")
+        fix = await _acomplete(repair_prompt(arguments, fields, e), repair_schema(schema, fields))
+        arguments.update(raw_arguments(fix))
+        return schema.model_validate(arguments).model_dump_json()
+
+def _cache_template_id(template_id: str, schema: Optional[Type[BaseModel]]) -> str:
+    # Structured and free-text completions of the same prompt are cached separately
+    return f"{template_id}:structured" if schema is not None else template_id
+
+def _cached(cache: LLMCache, key: str, validate: Optional[Callable[[str], object]]) -> Optional[str]:
+    """Returns a cached completion, dropping it instead if it no longer passes validation."""
+    cached = cache.get(key)
+    if cached is not None and validate is not None:
+        try:
+            validate(cached)
+        except Exception:
+            cache.invalidate(key)
+            return None
+    return cached
+
+def _store(cache: LLMCache, key: str, content: str, template_id: str,
+           validate: Optional[Callable[[str], object]]) -> None:
+    """Caches a completion only once it passes validation; an invalid one raises and is not stored."""
+    if validate is not None:
+        validate(content)
+    cache.put(key, content, template_id=template_id, model=config.LLM_MODEL)
+
+def invoke_llm(template_id: str, prompt: str, schema: Optional[Type[BaseModel]] = None,
+               validate: Optional[Callable[[str], object]] = None) -> str:
+    """Returns the completion for a rendered prompt, from the cache when possible.
+
+    When a schema is given and OUTPUT_MODE is "structured", the model is bound to
+    it with native structured output and the validated result is returned as JSON.
+    validate should raise for a completion the caller cannot parse; such
+    completions are never cached, so a re-grade asks the model again.
+    """
+    schema = schema if config.OUTPUT_MODE == "structured" else None
+    template_id = _cache_template_id(template_id, schema)
+    with tracing.span("llm", kind="llm", template_id=template_id, model=config.LLM_MODEL) as attributes:
+        cache = get_cache()
+        key = LLMCache.make_key(template_id, config.LLM_MODEL, config.LLM_TEMPERATURE, prompt)
+        if cache is not None:
+            cached = _cached(cache, key, validate)
+            if cached is not None:
+                attributes["cache_hit"] = True
+                return cached
+
+        content = _invoke_structured(prompt, schema) if schema is not None else _complete(prompt).content
+
+        if cache is not None:
+            _store(cache, key, content, template_id, validate)
+        return content
+
+async def ainvoke_llm(template_id: str, prompt: str, schema: Optional[Type[BaseModel]] = None,
+                      validate: Optional[Callable[[str], object]] = None) -> str:
+    """Async variant of invoke_llm using the shared client's ainvoke."""
+    schema = schema if config.OUTPUT_MODE == "structured" else None
+    template_id = _cache_template_id(template_id, schema)
+    with tracing.span("llm", kind="llm", template_id=template_id, model=config.LLM_MODEL) as attributes:
+        cache = get_cache()
+        key = LLMCache.make_key(template_id, config.LLM_MODEL, config.LLM_TEMPERATURE, prompt)
+        if cache is not None:
+            cached = _cached(cache, key, validate)
+            if cached is not None:
+                attributes["cache_hit"] = True
+                return cached
+
+        content = await _ainvoke_structured(prompt, schema) if schema is not None else (await _acomplete(prompt)).content
+
+        if cache is not None:
+            _store(cache, key, content, template_id, validate)
+        return content
+
+def complete_text(prompt: str) -> str:
+    """Returns a fresh free-text completion through the rate limiter, bypassing the completion cache."""
+    with tracing.span("llm", kind="llm", model=config.LLM_MODEL):
+        return _complete(prompt).content
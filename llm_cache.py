@@ -0,0 +1,21 @@
+import hashlib
+import json
+from typing import Optional
+from sqlite_store import SQLiteStore
+
+class LLMCache(SQLiteStore):
+    """Persistent SQLite cache of LLM completions keyed by a hash of the request."""
+
+    def __init__(self, path: str, max_entries: Optional[int] = None, max_age_seconds: Optional[float] = None):
+        super().__init__(path, "completions", "content", max_entries=max_entries,
+                         max_age_seconds=max_age_seconds, metadata=("template_id", "model"))
+
+    @staticmethod
+    def make_key(template_id: str, model: str, temperature: float, prompt: str) -> str:
+        """Hashes everything that determines a completion into a cache key."""
+        payload = json.dumps([template_id, model, temperature, prompt])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def put(self, key: str, content: str, template_id: str = "", model: str = "") -> None:
+        """Stores a completion and evicts entries beyond the configured limits."""
+        super().put(key, content, template_id=template_id, model=model)
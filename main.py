@@ -1,25 +1,59 @@
 import os
 import json
 import sys
+import glob
+import time
+import asyncio
 import argparse
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, List, Optional
 from state import EvaluationState
-from workflow import build_evaluation_workflow
+from concurrency import configure_limits
+from llm import get_cache, set_cache_enabled
+from execution_cache import get_execution_cache, set_execution_cache_enabled
+from incremental import get_node_store, set_reuse_enabled
+from criterion_index import get_criterion_index
+from rate_limiter import configure_rate_limits, get_rate_limiter
+from report import render_update
+from duplicates import analyze_cohort
+import config
+import tracing
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def evaluate_assignment(file_path: str, requirements_file: str) -> Dict:
-    """Main function to evaluate a student assignment."""
+def compile_graph(use_async: bool = False, checkpointer=None):
+    """Builds and compiles the evaluation graph, importing langgraph and the agents on first use."""
+    from workflow import build_evaluation_workflow
+    return build_evaluation_workflow(use_async=use_async).compile(checkpointer=checkpointer)
+
+def open_checkpointer(path: Optional[str]):
+    """Context manager yielding a durable checkpointer for path, or None without one."""
+    if not path:
+        return nullcontext()
+    from checkpointing import sqlite_checkpointer
+    return sqlite_checkpointer(path)
+
+def aopen_checkpointer(path: Optional[str]):
+    """Async counterpart of open_checkpointer."""
+    if not path:
+        return nullcontext()
+    from checkpointing import async_sqlite_checkpointer
+    return async_sqlite_checkpointer(path)
+
+def build_initial_state(file_path: str, requirements: Dict) -> EvaluationState:
+    """Reads a submission from disk and builds the initial graph state for it."""
     with open(file_path, 'r') as f:
         code = f.read()
-    
+
     student_name = os.path.basename(file_path).split('_')[0]
-    
-    with open(requirements_file, 'r') as f:
-        requirements = json.load(f)
-    
-    initial_state = EvaluationState(
+
+    return initial_state_for(code, file_path, student_name, requirements)
+
+def initial_state_for(code: str, file_path: str, student_name: str, requirements: Dict) -> EvaluationState:
+    """Builds the initial graph state for submitted code."""
+    return EvaluationState(
         student_code=code,
         file_path=file_path,
         student_name=student_name,
@@ -33,58 +67,488 @@ def evaluate_assignment(file_path: str, requirements_file: str) -> Dict:
         feedback="",
         error_analysis=None
     )
-    
-    workflow = build_evaluation_workflow()
-    graph = workflow.compile()
-    final_state = graph.invoke(initial_state)
-    
+
+def load_requirements(requirements_file: str) -> Dict:
+    """Loads the requirements JSON, resolving its network fixture directory next to the file."""
+    with open(requirements_file, 'r') as f:
+        requirements = json.load(f)
+
+    network = requirements.get("network")
+    if network:
+        base_dir = os.path.dirname(os.path.abspath(requirements_file))
+        requirements["network"] = {
+            **network,
+            "fixtures": os.path.join(base_dir, network.get("fixtures", "fixtures"))
+        }
+    return requirements
+
+def summarize_state(final_state: EvaluationState) -> Dict:
+    """Extracts the reported fields from a finished evaluation."""
     return {
         "student_name": final_state["student_name"],
         "final_score": final_state["final_score"],
         "feedback": final_state["feedback"],
         "error_analysis": final_state["error_analysis"]
     }
-    
-    
+
+def evaluate_assignment(file_path: str, requirements_file: str, graph=None, checkpoint_path: Optional[str] = None) -> Dict:
+    """Main function to evaluate a student assignment."""
+    requirements = load_requirements(requirements_file)
+
+    initial_state = build_initial_state(file_path, requirements)
+
+    if graph is None:
+        with open_checkpointer(checkpoint_path) as checkpointer:
+            return evaluate_assignment(file_path, requirements_file, compile_graph(checkpointer=checkpointer))
+
+    with tracing.trace(initial_state["student_name"], file_path=file_path) as run:
+        if graph.checkpointer:
+            from checkpointing import invoke_checkpointed
+            final_state = invoke_checkpointed(graph, initial_state)
+        else:
+            final_state = graph.invoke(initial_state)
+
+    return {**summarize_state(final_state), "trace": tracing.summarize(run.spans)}
+
+async def aevaluate_assignment(file_path: str, requirements_file: str, graph=None,
+                               checkpoint_path: Optional[str] = None) -> Dict:
+    """Async variant of evaluate_assignment that drives the graph with ainvoke."""
+    requirements = load_requirements(requirements_file)
+
+    initial_state = build_initial_state(file_path, requirements)
+
+    if graph is None:
+        async with aopen_checkpointer(checkpoint_path) as checkpointer:
+            graph = compile_graph(use_async=True, checkpointer=checkpointer)
+            return await aevaluate_assignment(file_path, requirements_file, graph)
+
+    with tracing.trace(initial_state["student_name"], file_path=file_path) as run:
+        if graph.checkpointer:
+            from checkpointing import ainvoke_checkpointed
+            final_state = await ainvoke_checkpointed(graph, initial_state)
+        else:
+            final_state = await graph.ainvoke(initial_state)
+
+    return {**summarize_state(final_state), "trace": tracing.summarize(run.spans)}
+
+class StreamPrinter:
+    """Prints report sections as graph nodes finish, with a live token counter on stderr."""
+
+    def __init__(self):
+        self.tokens: Dict[str, int] = {}
+        self.state: Dict = {}
+
+    def _clear_progress(self) -> None:
+        if self.tokens:
+            sys.stderr.write("\r\033[K")
+            sys.stderr.flush()
+
+    def handle(self, mode: str, chunk) -> None:
+        """Consumes one (mode, chunk) pair from graph.stream(stream_mode=["updates", "messages"])."""
+        if mode == "messages":
+            message, metadata = chunk
+            node = metadata.get("langgraph_node", "llm")
+            self.tokens[node] = self.tokens.get(node, 0) + 1
+            progress = ", ".join(f"{name} {count} tokens" for name, count in self.tokens.items())
+            sys.stderr.write(f"\r\033[K[streaming] {progress}")
+            sys.stderr.flush()
+            return
+
+        for node, update in chunk.items():
+            if not update:
+                continue
+            self.state.update(update)
+            lines = render_update(node, update)
+            if lines:
+                self._clear_progress()
+                self.tokens.pop(node, None)
+                print("\n".join(lines), flush=True)
+
+def stream_assignment(file_path: str, requirements_file: str, graph=None) -> Dict:
+    """Evaluates a submission while printing each report section as soon as it is ready."""
+    initial_state = build_initial_state(file_path, load_requirements(requirements_file))
+    if graph is None:
+        graph = compile_graph()
+
+    printer = StreamPrinter()
+    printer.state.update(initial_state)
+    print(f"# Evaluation for {initial_state['student_name']}", flush=True)
+    with tracing.trace(initial_state["student_name"], file_path=file_path) as run:
+        for mode, chunk in graph.stream(initial_state, stream_mode=["updates", "messages"]):
+            printer.handle(mode, chunk)
+    return {**summarize_state(printer.state), "trace": tracing.summarize(run.spans)}
+
+async def astream_assignment(file_path: str, requirements_file: str, graph=None) -> Dict:
+    """Async variant of stream_assignment driving the graph with astream."""
+    initial_state = build_initial_state(file_path, load_requirements(requirements_file))
+    if graph is None:
+        graph = compile_graph(use_async=True)
+
+    printer = StreamPrinter()
+    printer.state.update(initial_state)
+    print(f"# Evaluation for {initial_state['student_name']}", flush=True)
+    with tracing.trace(initial_state["student_name"], file_path=file_path) as run:
+        async for mode, chunk in graph.astream(initial_state, stream_mode=["updates", "messages"]):
+            printer.handle(mode, chunk)
+    return {**summarize_state(printer.state), "trace": tracing.summarize(run.spans)}
+
+def collect_submissions(pattern: str) -> List[str]:
+    """Expands a directory or glob pattern into a sorted list of submission files."""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.py")
+    return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+
+def evaluate_batch(file_paths: List[str], requirements_file: str, max_workers: Optional[int] = None,
+                   checkpoint_path: Optional[str] = None) -> Dict:
+    """Evaluates many submissions concurrently against a single compiled graph."""
+    with open_checkpointer(checkpoint_path) as checkpointer:
+        return _evaluate_batch(file_paths, requirements_file, compile_graph(checkpointer=checkpointer), max_workers)
+
+def detect_duplicates(file_paths: List[str]) -> Dict:
+    """Groups a batch's submissions into exact (normalized) duplicates and near-duplicate pairs."""
+    codes = {}
+    for file_path in file_paths:
+        try:
+            with open(file_path, 'r') as f:
+                codes[file_path] = f.read()
+        except (OSError, UnicodeDecodeError):
+            pass
+    return analyze_cohort(codes)
+
+def _grading_waves(file_paths: List[str], duplicates: Dict) -> List[List[str]]:
+    """Grades one submission per exact-duplicate group first, so the rest reuse its evaluations."""
+    later = {path for group in duplicates["exact_groups"] for path in group[1:]}
+    waves = [[path for path in file_paths if path not in later], [path for path in file_paths if path in later]]
+    return [wave for wave in waves if wave]
+
+def _annotate_duplicates(results: List[Dict], duplicates: Dict) -> None:
+    for group in duplicates["exact_groups"]:
+        for result in results:
+            if result["file_path"] in group[1:]:
+                result["duplicate_of"] = group[0]
+    for pair in duplicates["near_duplicates"]:
+        for result in results:
+            if result["file_path"] in pair["files"]:
+                other = next(path for path in pair["files"] if path != result["file_path"])
+                result.setdefault("similar_to", []).append({"file_path": other, "similarity": pair["similarity"]})
+
+def _evaluate_batch(file_paths: List[str], requirements_file: str, graph, max_workers: Optional[int]) -> Dict:
+    """Grades every file on one compiled graph, one wave of duplicates at a time."""
+    def evaluate_one(file_path: str) -> Dict:
+        try:
+            result = evaluate_assignment(file_path, requirements_file, graph=graph)
+        except Exception as e:
+            print(f"Error evaluating {file_path}: {str(e)}")
+            result = {
+                "student_name": os.path.basename(file_path).split('_')[0],
+                "final_score": None,
+                "feedback": "",
+                "error_analysis": None,
+                "error": str(e)
+            }
+        return {"file_path": file_path, **result}
+
+    start = time.perf_counter()
+    duplicates = detect_duplicates(file_paths)
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers or config.BATCH_WORKERS) as executor:
+        for wave in _grading_waves(file_paths, duplicates):
+            results.update(zip(wave, executor.map(evaluate_one, wave)))
+    elapsed = time.perf_counter() - start
+
+    return summarize_batch([results[path] for path in file_paths], elapsed, duplicates)
+
+async def aevaluate_batch(file_paths: List[str], requirements_file: str, max_workers: Optional[int] = None,
+                          checkpoint_path: Optional[str] = None) -> Dict:
+    """Evaluates many submissions as concurrent coroutines on a single event loop."""
+    async with aopen_checkpointer(checkpoint_path) as checkpointer:
+        graph = compile_graph(use_async=True, checkpointer=checkpointer)
+        return await _aevaluate_batch(file_paths, requirements_file, graph, max_workers)
+
+async def _aevaluate_batch(file_paths: List[str], requirements_file: str, graph, max_workers: Optional[int]) -> Dict:
+    """Async counterpart of _evaluate_batch, bounded by a semaphore instead of a thread pool."""
+    in_flight = asyncio.Semaphore(max_workers or config.BATCH_WORKERS)
+
+    async def evaluate_one(file_path: str) -> Dict:
+        async with in_flight:
+            try:
+                result = await aevaluate_assignment(file_path, requirements_file, graph=graph)
+            except Exception as e:
+                print(f"Error evaluating {file_path}: {str(e)}")
+                result = {
+                    "student_name": os.path.basename(file_path).split('_')[0],
+                    "final_score": None,
+                    "feedback": "",
+                    "error_analysis": None,
+                    "error": str(e)
+                }
+        return {"file_path": file_path, **result}
+
+    start = time.perf_counter()
+    duplicates = detect_duplicates(file_paths)
+    results = {}
+    for wave in _grading_waves(file_paths, duplicates):
+        results.update(zip(wave, await asyncio.gather(*(evaluate_one(path) for path in wave))))
+    elapsed = time.perf_counter() - start
+
+    return summarize_batch([results[path] for path in file_paths], elapsed, duplicates)
+
+def summarize_batch(results: List[Dict], elapsed: float, duplicates: Optional[Dict] = None) -> Dict:
+    """Combines per-submission results into the batch results document."""
+    if duplicates is not None:
+        _annotate_duplicates(results, duplicates)
+    scores = [r["final_score"] for r in results if r.get("final_score") is not None]
+    cache = get_cache()
+    execution_cache = get_execution_cache()
+    node_store = get_node_store()
+    criterion_index = get_criterion_index()
+    return {
+        "summary": {
+            "submissions": len(results),
+            "failed": sum(1 for r in results if r.get("error")),
+            "average_score": round(sum(scores) / len(scores), 2) if scores else None,
+            "elapsed_seconds": round(elapsed, 2),
+            "llm_cache": cache.stats() if cache is not None else None,
+            "execution_cache": execution_cache.stats() if execution_cache is not None else None,
+            "incremental": node_store.stats() if node_store is not None else None,
+            "criterion_index": criterion_index.stats() if criterion_index is not None else None,
+            "rate_limiter": get_rate_limiter().metrics(),
+            "trace": tracing.merge_summaries([r["trace"] for r in results if r.get("trace")])
+        },
+        "duplicates": duplicates,
+        "results": results
+    }
+
+def run_batch(args) -> None:
+    """Runs batch mode from the parsed command line arguments."""
+    file_paths = collect_submissions(args.batch)
+    if not file_paths:
+        print(f"Error: No submissions found for {args.batch}.")
+        sys.exit(1)
+
+    configure_limits(llm_calls=args.max_llm_calls, sandbox_runs=args.max_executions)
+    print(f"Evaluating {len(file_paths)} submissions...")
+    if args.use_async:
+        batch = asyncio.run(aevaluate_batch(file_paths, args.requirements, max_workers=args.workers,
+                                            checkpoint_path=args.checkpoint))
+    else:
+        batch = evaluate_batch(file_paths, args.requirements, max_workers=args.workers,
+                               checkpoint_path=args.checkpoint)
+
+    print_batch(batch, args.output or "batch_results.json")
+
+def print_batch(batch: Dict, output: str) -> None:
+    """Prints a batch results document and saves it to disk."""
+    print(f"\n{'='*50}")
+    print(f"BATCH RESULTS ({batch['summary']['submissions']} submissions)")
+    print(f"{'='*50}")
+    for result in batch["results"]:
+        score = result["final_score"] if result["final_score"] is not None else "ERROR"
+        note = f" (duplicate of {os.path.basename(result['duplicate_of'])})" if result.get("duplicate_of") else ""
+        print(f"{os.path.basename(result['file_path'])}: {score}{note}")
+    if batch.get("duplicates"):
+        duplicates = batch["duplicates"]
+        print(f"\nDuplicates: {len(duplicates['exact_groups'])} exact groups (evaluations shared), "
+              f"{len(duplicates['near_duplicates'])} near-duplicate pairs flagged for review")
+        for pair in duplicates["near_duplicates"]:
+            names = " ~ ".join(os.path.basename(path) for path in pair["files"])
+            print(f"  {names} ({pair['similarity']:.0%} similar)")
+    print(f"\nAverage score: {batch['summary']['average_score']}")
+    print(f"Elapsed: {batch['summary']['elapsed_seconds']}s")
+    if batch['summary']['llm_cache']:
+        cache_stats = batch['summary']['llm_cache']
+        print(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    if batch['summary']['execution_cache']:
+        cache_stats = batch['summary']['execution_cache']
+        print(f"Execution cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    if batch['summary']['incremental']:
+        store_stats = batch['summary']['incremental']
+        print(f"Incremental: {store_stats['reused']} evaluator outputs reused, {store_stats['recomputed']} recomputed")
+    if batch['summary']['criterion_index']:
+        index_stats = batch['summary']['criterion_index']
+        print(f"Criterion index: {index_stats['reused']} criteria reused, {index_stats['few_shot']} calibrated "
+              f"with past judgments, {index_stats['cold']} judged cold")
+    limiter_stats = batch['summary']['rate_limiter']
+    print(f"Rate limiter: {limiter_stats['rate_limited']} rate-limited, {limiter_stats['retries']} retries, "
+          f"max queue depth {limiter_stats['max_queue_depth']}, average wait {limiter_stats['average_wait_seconds']}s")
+    print_trace(batch['summary']['trace'])
+
+    with open(output, 'w') as f:
+        json.dump(batch, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+def print_trace(summary: Dict) -> None:
+    """Prints where the time went: LLM calls versus sandbox execution, tokens and cost."""
+    if not summary["nodes"]:
+        return
+    llm, sandbox = summary["llm"], summary["sandbox"]
+    print(f"LLM: {llm['calls']} calls ({llm['cache_hits']} cached), {llm['prompt_tokens']} prompt + "
+          f"{llm['completion_tokens']} completion tokens, ~${llm['estimated_cost_usd']:.4f}, "
+          f"{llm['total_ms'] / 1000:.2f}s ({llm['queue_wait_ms'] / 1000:.2f}s queued)")
+    print(f"Execution: {sandbox['runs']} runs ({sandbox['cache_hits']} cached), {sandbox['total_ms'] / 1000:.2f}s "
+          f"({sandbox['queue_wait_ms'] / 1000:.2f}s queued), {sandbox['cpu_seconds']:.2f}s CPU, "
+          f"peak {sandbox['max_rss_mb']:.0f} MB")
+    if summary["bottleneck"]:
+        print(f"Bottleneck: {summary['bottleneck']}")
+
+def run_batch_api(args) -> None:
+    """Grades through a provider batch endpoint: submit the cohort's prompts, then collect."""
+    import batch_api
+
+    start = time.perf_counter()
+    if args.collect:
+        manifest_path = args.collect
+    else:
+        file_paths = collect_submissions(args.batch)
+        if not file_paths:
+            print(f"Error: No submissions found for {args.batch}.")
+            sys.exit(1)
+        requirements = load_requirements(args.requirements)
+        states = [build_initial_state(path, requirements) for path in file_paths]
+        manifest_path = batch_api.submit_batch(states, args.batch_api, args.batch_dir)
+        if args.no_wait:
+            print(f"Submitted. Collect the results later with: python main.py --collect {manifest_path}")
+            return
+
+    final_states = batch_api.collect_batch(manifest_path)
+    results = [{"file_path": state["file_path"], **summarize_state(state)} for state in final_states]
+    duplicates = detect_duplicates([state["file_path"] for state in final_states])
+    print_batch(summarize_batch(results, time.perf_counter() - start, duplicates), args.output or "batch_results.json")
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Evaluate a Python assignment.')
-    parser.add_argument('file_path', help='Path to the Python file to evaluate')
+    parser.add_argument('file_path', nargs='?', help='Path to the Python file to evaluate')
     parser.add_argument('--requirements', '-r', default='requirements.json',
                         help='Path to the requirements JSON file (default: requirements.json)')
     parser.add_argument('--output', '-o', help='Path to save the evaluation results (optional)')
-    
+    parser.add_argument('--batch', '-b', metavar='DIR_OR_GLOB',
+                        help='Evaluate every submission in a directory or matching a glob pattern')
+    parser.add_argument('--workers', type=int,
+                        help=f'Submissions evaluated at once in batch mode (default: {config.BATCH_WORKERS})')
+    parser.add_argument('--max-llm-calls', type=int,
+                        help=f'Maximum concurrent LLM calls (default: {config.LLM_CONCURRENCY})')
+    parser.add_argument('--max-executions', type=int,
+                        help=f'Maximum concurrent sandbox executions (default: {config.SANDBOX_CONCURRENCY})')
+    parser.add_argument('--requests-per-minute', type=int,
+                        help=f'Provider request limit to stay under (default: {config.LLM_REQUESTS_PER_MINUTE})')
+    parser.add_argument('--tokens-per-minute', type=int,
+                        help=f'Provider token limit to stay under (default: {config.LLM_TOKENS_PER_MINUTE})')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Run the LLM agents as coroutines on a single event loop')
+    parser.add_argument('--stream', action='store_true',
+                        help='Print each section of the report as soon as its evaluator finishes')
+    parser.add_argument('--network-mode', choices=['live', 'record', 'replay', 'auto'],
+                        help='Override how student code reaches the network (default: from requirements.json)')
+    parser.add_argument('--syntax-style-mode', choices=['local', 'hybrid', 'llm'],
+                        help=f'How syntax/style is scored (default: {config.SYNTAX_STYLE_MODE})')
+    parser.add_argument('--evaluation-mode', choices=['separate', 'fused'],
+                        help=f'One LLM call per evaluator, or one fused call (default: {config.EVALUATION_MODE})')
+    parser.add_argument('--requirements-mode', choices=['single', 'per_criterion'],
+                        help=f'Judge all requirements in one call, or each in its own parallel call '
+                             f'(default: {config.REQUIREMENTS_MODE})')
+    parser.add_argument('--output-mode', choices=['parser', 'structured'],
+                        help=f'Parse JSON from the completion text, or use native structured output (default: {config.OUTPUT_MODE})')
+    parser.add_argument('--checkpoint', nargs='?', const=config.CHECKPOINT_PATH, metavar='PATH',
+                        help=f'Checkpoint every node to SQLite so an interrupted run resumes where it stopped '
+                             f'(default path: {config.CHECKPOINT_PATH})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Bypass the persistent LLM response cache')
+    parser.add_argument('--no-execution-cache', action='store_true',
+                        help='Re-run every submission instead of reusing cached execution results')
+    parser.add_argument('--full-regrade', action='store_true',
+                        help='Re-run every evaluator (refreshing stored outputs) instead of reusing unchanged ones')
+    parser.add_argument('--trace-file', metavar='PATH',
+                        help='Append every span (nodes, LLM calls, sandbox runs) to a JSONL trace file')
+    parser.add_argument('--trace-otel', action='store_true',
+                        help='Export spans through OpenTelemetry (requires opentelemetry-api/sdk)')
+    parser.add_argument('--batch-api', choices=['openai', 'local'],
+                        help='With --batch, send every prompt through a provider batch endpoint instead of live calls')
+    parser.add_argument('--batch-dir', default='batch_jobs',
+                        help='Directory for the batch request, output and manifest files (default: batch_jobs)')
+    parser.add_argument('--no-wait', action='store_true',
+                        help='Submit the batch and exit; finish later with --collect')
+    parser.add_argument('--collect', metavar='MANIFEST',
+                        help='Wait for a submitted batch and finish grading from its manifest')
+
     args = parser.parse_args()
-    
-    if not os.path.exists(args.file_path):
-        print(f"Error: File {args.file_path} does not exist.")
-        sys.exit(1)
-    
+
+    if not args.file_path and not args.batch and not args.collect:
+        parser.error("either file_path, --batch or --collect is required")
+    if args.batch_api and not args.batch:
+        parser.error("--batch-api requires --batch")
+    if args.stream and args.checkpoint:
+        parser.error("--stream cannot be combined with --checkpoint; streamed runs are not checkpointed")
+
+    if args.no_cache:
+        set_cache_enabled(False)
+    if args.no_execution_cache:
+        set_execution_cache_enabled(False)
+    if args.full_regrade:
+        set_reuse_enabled(False)
+    if args.trace_file or args.trace_otel:
+        tracing.configure_exporters(jsonl_path=args.trace_file, otel=args.trace_otel)
+    configure_rate_limits(args.requests_per_minute, args.tokens_per_minute)
+    if args.network_mode:
+        config.NETWORK_MODE = args.network_mode
+    if args.syntax_style_mode:
+        config.SYNTAX_STYLE_MODE = args.syntax_style_mode
+    if args.evaluation_mode:
+        config.EVALUATION_MODE = args.evaluation_mode
+    if args.output_mode:
+        config.OUTPUT_MODE = args.output_mode
+    if args.requirements_mode:
+        config.REQUIREMENTS_MODE = args.requirements_mode
+
     if not os.path.exists(args.requirements):
         print(f"Error: Requirements file {args.requirements} does not exist.")
         sys.exit(1)
-    
+
+    if args.batch_api or args.collect:
+        run_batch_api(args)
+        sys.exit(0)
+
+    if args.batch:
+        run_batch(args)
+        sys.exit(0)
+
+    if not os.path.exists(args.file_path):
+        print(f"Error: File {args.file_path} does not exist.")
+        sys.exit(1)
+
     try:
-        result = evaluate_assignment(args.file_path, args.requirements)
-        
-
-        print(f"\n{'='*50}")
-        print(f"EVALUATION RESULTS FOR: {os.path.basename(args.file_path)}")
-        print(f"{'='*50}")
-        print(f"Student: {result['student_name']}")
-        print(f"Score: {result['final_score']}/100")
-        print(f"\nFEEDBACK:\n")
-        print(result['feedback'])
-        
-        if result.get('error_analysis'):
-            print(f"\nERROR ANALYSIS:\n")
-            print(result['error_analysis'])
-        
+        if args.stream and args.use_async:
+            result = asyncio.run(astream_assignment(args.file_path, args.requirements))
+        elif args.stream:
+            result = stream_assignment(args.file_path, args.requirements)
+        elif args.use_async:
+            result = asyncio.run(aevaluate_assignment(args.file_path, args.requirements,
+                                                      checkpoint_path=args.checkpoint))
+        else:
+            result = evaluate_assignment(args.file_path, args.requirements, checkpoint_path=args.checkpoint)
+
+        # Streamed sections have already been printed as they arrived
+        if not args.stream:
+            print(f"\n{'='*50}")
+            print(f"EVALUATION RESULTS FOR: {os.path.basename(args.file_path)}")
+            print(f"{'='*50}")
+            print(f"Student: {result['student_name']}")
+            print(f"Score: {result['final_score']}/100")
+            print(f"\nFEEDBACK:\n")
+            print(result['feedback'])
+
+            if result.get('error_analysis'):
+                print(f"\nERROR ANALYSIS:\n")
+                print(result['error_analysis'])
+
+            print()
+            print_trace(result['trace'])
 
         if args.output:
             with open(args.output, 'w') as f:
                 json.dump(result, f, indent=2)
             print(f"\nResults saved to {args.output}")
-            
+
     except Exception as e:
         print(f"Error during evaluation: {str(e)}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -0,0 +1,168 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import tempfile
+import urllib.error
+import urllib.request
+import urllib.response
+from http.client import HTTPMessage
+from typing import Callable, Dict, Optional
+
+MODES = ("live", "record", "replay", "auto")
+
+_store: Optional["FixtureStore"] = None
+
+class FixtureStore:
+    """Directory of recorded HTTP responses, one JSON file per request."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        # Requests that went to the live network because no fixture answered them
+        self.live_requests = 0
+
+    def _path(self, method: str, url: str, body: Optional[bytes]) -> str:
+        digest = hashlib.sha256()
+        digest.update(method.upper().encode("utf-8") + b" " + url.encode("utf-8") + b"\n")
+        digest.update(body or b"")
+        return os.path.join(self.directory, f"{digest.hexdigest()[:24]}.json")
+
+    def load(self, method: str, url: str, body: Optional[bytes] = None) -> Optional[Dict]:
+        """Returns the recorded response for a request, or None if it was never recorded."""
+        path = self._path(method, url, body)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            fixture = json.load(f)
+        fixture["body"] = base64.b64decode(fixture.pop("body_b64"))
+        return fixture
+
+    def save(self, method: str, url: str, body: Optional[bytes], status: int, reason: str,
+             headers: Dict[str, str], content: bytes) -> None:
+        """Records a response atomically so concurrent sandboxes never read a partial file."""
+        os.makedirs(self.directory, exist_ok=True)
+        # Bodies are stored decoded, so transport headers no longer apply
+        headers = {
+            key: value for key, value in headers.items()
+            if key.lower() not in ("content-encoding", "transfer-encoding", "content-length")
+        }
+        fixture = {
+            "method": method.upper(),
+            "url": url,
+            "status": status,
+            "reason": reason,
+            "headers": headers,
+            "body_b64": base64.b64encode(content).decode("ascii")
+        }
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(fixture, f, indent=2)
+        os.replace(temp_path, self._path(method, url, body))
+
+def _missing(method: str, url: str) -> str:
+    return f"No recorded fixture for {method.upper()} {url} (network access is disabled in replay mode)"
+
+def _patch_requests(store: FixtureStore, mode: str) -> Optional[Callable[[], None]]:
+    """Routes every requests.Session call through the fixture store."""
+    try:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from requests.structures import CaseInsensitiveDict
+    except ImportError:
+        return None
+
+    original_send = HTTPAdapter.send
+
+    def send(adapter, request, **kwargs):
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        fixture = store.load(request.method, request.url, body) if mode != "record" else None
+        if fixture is None:
+            if mode == "replay":
+                raise requests.exceptions.ConnectionError(_missing(request.method, request.url), request=request)
+            store.live_requests += 1
+            live = original_send(adapter, request, **kwargs)
+            store.save(request.method, request.url, body, live.status_code, live.reason or "",
+                       dict(live.headers), live.content)
+            return live
+
+        response = requests.Response()
+        response.status_code = fixture["status"]
+        response.reason = fixture["reason"]
+        response.headers = CaseInsensitiveDict(fixture["headers"])
+        response._content = fixture["body"]
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+    HTTPAdapter.send = send
+
+    def restore():
+        HTTPAdapter.send = original_send
+    return restore
+
+def _patch_urllib(store: FixtureStore, mode: str) -> Callable[[], None]:
+    """Routes urllib.request.urlopen through the fixture store."""
+    original_urlopen = urllib.request.urlopen
+
+    def build_response(url: str, status: int, reason: str, headers: Dict[str, str], content: bytes):
+        message = HTTPMessage()
+        for key, value in headers.items():
+            message[key] = value
+        response = urllib.response.addinfourl(io.BytesIO(content), message, url, status)
+        response.reason = reason
+        return response
+
+    def urlopen(url, data=None, *args, **kwargs):
+        request = url if isinstance(url, urllib.request.Request) else urllib.request.Request(url, data)
+        if data is not None:
+            request.data = data
+        method = request.get_method()
+        full_url = request.full_url
+        fixture = store.load(method, full_url, request.data) if mode != "record" else None
+        if fixture is None:
+            if mode == "replay":
+                raise urllib.error.URLError(_missing(method, full_url))
+            store.live_requests += 1
+            with original_urlopen(request, *args, **kwargs) as live:
+                content = live.read()
+                status = live.status
+                reason = getattr(live, "reason", "")
+                headers = dict(live.headers.items())
+            store.save(method, full_url, request.data, status, reason, headers, content)
+            return build_response(full_url, status, reason, headers, content)
+        return build_response(full_url, fixture["status"], fixture["reason"], fixture["headers"], fixture["body"])
+
+    urllib.request.urlopen = urlopen
+
+    def restore():
+        urllib.request.urlopen = original_urlopen
+    return restore
+
+def install(fixtures_dir: str, mode: str = "auto") -> Callable[[], None]:
+    """Intercepts requests/urllib traffic for one sandbox run and returns an undo callable.
+
+    Modes: "replay" serves only recorded fixtures, "record" always fetches and
+    stores, "auto" replays when a fixture exists and records otherwise, and
+    "live" leaves the network untouched.
+    """
+    global _store
+    if mode not in MODES:
+        raise ValueError(f"Unknown network mode: {mode}")
+    _store = None
+    if mode == "live":
+        return lambda: None
+
+    store = _store = FixtureStore(fixtures_dir)
+    restorers = [_patch_urllib(store, mode), _patch_requests(store, mode)]
+
+    def restore():
+        for undo in restorers:
+            if undo is not None:
+                undo()
+    return restore
+
+def live_requests() -> Optional[int]:
+    """Counts requests the last install() let through to the live network, or None if it did not intercept."""
+    return _store.live_requests if _store is not None else None
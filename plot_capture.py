@@ -0,0 +1,133 @@
+import os
+import sys
+import weakref
+from typing import Callable, Dict, List
+
+# Caps that keep the visualization prompt bounded when a submission plots in a loop
+MAX_FIGURES = 20
+MAX_AXES_PER_FIGURE = 12
+MAX_SERIES_PER_AXES = 20
+
+def force_headless() -> None:
+    """Switches matplotlib to the non-interactive Agg backend, now and for later imports."""
+    os.environ["MPLBACKEND"] = "Agg"
+    if "matplotlib" in sys.modules:
+        sys.modules["matplotlib"].use("Agg", force=True)
+
+def _elided(count: int, kind: str) -> List[Dict]:
+    """Marker that stands in for items dropped by a cap, or nothing when none were."""
+    return [{"note": f"{count} more {kind} elided"}] if count > 0 else []
+
+def _label(artist) -> str:
+    label = artist.get_label()
+    return "" if not label or label.startswith("_") else label
+
+def summarize_axes(ax) -> Dict:
+    """Describes one axes: titles, labels and the size of each plotted series."""
+    series = []
+    for line in ax.get_lines():
+        series.append({"type": "line", "points": len(line.get_xdata()), "label": _label(line)})
+    for collection in ax.collections:
+        kind = "scatter" if type(collection).__name__ == "PathCollection" else type(collection).__name__
+        series.append({"type": kind, "points": len(collection.get_offsets()), "label": _label(collection)})
+    bars = [patch for patch in ax.patches if type(patch).__name__ == "Rectangle"]
+    if bars:
+        series.append({"type": "bar", "points": len(bars)})
+    wedges = [patch for patch in ax.patches if type(patch).__name__ == "Wedge"]
+    if wedges:
+        series.append({"type": "pie", "points": len(wedges)})
+    for image in ax.get_images():
+        series.append({"type": "image", "shape": list(image.get_array().shape)})
+
+    return {
+        "title": ax.get_title(),
+        "xlabel": ax.get_xlabel(),
+        "ylabel": ax.get_ylabel(),
+        "legend": ax.get_legend() is not None,
+        "series": series[:MAX_SERIES_PER_AXES] + _elided(len(series) - MAX_SERIES_PER_AXES, "series")
+    }
+
+def summarize_figure(fig) -> Dict:
+    """Builds a compact, JSON-serializable description of a matplotlib figure."""
+    suptitle = fig._suptitle.get_text() if getattr(fig, "_suptitle", None) else ""
+    axes = fig.get_axes()
+    return {
+        "suptitle": suptitle,
+        "axes_count": len(axes),
+        "axes": [summarize_axes(ax) for ax in axes[:MAX_AXES_PER_FIGURE]] +
+                _elided(len(axes) - MAX_AXES_PER_FIGURE, "axes")
+    }
+
+class FigureRecorder:
+    """Intercepts plt.show() and Figure.savefig() during one sandbox run.
+
+    show() records and closes every open figure instead of displaying it;
+    savefig() records the figure and still writes the file the code asked for.
+    Only the first MAX_FIGURES figures are described; the rest are counted.
+    """
+
+    def __init__(self):
+        self.figures: List[Dict] = []
+        self._pending = {}
+        self.elided = 0
+        self._elided = weakref.WeakSet()
+        self._restore: List[Callable[[], None]] = []
+
+    def _record(self, fig) -> None:
+        if fig not in self._pending and len(self.figures) >= MAX_FIGURES:
+            if fig not in self._elided:
+                self._elided.add(fig)
+                self.elided += 1
+            return
+        try:
+            summary = summarize_figure(fig)
+        except Exception:
+            return
+        if fig in self._pending:
+            self.figures[self._pending[fig]] = summary
+        else:
+            self._pending[fig] = len(self.figures)
+            self.figures.append(summary)
+
+    def install(self) -> None:
+        """Patches pyplot if the submission's process has it loaded."""
+        plt = sys.modules.get("matplotlib.pyplot")
+        if plt is None:
+            return
+        from matplotlib.figure import Figure
+
+        original_show = plt.show
+        original_savefig = Figure.savefig
+        recorder = self
+
+        def show(*args, **kwargs):
+            for number in plt.get_fignums():
+                fig = plt.figure(number)
+                recorder._record(fig)
+                recorder._pending.pop(fig, None)
+            plt.close("all")
+
+        def savefig(fig, *args, **kwargs):
+            recorder._record(fig)
+            return original_savefig(fig, *args, **kwargs)
+
+        plt.show = show
+        Figure.savefig = savefig
+
+        def restore():
+            plt.show = original_show
+            Figure.savefig = original_savefig
+        self._restore.append(restore)
+
+    def finish(self) -> List[Dict]:
+        """Records figures left open without show(), undoes the patches and closes everything."""
+        plt = sys.modules.get("matplotlib.pyplot")
+        if plt is not None:
+            for number in plt.get_fignums():
+                self._record(plt.figure(number))
+            plt.close("all")
+        for restore in self._restore:
+            restore()
+        self._restore.clear()
+        self._pending.clear()
+        return self.figures + _elided(self.elided, "figures")
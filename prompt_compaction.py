@@ -0,0 +1,239 @@
+import ast
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+from static_analysis import analyze_code
+import config
+
+LITERAL_MAX_CHARS = 200
+LITERAL_MAX_ITEMS = 20
+LITERAL_KEEP_ITEMS = 3
+MIN_REPEATS = 3
+
+# What each agent needs to see: syntax/style keeps commented-out code because it is a style issue,
+# and requirements keeps repeated lines whose literals (URLs, column names) it may have to check
+AGENT_PROFILES = {
+    "syntax_style": {"drop_commented_code": False, "plotting_only": False, "collapse_repeats": True},
+    "requirements": {"drop_commented_code": True, "plotting_only": False, "collapse_repeats": False},
+    "visualization": {"drop_commented_code": True, "plotting_only": True, "collapse_repeats": True},
+}
+
+@lru_cache(maxsize=None)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(config.LLM_MODEL)
+    except Exception:
+        return None
+
+def count_tokens(text: str) -> int:
+    """Counts tokens with the model's tokenizer, or estimates ~4 characters per token offline."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+def _line_offsets(code: str) -> List[int]:
+    offsets = [0]
+    for line in code.splitlines(keepends=True):
+        offsets.append(offsets[-1] + len(line))
+    return offsets
+
+def _char_index(code_lines: List[str], offsets: List[int], lineno: int, col: int) -> int:
+    """Converts an AST (line, UTF-8 byte column) position into a character index."""
+    line = code_lines[lineno - 1]
+    return offsets[lineno - 1] + len(line.encode("utf-8")[:col].decode("utf-8", errors="ignore"))
+
+def _is_constant_display(node: ast.AST) -> bool:
+    return all(isinstance(element, (ast.Constant, ast.UnaryOp)) for element in node.elts)
+
+def _literal_replacement(node: ast.AST) -> Optional[str]:
+    """Returns shortened source for an oversized literal, or None to leave it alone."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (str, bytes)):
+        if len(node.value) <= LITERAL_MAX_CHARS:
+            return None
+        kept = node.value[:80]
+        marker = f"...<{len(node.value) - len(kept)} chars elided>"
+        return repr(kept + (marker if isinstance(kept, str) else marker.encode()))
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)) and len(node.elts) > LITERAL_MAX_ITEMS \
+            and _is_constant_display(node):
+        head = ", ".join(ast.unparse(element) for element in node.elts[:LITERAL_KEEP_ITEMS])
+        open_, close = {"List": "[]", "Tuple": "()", "Set": "{}"}[type(node).__name__]
+        marker = repr(f"...<{len(node.elts) - LITERAL_KEEP_ITEMS} more items>")
+        return f"{open_}{head}, {marker}{close}"
+    if isinstance(node, ast.Dict) and len(node.keys) > LITERAL_MAX_ITEMS \
+            and all(isinstance(v, ast.Constant) for v in node.values):
+        head = ", ".join(f"{ast.unparse(k)}: {ast.unparse(v)}"
+                         for k, v in list(zip(node.keys, node.values))[:LITERAL_KEEP_ITEMS] if k is not None)
+        marker = repr(f"...<{len(node.keys) - LITERAL_KEEP_ITEMS} more items>")
+        return f"{{{head}, {marker}: ...}}"
+    return None
+
+def strip_large_literals(code: str) -> str:
+    """Replaces long string constants and big constant collections with short placeholders."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code
+    code_lines = code.splitlines(keepends=True)
+    offsets = _line_offsets(code)
+    replacements: List[Tuple[int, int, str]] = []
+
+    def visit(node: ast.AST) -> None:
+        if hasattr(node, "end_lineno") and isinstance(node, (ast.Constant, ast.List, ast.Tuple, ast.Set, ast.Dict)):
+            start = _char_index(code_lines, offsets, node.lineno, node.col_offset)
+            end = _char_index(code_lines, offsets, node.end_lineno, node.end_col_offset)
+            replacement = _literal_replacement(node)
+            if replacement is not None:
+                replacements.append((start, end, replacement))
+                return
+        for child in ast.iter_child_nodes(node):
+            if not isinstance(child, ast.JoinedStr):
+                visit(child)
+
+    visit(tree)
+    for start, end, replacement in sorted(replacements, reverse=True):
+        code = code[:start] + replacement + code[end:]
+    return code
+
+def _looks_like_code(text: str) -> bool:
+    if not text or not re.search(r'[=(\[\].:]|^(import|from|return|for|if|while|def|class)\b', text):
+        return False
+    try:
+        tree = ast.parse(text)
+    except SyntaxError:
+        return False
+    if len(tree.body) == 1 and isinstance(tree.body[0], ast.Expr) \
+            and isinstance(tree.body[0].value, (ast.Name, ast.Constant)):
+        return False
+    return True
+
+def drop_commented_code(code: str) -> str:
+    """Removes whole-line comments that are themselves valid Python statements."""
+    kept = []
+    for line in code.split('\n'):
+        stripped = line.strip()
+        if stripped.startswith('#') and _looks_like_code(stripped.lstrip('#').strip()):
+            continue
+        kept.append(line)
+    return '\n'.join(kept)
+
+def _shape(line: str) -> str:
+    """Normalizes literals so lines differing only in strings or numbers compare equal."""
+    line = re.sub(r'(\'[^\']*\'|"[^"]*")', "S", line)
+    return re.sub(r'\b\d+(\.\d+)?\b', "N", line)
+
+def collapse_repeated_blocks(code: str, max_block: int = 4) -> str:
+    """Keeps one copy of blocks of lines repeated back to back with only literal differences."""
+    lines = code.split('\n')
+    shapes = [_shape(line) for line in lines]
+    result = []
+    i = 0
+    while i < len(lines):
+        collapsed = False
+        for size in range(1, max_block + 1):
+            block = shapes[i:i + size]
+            if len(block) < size or not any(s.strip() for s in block):
+                break
+            repeats = 1
+            while shapes[i + repeats * size:i + (repeats + 1) * size] == block:
+                repeats += 1
+            if repeats >= MIN_REPEATS:
+                indent = re.match(r'\s*', lines[i]).group(0)
+                result.extend(lines[i:i + size])
+                result.append(f"{indent}# ... {repeats - 1} more similar block(s) collapsed")
+                i += repeats * size
+                collapsed = True
+                break
+        if not collapsed:
+            result.append(lines[i])
+            i += 1
+    return '\n'.join(result)
+
+def _names(node: ast.AST, context) -> Set[str]:
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name) and isinstance(n.ctx, context)}
+
+def _root_name(node: ast.AST) -> Optional[str]:
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+def _defined_names(node: ast.stmt) -> Set[str]:
+    names = _names(node, ast.Store)
+    # df['col'] = ... and obj.attr = ... update the object they hang off
+    targets = getattr(node, "targets", None) or [getattr(node, "target", None)]
+    names.update(filter(None, (_root_name(target) for target in targets if target is not None)))
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        names.add(node.name)
+    elif isinstance(node, (ast.Import, ast.ImportFrom)):
+        names.update((alias.asname or alias.name).split(".")[0] for alias in node.names)
+    return names
+
+def select_plotting_code(code: str) -> str:
+    """Keeps top-level statements that plot, plus the statements whose data they depend on."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code
+    plot_lines = {call["lineno"] for call in analyze_code(code)["plotting_calls"]}
+    if not plot_lines:
+        return code
+
+    statements = tree.body
+    keep = set()
+    needed: Set[str] = set()
+    for index, node in enumerate(statements):
+        if isinstance(node, (ast.Import, ast.ImportFrom)) or \
+                any(node.lineno <= line <= node.end_lineno for line in plot_lines):
+            keep.add(index)
+            needed |= _names(node, ast.Load)
+
+    # Walk the data flow backwards until no new definitions are pulled in
+    changed = True
+    while changed:
+        changed = False
+        for index, node in enumerate(statements):
+            if index not in keep and _defined_names(node) & needed:
+                keep.add(index)
+                needed |= _names(node, ast.Load)
+                changed = True
+
+    lines = code.rstrip('\n').split('\n')
+    selected = []
+    previous_end = 0
+    for index in sorted(keep):
+        node = statements[index]
+        start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+        if start - 1 > previous_end:
+            selected.append("# ...")
+        selected.extend(lines[start - 1:node.end_lineno])
+        previous_end = node.end_lineno
+    if previous_end < len(lines):
+        selected.append("# ...")
+    return '\n'.join(selected)
+
+def fit_to_budget(code: str, budget: int) -> str:
+    """Truncates at a line boundary so the code stays within a token budget."""
+    if count_tokens(code) <= budget:
+        return code
+    lines = code.split('\n')
+    low, high = 0, len(lines)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens('\n'.join(lines[:middle])) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return '\n'.join(lines[:low] + [f"# ... [{len(lines) - low} lines truncated to fit the token budget]"])
+
+def compact_for_agent(code: str, agent: str, budget: int) -> str:
+    """Builds the reduced view of a submission that one agent's prompt should carry."""
+    profile = AGENT_PROFILES[agent]
+    compact = strip_large_literals(code)
+    if profile["plotting_only"]:
+        compact = select_plotting_code(compact)
+    if profile["drop_commented_code"]:
+        compact = drop_commented_code(compact)
+    if profile["collapse_repeats"]:
+        compact = collapse_repeated_blocks(compact)
+    return fit_to_budget(compact, budget)
@@ -1,10 +1,12 @@
 from langchain.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
-from pydantic_objects import SyntaxStyleEvaluation, RequirementsEvaluation, VisualizationEvaluation
+from pydantic_objects import SyntaxStyleEvaluation, CriterionJudgment, RequirementsEvaluation, VisualizationEvaluation, CombinedEvaluation
 
 syntax_style_parser = PydanticOutputParser(pydantic_object=SyntaxStyleEvaluation)
 requirements_parser = PydanticOutputParser(pydantic_object=RequirementsEvaluation)
+criterion_parser = PydanticOutputParser(pydantic_object=CriterionJudgment)
 visualization_parser = PydanticOutputParser(pydantic_object=VisualizationEvaluation)
+combined_parser = PydanticOutputParser(pydantic_object=CombinedEvaluation)
 
 
 SYNTAX_STYLE_TEMPLATE = PromptTemplate.from_template(
@@ -28,6 +30,31 @@ Please evaluate the following Python code on two dimensions:
 
 Here is the code to evaluate:
 
+```python
+{code}
+```
+""",
+partial_variables={"format_instructions": syntax_style_parser.get_format_instructions()}
+)
+
+SYNTAX_STYLE_EXPLAIN_TEMPLATE = PromptTemplate.from_template(
+"""
+You are a Python code reviewer explaining syntax and style scores to a student.
+
+The scores below were computed by a static analyzer and are final:
+- Syntax score: {syntax_score}/60
+- Style score: {style_score}/40
+
+Analyzer findings:
+{findings}
+
+Write a short explanation of each score and concrete, actionable suggestions
+based on the findings and the code. Report the scores exactly as given.
+
+{format_instructions}
+
+Here is the code:
+
 ```python
 {code}
 ```
@@ -50,9 +77,10 @@ Consider the following aspects:
 3. Correctness (Are the implementations accurate?)
 4. Approach (Is the solution approach appropriate and efficient?)
 
-Give a score out of 100 points.
+Give a score out of 100 points, and judge each requirement separately in "criteria".
 
 Note: The code execution status is: {execution_status}
+{calibration}
 
 {format_instructions}
 
@@ -64,6 +92,31 @@ Here is the code to evaluate:
 """,
 partial_variables={"format_instructions": requirements_parser.get_format_instructions()}
 )
+
+CRITERION_TEMPLATE = PromptTemplate.from_template(
+"""
+You are a Python assignment evaluator judging how well the code fulfills one specific requirement.
+
+Requirement:
+{criterion}
+
+Judge only this requirement, not the rest of the assignment. Consider whether it is
+implemented, complete and correct. Give a score out of 100 points and copy the
+requirement verbatim into "criterion".
+
+Note: The code execution status is: {execution_status}
+{calibration}
+
+{format_instructions}
+
+Here is the code to evaluate:
+
+```python
+{code}
+```
+""",
+partial_variables={"format_instructions": criterion_parser.get_format_instructions()}
+)
     
 VISUALIZATION_TEMPLATE = PromptTemplate.from_template(
 """
@@ -90,6 +143,9 @@ Libraries detected: {libraries}
 
 Note: The code execution status is: {execution_status}
 
+Figures produced when the code was run (axes, titles, labels and series sizes):
+{figures}
+
 {format_instructions}
 
 Here is the code to evaluate:
@@ -99,4 +155,43 @@ Here is the code to evaluate:
 ```
 """,
 partial_variables={"format_instructions": visualization_parser.get_format_instructions()}
-)
\ No newline at end of file
+)
+
+COMBINED_TEMPLATE = PromptTemplate.from_template(
+"""
+You are a Python assignment evaluator. Evaluate the code below in a single pass and
+return every section in one JSON object.
+
+Section "syntax_style":
+1. Syntax correctness (60 points): Is the code syntactically valid, properly indented, free of obvious syntax errors?
+2. Readability and style (40 points): PEP 8 conventions, descriptive and consistent names, useful comments, logical structure.
+
+Section "requirements" (100 points):
+Assignment Requirements:
+{requirements_text}
+Consider functionality, completeness, correctness and the appropriateness of the approach.
+
+{visualization_section}
+
+Note: The code execution status is: {execution_status}
+
+{format_instructions}
+
+Here is the code to evaluate:
+
+```python
+{code}
+```
+""",
+partial_variables={"format_instructions": combined_parser.get_format_instructions()}
+)
+
+COMBINED_VISUALIZATION_SECTION = """Section "visualization" (100 points):
+1. Visual clarity (30 points): clear, labelled, titled charts of an appropriate type.
+2. Insight generation (40 points): visualizations reveal meaningful patterns and have a clear purpose.
+3. Technical implementation (30 points): well-structured code, appropriate libraries, customization beyond defaults.
+Libraries detected: {libraries}
+Figures produced when the code was run (axes, titles, labels and series sizes):
+{figures}"""
+
+COMBINED_NO_VISUALIZATION_SECTION = """Section "visualization": the code produces no visualizations, so set "visualization" to null."""
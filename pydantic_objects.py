@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 
 class SyntaxStyleEvaluation(BaseModel):
     """Pydantic model for syntax and style evaluation results"""
@@ -10,6 +10,12 @@ class SyntaxStyleEvaluation(BaseModel):
     syntax_improvements: List[str] = Field(..., description="Suggestions to improve syntax")
     style_improvements: List[str] = Field(..., description="Suggestions to improve style")
 
+class CriterionJudgment(BaseModel):
+    """Pydantic model for the judgment of a single assignment requirement"""
+    criterion: str = Field(..., description="The requirement being judged, copied verbatim")
+    score: int = Field(..., ge=0, le=100, description="How well the code meets this requirement out of 100 points")
+    rationale: str = Field(..., description="One or two sentences justifying the score with reference to the code")
+
 class RequirementsEvaluation(BaseModel):
     """Pydantic model for requirements evaluation results"""
     requirements_score: int = Field(..., ge=0, le=100, description="Overall score for requirements fulfillment out of 100 points")
@@ -17,6 +23,7 @@ class RequirementsEvaluation(BaseModel):
     strengths: List[str] = Field(..., description="Key strengths of the code regarding requirements")
     weaknesses: List[str] = Field(..., description="Key weaknesses of the code regarding requirements")
     improvement_suggestions: List[str] = Field(..., description="Specific suggestions to better meet requirements")
+    criteria: List[CriterionJudgment] = Field(default_factory=list, description="One judgment per assignment requirement, in the order listed")
 
 class VisualizationEvaluation(BaseModel):
     """Pydantic model for visualization evaluation results"""
@@ -25,4 +32,10 @@ class VisualizationEvaluation(BaseModel):
     insight_assessment: str = Field(..., description="Assessment of how well the visualizations generate insights")
     technical_assessment: str = Field(..., description="Assessment of technical implementation of visualizations")
     strengths: List[str] = Field(..., description="Key strengths of the visualizations")
-    improvement_suggestions: List[str] = Field(..., description="Specific suggestions to improve visualizations")
\ No newline at end of file
+    improvement_suggestions: List[str] = Field(..., description="Specific suggestions to improve visualizations")
+
+class CombinedEvaluation(BaseModel):
+    """Pydantic model for a single fused evaluation covering every section"""
+    syntax_style: SyntaxStyleEvaluation = Field(..., description="Syntax and style evaluation")
+    requirements: RequirementsEvaluation = Field(..., description="Requirements fulfillment evaluation")
+    visualization: Optional[VisualizationEvaluation] = Field(None, description="Visualization evaluation, or null if the code has no visualizations")
@@ -0,0 +1,240 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+import config
+import tracing
+
+# Rate is cut by this factor per burst of 429s and recovers by RECOVERY_STEP per successful call
+BACKOFF_FACTOR = 0.5
+RECOVERY_STEP = 0.05
+MIN_RATE_SCALE = 0.1
+
+class LLMUnavailableError(RuntimeError):
+    """Raised when an LLM call still fails after every retry.
+
+    Agents let this propagate instead of substituting fallback scores, so a
+    throttled run surfaces as failed evaluations rather than wrong grades.
+    """
+
+class TokenBucket:
+    """Bucket refilled continuously at a per-minute rate; reservations may overdraw it."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.base_rate = per_minute / 60
+        self.rate = self.base_rate
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Takes amount from the bucket and returns how long the caller must wait for it."""
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def adjust(self, amount: float, now: float) -> None:
+        """Returns (or, if negative, takes) the difference between a reservation and actual use."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def scale(self, factor: float) -> None:
+        self.rate = self.base_rate * factor
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Reads the server's requested delay from Retry-After(-ms) headers, if present."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+def _is_rate_limit(error: Exception) -> bool:
+    import openai
+    return isinstance(error, openai.RateLimitError) or getattr(error, "status_code", None) == 429
+
+def _is_retryable(error: Exception) -> bool:
+    # Only reached after a call failed, by which point the client has loaded openai anyway
+    import openai
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    return status in (408, 409, 429) or (status is not None and status >= 500)
+
+class RateLimiter:
+    """Shared request and token buckets with adaptive backoff for every LLM call.
+
+    Callers reserve one request and an estimated token count before each attempt.
+    A 429 halves the sustained rate and pauses every caller for the server's
+    Retry-After (or a jittered exponential delay); successes slowly restore it.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_retries: int,
+                 base_delay: float, max_delay: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._rate_scale = 1.0
+        self._paused_until = 0.0
+        self._stats = {
+            "calls": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": 0,
+            "queue_depth": 0,
+            "max_queue_depth": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "tokens_used": 0
+        }
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            delay = max(self.requests.reserve(1, now), self.tokens.reserve(tokens, now), self._paused_until - now)
+            if delay > 0:
+                self._stats["queue_depth"] += 1
+                self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._stats["queue_depth"])
+            return delay
+
+    def _waited(self, delay: float) -> None:
+        with self._lock:
+            if delay > 0:
+                self._stats["queue_depth"] -= 1
+            self._stats["total_wait_seconds"] += delay
+            self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], delay)
+        tracing.add("queue_wait_ms", delay * 1000)
+
+    def _backoff(self, error: Exception, attempt: int) -> float:
+        """Records a failed attempt and returns how long to sleep before the next one."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = _retry_after(error)
+        with self._lock:
+            self._stats["retries"] += 1
+            if _is_rate_limit(error):
+                self._stats["rate_limited"] += 1
+                # A burst of 429s from calls already in flight counts as one signal
+                if time.monotonic() >= self._paused_until:
+                    self._rate_scale = max(MIN_RATE_SCALE, self._rate_scale * BACKOFF_FACTOR)
+                    self.requests.scale(self._rate_scale)
+                    self.tokens.scale(self._rate_scale)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                # Everyone waits out a 429, not just the caller that saw it
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            elif retry_after is not None:
+                delay = max(delay, retry_after)
+        return delay
+
+    def _succeeded(self, reserved: int, used: Optional[int]) -> None:
+        with self._lock:
+            self._stats["calls"] += 1
+            if used is not None:
+                self.tokens.adjust(reserved - used, time.monotonic())
+            self._stats["tokens_used"] += used if used is not None else reserved
+            if self._rate_scale < 1.0:
+                self._rate_scale = min(1.0, self._rate_scale + RECOVERY_STEP)
+                self.requests.scale(self._rate_scale)
+                self.tokens.scale(self._rate_scale)
+
+    def _give_up(self, error: Exception) -> LLMUnavailableError:
+        with self._lock:
+            self._stats["failures"] += 1
+        return LLMUnavailableError(f"LLM call failed after {self.max_retries} retries: {error}")
+
+    def call(self, fn: Callable, tokens: int, usage: Callable = lambda result: None):
+        """Runs fn() within the limits, retrying transient failures with backoff."""
+        for attempt in range(self.max_retries + 1):
+            delay = self._reserve(tokens)
+            if delay > 0:
+                time.sleep(delay)
+            self._waited(delay)
+            try:
+                result = fn()
+            except Exception as e:
+                if not _is_retryable(e):
+                    raise
+                if attempt == self.max_retries:
+                    raise self._give_up(e) from e
+                time.sleep(self._backoff(e, attempt))
+                continue
+            self._succeeded(tokens, usage(result))
+            return result
+
+    async def acall(self, fn: Callable, tokens: int, usage: Callable = lambda result: None):
+        """Async variant of call for a coroutine function."""
+        for attempt in range(self.max_retries + 1):
+            delay = self._reserve(tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._waited(delay)
+            try:
+                result = await fn()
+            except Exception as e:
+                if not _is_retryable(e):
+                    raise
+                if attempt == self.max_retries:
+                    raise self._give_up(e) from e
+                await asyncio.sleep(self._backoff(e, attempt))
+                continue
+            self._succeeded(tokens, usage(result))
+            return result
+
+    def metrics(self) -> Dict:
+        """Returns counters for queueing, waiting and retries since the limiter was created."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["rate_scale"] = round(self._rate_scale, 2)
+        waited = stats["calls"] + stats["retries"] + stats["failures"]
+        stats["average_wait_seconds"] = round(stats["total_wait_seconds"] / waited, 3) if waited else 0.0
+        stats["total_wait_seconds"] = round(stats["total_wait_seconds"], 2)
+        stats["max_wait_seconds"] = round(stats["max_wait_seconds"], 2)
+        return stats
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def configure_rate_limits(requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None) -> None:
+    """Overrides the configured provider limits; takes effect for the next limiter created."""
+    global _limiter
+    if requests_per_minute:
+        config.LLM_REQUESTS_PER_MINUTE = requests_per_minute
+    if tokens_per_minute:
+        config.LLM_TOKENS_PER_MINUTE = tokens_per_minute
+    with _limiter_lock:
+        _limiter = None
+
+def get_rate_limiter() -> RateLimiter:
+    """Returns the process-wide limiter shared by every agent."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(
+                config.LLM_REQUESTS_PER_MINUTE,
+                config.LLM_TOKENS_PER_MINUTE,
+                max_retries=config.LLM_MAX_RETRIES,
+                base_delay=config.LLM_RETRY_BASE_SECONDS,
+                max_delay=config.LLM_RETRY_MAX_SECONDS
+            )
+        return _limiter
@@ -0,0 +1,85 @@
+from typing import Dict, List, Tuple
+
+# Feedback fields in report order, with their section titles
+SECTIONS = [
+    ("syntax_feedback", "Syntax Evaluation"),
+    ("style_feedback", "Style Evaluation"),
+    ("requirements_feedback", "Requirements Evaluation"),
+    ("visualization_feedback", "Visualization Evaluation"),
+]
+
+def grade_for(score: int) -> str:
+    """Maps a final score to a letter grade."""
+    return "A" if score >= 90 else "B" if score >= 80 else "C" if score >= 70 else "D" if score >= 60 else "F"
+
+def unpack_feedback(feedback_entry, score_title: str) -> Tuple[List[str], List[str], List[str]]:
+    """Renders one evaluator's feedback as report lines, plus its strengths and improvements."""
+    section = []
+    strengths = []
+    improvements = []
+    if isinstance(feedback_entry, dict):
+        score = feedback_entry.get("score")
+        explanation = feedback_entry.get("explanation") or feedback_entry.get("overall_assessment", "")
+        if score is not None:
+            section.append(f"\n## {score_title}: {score}")
+        if explanation:
+            section.append(explanation)
+
+        if "improvements" in feedback_entry:
+            for imp in feedback_entry.get("improvements", []):
+                improvements.append(f"{score_title}: {imp}")
+        if "strengths" in feedback_entry:
+            for strength in feedback_entry.get("strengths", []):
+                strengths.append(strength)
+        if "weaknesses" in feedback_entry:
+            for weakness in feedback_entry.get("weaknesses", []):
+                improvements.append(f"{score_title}: {weakness}")
+        if "improvement_suggestions" in feedback_entry:
+            for suggestion in feedback_entry.get("improvement_suggestions", []):
+                improvements.append(f"{score_title}: {suggestion}")
+
+        if "clarity_assessment" in feedback_entry:
+            section.append("### Visual Clarity\n" + feedback_entry["clarity_assessment"])
+        if "insight_assessment" in feedback_entry:
+            section.append("### Insight Generation\n" + feedback_entry["insight_assessment"])
+        if "technical_assessment" in feedback_entry:
+            section.append("### Technical Implementation\n" + feedback_entry["technical_assessment"])
+    elif isinstance(feedback_entry, str):
+        section.append(f"\n## {score_title}")
+        section.append(feedback_entry)
+    else:
+        section.append(f"\n## {score_title}")
+        section.append("No feedback available.")
+    return section, strengths, improvements
+
+def render_update(node: str, update: Dict) -> List[str]:
+    """Renders the part of the report a single graph node's update makes available.
+
+    Used to show feedback incrementally while the graph streams; feedback_agent
+    still assembles the complete report at the end.
+    """
+    if not update:
+        return []
+    if node == "code_execution":
+        if update["execution_result"]["success"]:
+            return ["✅ Your code executed successfully."]
+        return ["❌ Your code failed to execute. Fix errors first."]
+    if node == "analyze_errors":
+        return ["\n## Error Analysis", update["error_analysis"]]
+    if node == "feedback_agent":
+        lines = [f"\n## Overall Score: {update['final_score']}/100"]
+        if update.get("error_analysis"):
+            return lines
+        lines.append(f"## Grade: {grade_for(update['final_score'])}")
+        # The strengths and improvements summary is only known once every section is in
+        feedback = update.get("feedback", "")
+        starts = [i for i in (feedback.find("\n## Strengths"), feedback.find("\n## Areas for Improvement")) if i >= 0]
+        if starts:
+            lines.append(feedback[min(starts):])
+        return lines
+
+    lines = []
+    for field, title in SECTIONS:
+        if update.get(field) is not None:
+            lines += unpack_feedback(update[field], title)[0]
+    return lines
@@ -1,3 +1,4 @@
+from typing import List
 from state import EvaluationState
 
 def code_executed_successfully(state: EvaluationState) -> str:
@@ -13,3 +14,12 @@ def has_visualizations(state: EvaluationState) -> bool:
     """Determines if the code contains visualizations that should be evaluated."""
     has_viz = state.get("has_visualizations", False)
     return has_viz
+
+def route_evaluations(state: EvaluationState) -> List[str]:
+    """Fans out to every applicable evaluator at once, or to error analysis if execution failed."""
+    if code_executed_successfully(state) == "error":
+        return ["analyze_errors"]
+    branches = ["syntax_style", "requirements_agent"]
+    if has_visualizations(state):
+        branches.append("visualization")
+    return branches
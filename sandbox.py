@@ -0,0 +1,440 @@
+import atexit
+import builtins
+import codecs
+import importlib
+import io
+import linecache
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
+from typing import Dict, Optional, Sequence
+import config
+import network_fixtures
+from plot_capture import FigureRecorder, force_headless
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def _preload(modules: Sequence[str]) -> None:
+    """Imports the heavy libraries homeworks commonly use, skipping any that are missing."""
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+
+class CPUTimeLimitExceeded(BaseException):
+    """Raised inside a job when it uses up its CPU budget (SIGXCPU).
+
+    Derives from BaseException so a submission's `except Exception` cannot swallow it.
+    """
+
+class CappedOutput(io.TextIOBase):
+    """Text stream that keeps the first limit bytes written to it and counts the rest."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.dropped = 0
+        self._parts = []
+        self._size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if not self.limit:
+            self._parts.append(text)
+            return len(text)
+        data = text.encode("utf-8", "replace")
+        if self._size >= self.limit:
+            self.dropped += len(data)
+            return len(text)
+        kept = data[:max(0, self.limit - self._size)]
+        self._parts.append(kept.decode("utf-8", "ignore"))
+        self._size += len(kept)
+        self.dropped += len(data) - len(kept)
+        return len(text)
+
+    def getvalue(self) -> str:
+        text = "".join(self._parts)
+        if self.dropped:
+            text += f"\n[output truncated: {self.dropped} more bytes not shown]\n"
+        return text
+
+def _address_space_bytes() -> int:
+    """Current virtual memory size of this process (Linux), or 0 when unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+def _lower_limit(kind: int, value: int) -> None:
+    soft, hard = resource.getrlimit(kind)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(kind, (value, hard))
+
+def _raise_cpu_exceeded(signum, frame):
+    raise CPUTimeLimitExceeded("CPU time limit exceeded")
+
+def _apply_limits(limits: Dict) -> None:
+    """Caps the worker's memory, open files and processes once it is warm; 0 disables a limit.
+
+    The memory cap is headroom above the warm worker's address space, since the
+    preloaded libraries already map far more than a submission typically uses.
+    The CPU budget is per job and set in _run_job.
+    """
+    if resource is None:
+        return
+    if limits.get("memory_mb"):
+        _lower_limit(resource.RLIMIT_AS, _address_space_bytes() + limits["memory_mb"] * 1024 * 1024)
+    if limits.get("open_files"):
+        _lower_limit(resource.RLIMIT_NOFILE, limits["open_files"])
+    if limits.get("processes"):
+        _lower_limit(resource.RLIMIT_NPROC, limits["processes"])
+    if limits.get("cpu_seconds"):
+        signal.signal(signal.SIGXCPU, _raise_cpu_exceeded)
+
+def _cpu_seconds() -> float:
+    if resource is None:
+        return time.process_time()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def _max_rss_mb() -> Optional[float]:
+    # ru_maxrss is this process's peak so far, in kilobytes on Linux and bytes on macOS
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _execute(code: str, path: str, options: Dict, limits: Dict, stdout, stderr) -> Dict:
+    """Runs one submission as __main__ in a fresh namespace, writing its output to stdout and stderr.
+
+    Returns success, the final traceback (kept apart so a flood of stderr output
+    cannot truncate it), figures and resource usage. Nothing the submission
+    changes is undone afterwards: the calling process is discarded after the job.
+    """
+    started, cpu_started = time.perf_counter(), _cpu_seconds()
+    error_trace = io.StringIO()
+    namespace = {"__name__": "__main__", "__file__": path, "__builtins__": builtins}
+    success = True
+
+    # Let tracebacks show the offending source lines even though nothing is on disk
+    linecache.cache[path] = (len(code), None, code.splitlines(True), path)
+
+    network = options.get("network")
+    if network:
+        network_fixtures.install(network["fixtures"], network["mode"])
+
+    recorder = FigureRecorder()
+    recorder.install()
+
+    # Kept so the result can still be reported if the submission breaks a builtin
+    saved_builtins = dict(builtins.__dict__)
+
+    if resource is not None and limits.get("cpu_seconds"):
+        # RLIMIT_CPU counts the process's whole lifetime, so the budget starts from what it has used so far
+        _lower_limit(resource.RLIMIT_CPU, int(cpu_started) + 1 + limits["cpu_seconds"])
+
+    try:
+        sys.argv = [path]
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            exec(compile(code, path, "exec"), namespace)
+    except SystemExit as e:
+        success = e.code is None or e.code == 0
+        if not success and not isinstance(e.code, int):
+            stderr.write(f"{e.code}\n")
+    except CPUTimeLimitExceeded:
+        success = False
+        error_trace.write(f"CPUTimeLimitExceeded: used more than {limits['cpu_seconds']} seconds of CPU time\n")
+    except BaseException as e:
+        success = False
+        # Drop this frame so the traceback looks like a plain `python file.py` run
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next, file=error_trace)
+    finally:
+        builtins.__dict__.update(saved_builtins)
+        figures = recorder.finish()
+        stdout.flush()
+        stderr.flush()
+
+    return {
+        "success": success,
+        "traceback": error_trace.getvalue(),
+        "figures": figures,
+        "resources": {
+            "wall_seconds": time.perf_counter() - started,
+            "cpu_seconds": _cpu_seconds() - cpu_started,
+            "max_rss_mb": _max_rss_mb(),
+            "live_requests": network_fixtures.live_requests() if network else None
+        }
+    }
+
+def _result(run: Dict, output: str, errors: str) -> Dict:
+    """Builds the success/output/error dict callers see from a run and its captured streams."""
+    return {
+        "success": run["success"],
+        "output": output,
+        "error": None if run["success"] else errors + run["traceback"],
+        "figures": run["figures"],
+        "resources": run["resources"]
+    }
+
+def _run_job(code: str, path: str, options: Optional[Dict] = None, limits: Optional[Dict] = None) -> Dict:
+    """Runs one job in this process, capturing Python-level output into bounded buffers."""
+    limits = limits or {}
+    stdout = CappedOutput(limits.get("output_bytes", 0))
+    stderr = CappedOutput(limits.get("output_bytes", 0))
+    run = _execute(code, path, options or {}, limits, stdout, stderr)
+    return _result(run, stdout.getvalue(), stderr.getvalue())
+
+def _drain(fd: int, sink: CappedOutput) -> None:
+    """Copies a pipe into a capped buffer until every writer has closed it."""
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    with os.fdopen(fd, "rb", buffering=0) as pipe:
+        while True:
+            chunk = pipe.read(65536)
+            if not chunk:
+                break
+            sink.write(decoder.decode(chunk))
+    sink.write(decoder.decode(b"", final=True))
+
+def _run_forked(code: str, path: str, options: Optional[Dict] = None, limits: Optional[Dict] = None) -> Dict:
+    """Runs one job in a child forked from the warm worker and returns its result.
+
+    The child inherits the preloaded imports, and everything a submission can
+    change (builtins, os.environ, sys.path, sys.modules, matplotlib rcParams,
+    the working directory) disappears with it, so the next job starts clean.
+    Its file descriptors 1 and 2 are pipes read here, so output from os.system,
+    subprocesses and os.write is captured (and capped) along with print.
+    """
+    limits = limits or {}
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    pipes = [os.pipe(), os.pipe()]
+    for stream in (sys.stdout, sys.stderr):
+        if stream is not None:
+            stream.flush()
+    pid = os.fork()
+    if pid == 0:
+        receiver.close()
+        status = 1
+        try:
+            for target, (read_fd, write_fd) in zip((1, 2), pipes):
+                os.dup2(write_fd, target)
+                os.close(read_fd)
+                os.close(write_fd)
+            sys.stdout = open(1, "w", buffering=1, encoding="utf-8", errors="backslashreplace", closefd=False)
+            sys.stderr = open(2, "w", buffering=1, encoding="utf-8", errors="backslashreplace", closefd=False)
+            sender.send(_execute(code, path, options or {}, limits, sys.stdout, sys.stderr))
+            status = 0
+        finally:
+            os._exit(status)
+    sender.close()
+    streams = []
+    for read_fd, write_fd in pipes:
+        os.close(write_fd)
+        sink = CappedOutput(limits.get("output_bytes", 0))
+        reader = threading.Thread(target=_drain, args=(read_fd, sink), daemon=True)
+        reader.start()
+        streams.append((reader, sink))
+    try:
+        run = receiver.recv()
+    except EOFError:
+        # The submission killed its own process (os._exit, a signal, a broken interpreter)
+        run = None
+    finally:
+        receiver.close()
+    _, status = os.waitpid(pid, 0)
+    for reader, _ in streams:
+        # A background process the submission started may keep the pipes open
+        reader.join(timeout=1)
+    output, errors = (sink.getvalue() for _, sink in streams)
+    if run is None:
+        exitcode = os.waitstatus_to_exitcode(status)
+        return {
+            "success": exitcode == 0,
+            "output": output,
+            "error": None if exitcode == 0 else f"{errors}Process exited with code {exitcode}",
+            "figures": []
+        }
+    return _result(run, output, errors)
+
+def _worker_main(conn, preload: Sequence[str], limits: Dict) -> None:
+    """Entry point of a sandbox worker: warm up, apply resource limits, then serve jobs until told to stop."""
+    if hasattr(os, "setpgrp"):
+        # Lets the pool kill the worker together with a job child it forked
+        os.setpgrp()
+    force_headless()
+    _preload(preload)
+    _apply_limits(limits)
+    run = _run_forked if hasattr(os, "fork") else _run_job
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        conn.send(run(*job, limits=limits))
+
+class SandboxWorker:
+    """A single warm worker process and the pipe used to hand it jobs."""
+
+    def __init__(self, context, preload: Sequence[str], limits: Dict):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, tuple(preload), limits), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def run(self, code: str, path: str, timeout: float, options: Optional[Dict] = None) -> Dict:
+        """Sends a job to the worker and waits up to timeout seconds for the result."""
+        self.conn.send((code, path, options))
+        if not self.conn.poll(timeout):
+            raise TimeoutError
+        self.jobs += 1
+        return self.conn.recv()
+
+    def stop(self) -> None:
+        """Asks the worker to exit, killing it if it does not stop promptly."""
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=1)
+        self.kill()
+
+    def kill(self) -> None:
+        """Terminates the worker, and any job it forked, immediately."""
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+class SandboxPool:
+    """Pool of pre-started workers that already imported the common homework libraries.
+
+    Each job runs in a child process forked from a worker, so no state leaks
+    from one submission to the next; workers are recycled after max_jobs runs
+    and replaced whenever a job times out or crashes the process. limits holds
+    cpu_seconds, memory_mb, open_files, processes and output_bytes (0 disables one).
+    """
+
+    def __init__(self, size: int, max_jobs: int, preload: Sequence[str] = (), limits: Optional[Dict] = None):
+        # Without fork (Windows) jobs run in the worker itself, which is then used only once
+        self.max_jobs = max_jobs if hasattr(os, "fork") else 1
+        self.preload = tuple(preload)
+        self.limits = dict(limits or {})
+        self._context = self._make_context()
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _make_context(self):
+        """Uses a forkserver that imports the heavy libraries once, so workers fork warm."""
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(list(self.preload))
+            return context
+        return multiprocessing.get_context("spawn")
+
+    def _spawn(self) -> SandboxWorker:
+        worker = SandboxWorker(self._context, self.preload, self.limits)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker: SandboxWorker, kill: bool = False) -> None:
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+        with self._lock:
+            self._workers.remove(worker)
+
+    def run(self, code: str, path: str = "<submission>", timeout: float = 30, options: Optional[Dict] = None) -> Dict:
+        """Executes code on an idle worker and returns the success/output/error dict.
+
+        options may carry {"network": {"mode": ..., "fixtures": ...}} to serve
+        HTTP traffic from recorded fixtures instead of the live network.
+        """
+        worker = self._idle.get()
+        try:
+            result = worker.run(code, path, timeout, options)
+        except TimeoutError:
+            self._retire(worker, kill=True)
+            worker = self._spawn()
+            return {
+                "success": False,
+                "output": "",
+                "error": f"Code execution timed out after {timeout:g} seconds",
+                "figures": []
+            }
+        except (EOFError, OSError):
+            worker.process.join(timeout=1)
+            exitcode = worker.process.exitcode
+            self._retire(worker, kill=True)
+            worker = self._spawn()
+            return {
+                "success": exitcode == 0,
+                "output": "",
+                "error": None if exitcode == 0 else f"Process exited with code {exitcode}",
+                "figures": []
+            }
+        finally:
+            if worker.jobs >= self.max_jobs:
+                self._retire(worker)
+                worker = self._spawn()
+            self._idle.put(worker)
+        return result
+
+    def close(self) -> None:
+        """Stops every worker in the pool."""
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.kill()
+
+_pool: Optional[SandboxPool] = None
+_pool_lock = threading.Lock()
+
+def sandbox_limits() -> Dict:
+    """Per-run resource limits for sandbox workers, from the configuration."""
+    return {
+        "cpu_seconds": config.SANDBOX_CPU_SECONDS,
+        "memory_mb": config.SANDBOX_MEMORY_MB,
+        "open_files": config.SANDBOX_MAX_OPEN_FILES,
+        "processes": config.SANDBOX_MAX_PROCESSES,
+        "output_bytes": config.SANDBOX_MAX_OUTPUT_BYTES
+    }
+
+def get_sandbox_pool() -> SandboxPool:
+    """Returns the process-wide sandbox pool, starting its workers on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool(
+                size=config.SANDBOX_CONCURRENCY,
+                max_jobs=config.SANDBOX_MAX_JOBS_PER_WORKER,
+                preload=config.SANDBOX_PRELOAD,
+                limits=sandbox_limits()
+            )
+            atexit.register(_pool.close)
+    return _pool
@@ -0,0 +1,228 @@
+import argparse
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from workflow import build_evaluation_workflow
+from main import initial_state_for, load_requirements, summarize_state
+from llm import get_cache
+from rate_limiter import get_rate_limiter
+import config
+import tracing
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+class GradingService:
+    """Compiles the graph once and grades queued submissions on a pool of worker threads.
+
+    Jobs are served lowest priority value first ("high" before "normal" before
+    "low"), first come first served within a priority.
+    """
+
+    def __init__(self, requirements_file: str, workers: int, max_jobs: int):
+        self.requirements = load_requirements(requirements_file)
+        self.graph = build_evaluation_workflow().compile()
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, code: str, student_name: str, file_name: Optional[str] = None,
+               priority: int = PRIORITIES["normal"], requirements: Optional[Dict] = None) -> Dict:
+        """Queues a submission and returns its job record."""
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "priority": priority,
+            "student_name": student_name,
+            "file_name": file_name or f"{student_name}.py",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+            self._evict()
+        self._queue.put((priority, next(self._order), job_id, code, requirements or self.requirements))
+        return job
+
+    def _evict(self) -> None:
+        """Forgets the oldest finished jobs beyond max_jobs; queued and running jobs are kept."""
+        finished = [job_id for job_id, job in self.jobs.items() if job["status"] in ("done", "failed")]
+        for job_id in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job_id]
+
+    def _work(self) -> None:
+        while True:
+            _, _, job_id, code, requirements = self._queue.get()
+            with self._lock:
+                job = self.jobs[job_id]
+                job["status"] = "running"
+                job["started_at"] = time.time()
+            try:
+                state = initial_state_for(code, job["file_name"], job["student_name"], requirements)
+                with tracing.trace(job["student_name"], job_id=job_id) as run:
+                    final_state = self.graph.invoke(state)
+                result = {**summarize_state(final_state), "trace": tracing.summarize(run.spans)}
+                update = {"status": "done", "result": result}
+            except Exception as e:
+                print(f"Error evaluating job {job_id}: {str(e)}")
+                update = {"status": "failed", "error": str(e)}
+            with self._lock:
+                job.update(update, finished_at=time.time())
+            self._queue.task_done()
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """Returns a snapshot of a job, with its place in the queue while it waits."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+            if job["status"] == "queued":
+                ahead = [j for j in self.jobs.values() if j["status"] == "queued" and
+                         (j["priority"], j["submitted_at"]) < (job["priority"], job["submitted_at"])]
+                snapshot["queue_position"] = len(ahead)
+        return snapshot
+
+    def health(self) -> Dict:
+        """Returns queue and worker counters plus cache and rate limiter metrics."""
+        with self._lock:
+            statuses = [job["status"] for job in self.jobs.values()]
+        cache = get_cache()
+        return {
+            "status": "ok",
+            "workers": len(self._workers),
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "done": statuses.count("done"),
+            "failed": statuses.count("failed"),
+            "llm_cache": cache.stats() if cache is not None else None,
+            "rate_limiter": get_rate_limiter().metrics()
+        }
+
+def _parse_priority(value) -> int:
+    if value is None:
+        return PRIORITIES["normal"]
+    if isinstance(value, str) and value in PRIORITIES:
+        return PRIORITIES[value]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    raise ValueError(f"priority must be one of {', '.join(PRIORITIES)} or an integer")
+
+def _parse_requirements(value, defaults: Dict) -> Optional[Dict]:
+    """Lets a job override the criteria only; network fixtures and the rest come from the server's file."""
+    if value is None:
+        return None
+    if not isinstance(value, dict) or set(value) != {"criteria"}:
+        raise ValueError("'requirements' may only contain 'criteria'")
+    criteria = value["criteria"]
+    if not isinstance(criteria, list) or not all(isinstance(criterion, str) for criterion in criteria):
+        raise ValueError("'criteria' must be a list of strings")
+    return {**defaults, "criteria": criteria}
+
+def make_handler(service: GradingService):
+    """Builds the request handler class bound to a service instance."""
+
+    class Handler(BaseHTTPRequestHandler):
+        """JSON API: POST /jobs, GET /jobs/<id>, GET /jobs, GET /health."""
+
+        def _send(self, status: int, body: Dict) -> None:
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/jobs":
+                return self._send(404, {"error": "not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(body, dict):
+                    raise ValueError("request body must be a JSON object")
+                if not isinstance(body.get("code"), str):
+                    raise ValueError("'code' is required")
+                for field in ("student_name", "file_name"):
+                    if body.get(field) is not None and not isinstance(body[field], str):
+                        raise ValueError(f"'{field}' must be a string")
+                if body.get("file_name") and os.path.basename(body["file_name"]) != body["file_name"]:
+                    raise ValueError("'file_name' must not contain a directory")
+                priority = _parse_priority(body.get("priority"))
+                requirements = _parse_requirements(body.get("requirements"), service.requirements)
+            except ValueError as e:
+                return self._send(400, {"error": str(e)})
+            job = service.submit(
+                body["code"],
+                student_name=body.get("student_name") or "student",
+                file_name=body.get("file_name"),
+                priority=priority,
+                requirements=requirements
+            )
+            self._send(202, {"job_id": job["job_id"], "status": job["status"]})
+
+        def do_GET(self):
+            path = self.path.rstrip("/")
+            if path == "/health":
+                return self._send(200, service.health())
+            if path == "/jobs":
+                with service._lock:
+                    jobs = [{"job_id": job_id, "status": job["status"], "student_name": job["student_name"]}
+                            for job_id, job in service.jobs.items()]
+                return self._send(200, {"jobs": jobs})
+            if path.startswith("/jobs/"):
+                job = service.status(path[len("/jobs/"):])
+                if job is None:
+                    return self._send(404, {"error": "unknown job"})
+                return self._send(200, job)
+            self._send(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def serve(host: str, port: int, service: GradingService) -> ThreadingHTTPServer:
+    """Creates the HTTP server for a service; call serve_forever() on the result."""
+    return ThreadingHTTPServer((host, port), make_handler(service))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run the grading service.')
+    parser.add_argument('--host', default=config.SERVICE_HOST, help=f'Bind address (default: {config.SERVICE_HOST})')
+    parser.add_argument('--port', type=int, default=config.SERVICE_PORT, help=f'Port (default: {config.SERVICE_PORT})')
+    parser.add_argument('--workers', type=int, default=config.SERVICE_WORKERS,
+                        help=f'Submissions graded at once (default: {config.SERVICE_WORKERS})')
+    parser.add_argument('--requirements', '-r', default='requirements.json',
+                        help='Default requirements JSON for submissions that do not send their own')
+    parser.add_argument('--stub-llm', action='store_true',
+                        help='Answer every prompt with a fixed evaluation instead of calling the provider')
+
+    args = parser.parse_args()
+    if args.stub_llm:
+        config.LLM_STUB = True
+
+    service = GradingService(args.requirements, workers=args.workers, max_jobs=config.SERVICE_MAX_JOBS)
+    server = serve(args.host, args.port, service)
+    print(f"Grading service listening on http://{args.host}:{args.port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
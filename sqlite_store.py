@@ -0,0 +1,112 @@
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Generic, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+class SQLiteStore:
+    """Persistent SQLite key/value table with age and least-recently-used eviction.
+
+    The table has a text key, optional metadata columns, one value column and
+    created/accessed timestamps. The LLM, execution and node output caches are
+    thin wrappers around it.
+    """
+
+    def __init__(self, path: str, table: str, value_column: str = "value",
+                 max_entries: Optional[int] = None, max_age_seconds: Optional[float] = None,
+                 metadata: Sequence[str] = ()):
+        self.path = path
+        self.table = table
+        self.value_column = value_column
+        self.metadata = tuple(metadata)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        columns = ", ".join(f"{name} TEXT" for name in (*self.metadata, value_column))
+        self._conn.execute(
+            f"""CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                {columns},
+                created_at REAL,
+                accessed_at REAL
+            )"""
+        )
+        self._conn.commit()
+        self.evict()
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the stored value for a key, or None if it is missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {self.value_column}, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row and (self.max_age_seconds is None or now - row[1] <= self.max_age_seconds):
+                self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str, **metadata) -> None:
+        """Stores a value (with any metadata columns) and evicts entries beyond the configured limits."""
+        now = time.time()
+        values = (key, *(metadata.get(name, "") for name in self.metadata), value, now, now)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} VALUES ({', '.join('?' * len(values))})", values
+            )
+            self._conn.commit()
+        self.evict()
+
+    def invalidate(self, key: str) -> None:
+        """Removes one entry, e.g. a cached value that turned out to be unusable."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def evict(self) -> None:
+        """Drops expired entries, then the least recently used ones over max_entries."""
+        with self._lock:
+            if self.max_age_seconds is not None:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.max_age_seconds,)
+                )
+            if self.max_entries is not None:
+                self._conn.execute(
+                    f"""DELETE FROM {self.table} WHERE key NOT IN (
+                        SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT ?
+                    )""",
+                    (self.max_entries,)
+                )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self) -> Dict:
+        """Reports hit/miss counters for this process and the current number of entries."""
+        return {"hits": self.hits, "misses": self.misses, "entries": self.count()}
+
+class SharedStore(Generic[T]):
+    """Process-wide store opened on first use, which can be switched off for the process."""
+
+    def __init__(self, open_store: Callable[[], T], enabled: bool = True):
+        self.enabled = enabled
+        self._open_store = open_store
+        self._store: Optional[T] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[T]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self._store is None:
+                self._store = self._open_store()
+        return self._store
@@ -1,4 +1,8 @@
-from typing import Dict, Optional, TypedDict, List
+from typing import Annotated, Any, Dict, Optional, TypedDict, List
+
+def keep_latest(current: Any, update: Any) -> Any:
+    """Reducer for fields written by parallel evaluators: a None update never clobbers a value."""
+    return current if update is None else update
 
 class EvaluationState(TypedDict):
     # Input data
@@ -11,6 +15,7 @@ class EvaluationState(TypedDict):
     execution_result: Dict
     
     # Metadata
+    code_metadata: Optional[Dict]
     has_visualizations: Optional[bool]
     viz_imports: Optional[List[str]]
     import_count: Optional[int]
@@ -18,17 +23,24 @@ class EvaluationState(TypedDict):
     class_count: Optional[int]
     code_size_kb: Optional[float]
     
-    # Evaluation results
-    syntax_score: int
-    style_score: int
-    requirements_score: int
-    visualization_score: Optional[int]
+    # Hash of the code with comments, formatting and identifier names normalized away
+    normalized_hash: Optional[str]
+    
+    # Compacted code per agent prompt and token counts before/after compaction
+    agent_code: Optional[Dict[str, str]]
+    prompt_tokens: Optional[Dict[str, Dict[str, int]]]
+    
+    # Evaluation results (written concurrently by the evaluator branches)
+    syntax_score: Annotated[int, keep_latest]
+    style_score: Annotated[int, keep_latest]
+    requirements_score: Annotated[int, keep_latest]
+    visualization_score: Annotated[Optional[int], keep_latest]
     
     # Feedback fields 
-    syntax_feedback: Optional[Dict]
-    style_feedback: Optional[Dict]
-    requirements_feedback: Optional[Dict]
-    visualization_feedback: Optional[Dict]
+    syntax_feedback: Annotated[Optional[Dict], keep_latest]
+    style_feedback: Annotated[Optional[Dict], keep_latest]
+    requirements_feedback: Annotated[Optional[Dict], keep_latest]
+    visualization_feedback: Annotated[Optional[Dict], keep_latest]
     
     # Final outputs
     final_score: int
@@ -0,0 +1,211 @@
+import ast
+import hashlib
+import io
+import re
+import threading
+import tokenize
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+VIZ_LIBRARIES = {'matplotlib', 'seaborn', 'plotly', 'bokeh', 'altair', 'pygal'}
+
+# Call names that draw something, whatever object they are called on (plt.bar, ax.hist, df.plot.bar, ...)
+PLOT_FUNCTIONS = {
+    'plot', 'scatter', 'bar', 'barh', 'hist', 'hist2d', 'pie', 'boxplot', 'violinplot', 'imshow',
+    'heatmap', 'lineplot', 'barplot', 'histplot', 'countplot', 'scatterplot', 'kdeplot',
+    'pairplot', 'catplot', 'relplot', 'displot', 'area', 'stackplot', 'errorbar', 'fill_between',
+    'contour', 'contourf', 'pcolormesh', 'stem', 'step', 'line', 'histogram'
+}
+
+_DECISION_NODES = (ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler, ast.comprehension)
+
+_CACHE_SIZE = 512
+_cache: "OrderedDict[str, Dict]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def code_hash(code: str) -> str:
+    """Returns the hash used to key per-submission metadata."""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+def _dotted_name(node: ast.AST) -> Optional[str]:
+    """Turns a Name/Attribute chain such as plt.gca().plot into 'plt.gca.plot'."""
+    parts = []
+    while True:
+        if isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+            node = node.value
+        elif isinstance(node, ast.Call):
+            node = node.func
+        elif isinstance(node, ast.Name):
+            parts.append(node.id)
+            return ".".join(reversed(parts))
+        else:
+            return ".".join(reversed(parts)) if parts else None
+
+class _Analyzer(ast.NodeVisitor):
+    """Collects imports, definitions, complexity and plotting calls in one walk of the tree."""
+
+    def __init__(self):
+        self.imports = set()
+        self.aliases = {}
+        self.functions: List[Dict] = []
+        self.classes: List[Dict] = []
+        self.plotting_calls: List[Dict] = []
+        self.complexity = 1
+        self._scopes: List[Dict] = []
+
+    def _add_import(self, module: str, alias: str) -> None:
+        root = module.split(".")[0]
+        self.imports.add(root)
+        self.aliases[alias] = root
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for name in node.names:
+            self._add_import(name.name, name.asname or name.name.split(".")[0])
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.module and not node.level:
+            for name in node.names:
+                self._add_import(node.module, name.asname or name.name)
+
+    def _visit_function(self, node) -> None:
+        parent = self._scopes[-1] if self._scopes else None
+        qualname = f"{parent['qualname']}.{node.name}" if parent else node.name
+        record = {
+            "name": node.name,
+            "qualname": qualname,
+            "lineno": node.lineno,
+            "nested": parent is not None and parent["kind"] == "function",
+            "method": parent is not None and parent["kind"] == "class",
+            "has_docstring": ast.get_docstring(node) is not None,
+            "complexity": 1
+        }
+        self.functions.append(record)
+        if parent is not None and parent["kind"] == "class":
+            parent["record"]["methods"].append(node.name)
+        self._scopes.append({"kind": "function", "qualname": qualname, "record": record})
+        self.generic_visit(node)
+        self._scopes.pop()
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        parent = self._scopes[-1] if self._scopes else None
+        qualname = f"{parent['qualname']}.{node.name}" if parent else node.name
+        record = {
+            "name": node.name,
+            "qualname": qualname,
+            "lineno": node.lineno,
+            "has_docstring": ast.get_docstring(node) is not None,
+            "methods": []
+        }
+        self.classes.append(record)
+        self._scopes.append({"kind": "class", "qualname": qualname, "record": record})
+        self.generic_visit(node)
+        self._scopes.pop()
+
+    def _add_complexity(self, amount: int) -> None:
+        self.complexity += amount
+        for scope in reversed(self._scopes):
+            if scope["kind"] == "function":
+                scope["record"]["complexity"] += amount
+                break
+
+    def generic_visit(self, node: ast.AST) -> None:
+        if isinstance(node, _DECISION_NODES):
+            self._add_complexity(1)
+        elif isinstance(node, ast.BoolOp):
+            self._add_complexity(len(node.values) - 1)
+        super().generic_visit(node)
+
+    def visit_Call(self, node: ast.Call) -> None:
+        name = _dotted_name(node.func)
+        if name:
+            parts = name.split(".")
+            via_viz_library = self.aliases.get(parts[0]) in VIZ_LIBRARIES and len(parts) > 1
+            if via_viz_library or parts[-1] in PLOT_FUNCTIONS:
+                self.plotting_calls.append({"call": name, "lineno": node.lineno})
+        self.generic_visit(node)
+
+def _comment_lines(code: str) -> int:
+    """Counts lines carrying a comment, using the tokenizer so '#' inside strings is ignored."""
+    lines = set()
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            if token.type == tokenize.COMMENT:
+                lines.add(token.start[0])
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        pass
+    return len(lines)
+
+def _fallback_imports(code: str) -> List[str]:
+    """Line-based import scan for code that does not parse."""
+    imports = set()
+    for line in code.split('\n'):
+        match = re.match(r'\s*(?:import|from)\s+([\w.]+)', line)
+        if match:
+            imports.add(match.group(1).split(".")[0])
+    return sorted(imports)
+
+def _analyze(code: str) -> Dict:
+    lines = code.split('\n')
+    code_lines = sum(1 for line in lines if line.strip() and not line.strip().startswith('#'))
+    comment_lines = _comment_lines(code)
+    metadata = {
+        "code_hash": code_hash(code),
+        "syntax_error": None,
+        "line_count": len(lines),
+        "code_lines": code_lines,
+        "comment_lines": comment_lines,
+        "comment_ratio": round(comment_lines / max(code_lines, 1), 3),
+        "code_size_kb": len(code) / 1024
+    }
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        imports = _fallback_imports(code)
+        metadata.update({
+            "syntax_error": f"{e.msg} (line {e.lineno})",
+            "imports": imports,
+            "viz_imports": sorted(VIZ_LIBRARIES.intersection(imports)),
+            "functions": [],
+            "classes": [],
+            "plotting_calls": [],
+            "complexity": None,
+            "max_function_complexity": None,
+            "has_visualizations": bool(VIZ_LIBRARIES.intersection(imports))
+        })
+        return metadata
+
+    analyzer = _Analyzer()
+    analyzer.visit(tree)
+    viz_imports = sorted(VIZ_LIBRARIES.intersection(analyzer.imports))
+    metadata.update({
+        "imports": sorted(analyzer.imports),
+        "viz_imports": viz_imports,
+        "functions": analyzer.functions,
+        "classes": analyzer.classes,
+        "plotting_calls": analyzer.plotting_calls,
+        "complexity": analyzer.complexity,
+        "max_function_complexity": max((f["complexity"] for f in analyzer.functions), default=0),
+        "has_visualizations": bool(viz_imports) and bool(analyzer.plotting_calls)
+    })
+    return metadata
+
+def analyze_code(code: str) -> Dict:
+    """Returns the static metadata record for a submission, computed once per code hash."""
+    key = code_hash(code)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    metadata = _analyze(code)
+
+    with _cache_lock:
+        _cache[key] = metadata
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return metadata
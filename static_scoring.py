@@ -0,0 +1,177 @@
+import ast
+import io
+import re
+import tokenize
+import warnings
+from typing import Dict, List, Tuple
+from static_analysis import analyze_code
+
+MAX_LINE_LENGTH = 79
+
+SNAKE_CASE = re.compile(r'^_{0,2}[a-z][a-z0-9_]*_{0,2}$')
+UPPER_CASE = re.compile(r'^_?[A-Z][A-Z0-9_]*$')
+CAP_WORDS = re.compile(r'^_?[A-Z][a-zA-Z0-9]*$')
+ALLOWED_SHORT_NAMES = {'i', 'j', 'k', 'n', 'x', 'y', 'z', 'f', 'e', '_', 'df', 'ax', 'id'}
+
+def _syntax_check(code: str) -> Tuple[int, List[str]]:
+    """Scores syntax out of 60 with compile(): errors are fatal, warnings cost points."""
+    findings = []
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        try:
+            compile(code, "<submission>", "exec")
+        except SyntaxError as e:
+            return 20, [f"Line {e.lineno}: {e.msg}"]
+    for warning in caught:
+        if issubclass(warning.category, (SyntaxWarning, DeprecationWarning)):
+            findings.append(f"Line {warning.lineno}: {warning.message}")
+    return max(45, 60 - 5 * len(findings)), findings
+
+def _layout_violations(code: str) -> List[str]:
+    """Runs a subset of pycodestyle's checks (E501, W291, W191, E231, E702, E261-E265, E302, W391)."""
+    violations = []
+    lines = code.split('\n')
+    for number, line in enumerate(lines, 1):
+        if len(line) > MAX_LINE_LENGTH:
+            violations.append(f"Line {number}: E501 line too long ({len(line)} > {MAX_LINE_LENGTH} characters)")
+        if line.rstrip() != line:
+            violations.append(f"Line {number}: W291 trailing whitespace")
+        if line.startswith('\t'):
+            violations.append(f"Line {number}: W191 indentation contains tabs")
+    if len(lines) > 1 and not lines[-1] and not lines[-2].strip():
+        violations.append(f"Line {len(lines) - 1}: W391 blank line at end of file")
+
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return violations
+
+    for previous, token, following in zip(tokens, tokens[1:], tokens[2:]):
+        if token.type == tokenize.OP and token.string == ',':
+            same_line = following.start[0] == token.end[0]
+            if same_line and following.start[1] == token.end[1] and following.string not in ')]}':
+                violations.append(f"Line {token.start[0]}: E231 missing whitespace after ','")
+        elif token.type == tokenize.OP and token.string == ';':
+            violations.append(f"Line {token.start[0]}: E702 multiple statements on one line (semicolon)")
+        elif token.type == tokenize.COMMENT:
+            inline = previous.type not in (tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT) \
+                and previous.end[0] == token.start[0]
+            if inline and token.start[1] - previous.end[1] < 2:
+                violations.append(f"Line {token.start[0]}: E261 at least two spaces before inline comment")
+            if not re.match(r'#(!|:|\s|$)', token.string) and not token.string.startswith('#!'):
+                code_id = "E262 inline" if inline else "E265 block"
+                violations.append(f"Line {token.start[0]}: {code_id} comment should start with '# '")
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return violations
+    for node in tree.body[1:]:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            first = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            # Comments directly above a definition belong to it
+            index = first - 2
+            while index >= 0 and lines[index].strip().startswith('#'):
+                index -= 1
+            above = lines[max(0, index - 1):index + 1]
+            if any(line.strip() for line in above):
+                violations.append(f"Line {first}: E302 expected 2 blank lines before '{node.name}'")
+    return violations
+
+def _assigned_names(tree: ast.AST) -> List[str]:
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.append(node.id)
+        elif isinstance(node, ast.arg) and node.arg not in ('self', 'cls'):
+            names.append(node.arg)
+    return names
+
+def _naming_score(code: str, metadata: Dict) -> Tuple[float, List[str]]:
+    """Scores naming out of 10: snake_case functions/variables and CapWords classes."""
+    findings = []
+    checked = 0.0
+    conforming = 0.0
+    for function in metadata["functions"]:
+        checked += 1
+        if SNAKE_CASE.match(function["name"]) or function["name"].startswith('__'):
+            conforming += 1
+        else:
+            findings.append(f"Line {function['lineno']}: function '{function['name']}' should be snake_case")
+    for cls in metadata["classes"]:
+        checked += 1
+        if CAP_WORDS.match(cls["name"]):
+            conforming += 1
+        else:
+            findings.append(f"Line {cls['lineno']}: class '{cls['name']}' should use CapWords")
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        tree = None
+    flagged = set()
+    for name in set(_assigned_names(tree)) if tree else ():
+        checked += 1
+        if len(name) == 1 and name not in ALLOWED_SHORT_NAMES:
+            conforming += 0.5
+            flagged.add(f"variable '{name}' is not descriptive")
+        elif SNAKE_CASE.match(name) or UPPER_CASE.match(name) or name in ALLOWED_SHORT_NAMES:
+            conforming += 1
+        else:
+            flagged.add(f"variable '{name}' should be snake_case")
+    findings.extend(sorted(flagged))
+    return (10 * conforming / checked if checked else 10), findings
+
+def _documentation_score(metadata: Dict) -> Tuple[float, List[str]]:
+    """Scores comments and docstrings out of 8."""
+    findings = []
+    comment_part = min(metadata["comment_ratio"] / 0.1, 1.0)
+    if metadata["comment_ratio"] < 0.1:
+        findings.append(f"Only {metadata['comment_ratio']:.0%} of code lines are commented; explain non-obvious steps")
+    definitions = metadata["functions"] + metadata["classes"]
+    if not definitions:
+        return 8 * comment_part, findings
+    documented = sum(1 for d in definitions if d["has_docstring"])
+    if documented < len(definitions):
+        findings.append(f"{len(definitions) - documented} of {len(definitions)} functions/classes have no docstring")
+    return 4 * comment_part + 4 * documented / len(definitions), findings
+
+def _structure_score(metadata: Dict) -> Tuple[float, List[str]]:
+    """Scores structure out of 7 from function complexity and decomposition."""
+    findings = []
+    score = 7.0
+    for function in metadata["functions"]:
+        if function["complexity"] > 10:
+            score -= min(3, (function["complexity"] - 10) / 2)
+            findings.append(f"Function '{function['qualname']}' has cyclomatic complexity {function['complexity']}; split it up")
+    if metadata["code_lines"] > 50 and not metadata["functions"]:
+        score -= 3
+        findings.append("Long script with no functions; group repeated steps into functions")
+    return max(0.0, score), findings
+
+def score_syntax_style(code: str) -> Dict:
+    """Computes syntax (out of 60) and style (out of 40) scores without calling an LLM."""
+    metadata = analyze_code(code)
+    syntax_score, syntax_findings = _syntax_check(code)
+
+    violations = _layout_violations(code)
+    density = len(violations) / max(metadata["code_lines"], 1)
+    layout = 15 * max(0.0, 1 - 2 * density)
+    naming, naming_findings = _naming_score(code, metadata)
+    documentation, documentation_findings = _documentation_score(metadata)
+    structure, structure_findings = _structure_score(metadata)
+    style_score = int(round(layout + naming + documentation + structure))
+
+    return {
+        "syntax_score": syntax_score,
+        "style_score": max(0, min(40, style_score)),
+        "syntax_findings": syntax_findings,
+        "style_findings": violations[:10] + naming_findings[:5] + documentation_findings + structure_findings,
+        "metrics": {
+            "layout": round(layout, 1),
+            "naming": round(naming, 1),
+            "documentation": round(documentation, 1),
+            "structure": round(structure, 1),
+            "pep8_violations": len(violations)
+        }
+    }
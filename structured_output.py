@@ -0,0 +1,54 @@
+import json
+from typing import Dict, Set, Type
+from pydantic import BaseModel, ValidationError, create_model
+
+REPAIR_PROMPT = """
+Your previous evaluation could not be accepted because some fields were missing or invalid.
+
+Fields to fix: {fields}
+
+Validation errors:
+{errors}
+
+Your previous output for those fields:
+{previous}
+
+Return corrected values for these fields only, keeping the same assessment of the code.
+"""
+
+def raw_arguments(message) -> Dict:
+    """Extracts the arguments the model produced, from a tool call or a JSON content body."""
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        return dict(tool_calls[0].get("args") or {})
+    try:
+        content = json.loads(message.content)
+    except (TypeError, ValueError):
+        return {}
+    return content if isinstance(content, dict) else {}
+
+def broken_fields(schema: Type[BaseModel], error: ValidationError) -> Set[str]:
+    """Returns the top-level fields named in a validation error."""
+    fields = {str(detail["loc"][0]) for detail in error.errors() if detail.get("loc")}
+    # Errors without a location (e.g. the payload was not an object) invalidate everything
+    return fields & set(schema.model_fields) or set(schema.model_fields)
+
+def repair_schema(schema: Type[BaseModel], fields: Set[str]) -> Type[BaseModel]:
+    """Builds a model holding only the given fields, with their original types and constraints."""
+    definitions = {
+        name: (info.annotation, info)
+        for name, info in schema.model_fields.items() if name in fields
+    }
+    return create_model(f"{schema.__name__}Repair", __doc__=schema.__doc__, **definitions)
+
+def repair_prompt(arguments: Dict, fields: Set[str], error: ValidationError) -> str:
+    """Renders the follow-up prompt asking the model to redo only the broken fields."""
+    errors = "\n".join(
+        f"- {'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+    previous = {name: arguments.get(name) for name in sorted(fields)}
+    return REPAIR_PROMPT.format(
+        fields=", ".join(sorted(fields)),
+        errors=errors,
+        previous=json.dumps(previous, indent=2, default=str)
+    )
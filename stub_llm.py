@@ -0,0 +1,59 @@
+import json
+import typing
+from typing import Any, Dict, List, Optional, Type
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel
+from pydantic_objects import SyntaxStyleEvaluation, CriterionJudgment, RequirementsEvaluation, VisualizationEvaluation, CombinedEvaluation
+
+# Checked in this order: the fused schema embeds the others' descriptions
+SCHEMAS = [CombinedEvaluation, VisualizationEvaluation, RequirementsEvaluation, CriterionJudgment, SyntaxStyleEvaluation]
+
+def _value(name: str, annotation, field=None) -> Any:
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        return _value(name, next(arg for arg in typing.get_args(annotation) if arg is not type(None)))
+    if origin in (list, List):
+        item = typing.get_args(annotation)[0]
+        if isinstance(item, type) and issubclass(item, BaseModel):
+            return [stub_payload(item)]
+        return [f"Stub {name.replace('_', ' ')}."]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return stub_payload(annotation)
+    if annotation is int:
+        upper = next((m.le for m in getattr(field, "metadata", []) if getattr(m, "le", None) is not None), 100)
+        return int(upper * 0.8)
+    return f"Stub {name.replace('_', ' ')}."
+
+def stub_payload(schema: Type[BaseModel]) -> Dict:
+    """Builds a valid, deterministic instance of an evaluation model (scores at 80%)."""
+    return {name: _value(name, field.annotation, field) for name, field in schema.model_fields.items()}
+
+def _schema_for(prompt: str) -> Type[BaseModel]:
+    return next((schema for schema in SCHEMAS if schema.__doc__ in prompt), SyntaxStyleEvaluation)
+
+class StubChatModel(BaseChatModel):
+    """Offline chat model that answers every evaluator prompt with a valid fixed evaluation.
+
+    Selected with LLM_TUTOR_STUB_LLM=1 (or service.py --stub-llm) to exercise the
+    graph, batch mode and the grading service without a provider account.
+    """
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        payload = stub_payload(_schema_for(str(messages[-1].content)))
+        message = AIMessage(content=f"```json\n{json.dumps(payload)}\n```")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def with_structured_output(self, schema, **kwargs):
+        def respond(prompt):
+            payload = stub_payload(schema)
+            raw = AIMessage(content="", tool_calls=[{"name": schema.__name__, "args": payload, "id": "stub"}])
+            return {"raw": raw, "parsed": schema.model_validate(payload), "parsing_error": None}
+        return RunnableLambda(respond)
@@ -0,0 +1,65 @@
+import math
+import pytest
+from criterion_index import CriterionIndex, cosine, criterion_key, embed_code, match_criteria, record_judgments
+
+CODE = '''
+import pandas as pd
+data = pd.read_csv("sales.csv")
+totals = data.groupby("region")["amount"].sum()
+print(totals)
+'''
+
+RENAMED = CODE.replace("data", "frame").replace("totals", "by_region")
+
+OTHER = '''
+import matplotlib.pyplot as plt
+plt.hist([1, 2, 2, 3], bins=3)
+plt.savefig("hist.png")
+'''
+
+def test_embedding_is_unit_length():
+    vector = embed_code(CODE)
+    assert vector
+    assert math.isclose(math.sqrt(sum(v * v for v in vector.values())), 1.0)
+
+def test_embedding_of_empty_code_is_empty():
+    assert embed_code("") == {}
+
+def test_cosine_of_identical_and_renamed_code_is_one():
+    assert cosine(embed_code(CODE), embed_code(CODE)) == pytest.approx(1.0)
+    assert cosine(embed_code(CODE), embed_code(RENAMED)) == pytest.approx(1.0)
+
+def test_cosine_ranks_unrelated_code_lower():
+    assert cosine(embed_code(CODE), embed_code(OTHER)) < 0.5
+
+def test_cosine_is_symmetric():
+    a, b = embed_code(CODE), embed_code(OTHER)
+    assert cosine(a, b) == pytest.approx(cosine(b, a))
+    assert cosine(a, {}) == 0.0
+
+def test_criterion_key_ignores_case_and_whitespace_but_not_execution():
+    assert criterion_key("Loads  the CSV ", True) == criterion_key("loads the csv", True)
+    assert criterion_key("loads the csv", True) != criterion_key("loads the csv", False)
+
+def test_match_and_record_round_trip(tmp_path):
+    index = CriterionIndex(str(tmp_path / "index.sqlite"), max_per_criterion=1)
+    criteria = ["Loads the CSV", "Groups by region"]
+    matches = match_criteria(index, criteria, CODE, True)
+    assert [m["judgment"] for m in matches] == [None, None]
+
+    record_judgments(index, matches, [{"criterion": c, "score": 5, "rationale": "ok"} for c in criteria])
+    matches = match_criteria(index, criteria, RENAMED, True)
+    assert [m["judgment"]["score"] for m in matches] == [5, 5]
+    assert all(m["similarity"] == pytest.approx(1.0) for m in matches)
+
+    # A newer judgment replaces the oldest once the criterion is full
+    index.add(matches[0]["key"], criteria[0], embed_code(OTHER), {"score": 1, "rationale": "newer"})
+    assert [j["rationale"] for _, j in index.search(matches[0]["key"], embed_code(CODE), k=5)] == ["newer"]
+    assert index.stats()["entries"] == 2
+
+def test_tally_is_safe_across_threads(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    index = CriterionIndex(str(tmp_path / "index.sqlite"))
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: index.tally(reused=1, few_shot=2, cold=3), range(1000)))
+    assert index.stats() == {"reused": 1000, "few_shot": 2000, "cold": 3000, "entries": 0}
@@ -0,0 +1,63 @@
+from duplicates import analyze_cohort, fingerprint_code, normalized_tokens
+
+ORIGINAL = '''
+import pandas as pd
+
+def load(path):
+    """Reads the dataset."""
+    data = pd.read_csv(path)
+    return data.dropna()
+
+frame = load("sales.csv")
+totals = frame.groupby("region")["amount"].sum()
+print(totals.sort_values(ascending=False).head(10))
+'''
+
+# Same program with renamed identifiers, different comments, docstring and layout
+RENAMED = '''
+import pandas as pd
+# load the data
+def read_table(file_name):
+    df = pd.read_csv( file_name )
+    return df.dropna()
+table = read_table("sales.csv")
+by_region = table.groupby("region")["amount"].sum()
+print(by_region.sort_values(ascending=False).head(10))
+'''
+
+# Same program with one extra step
+EXTENDED = ORIGINAL + 'print(totals.mean())\n'
+
+UNRELATED = '''
+import matplotlib.pyplot as plt
+values = [3, 1, 4, 1, 5, 9, 2, 6]
+plt.hist(values, bins=4)
+plt.title("Distribution")
+plt.savefig("hist.png")
+'''
+
+def test_normalized_tokens_ignore_names_comments_and_layout():
+    assert normalized_tokens(ORIGINAL) == normalized_tokens(RENAMED)
+    assert normalized_tokens(ORIGINAL) != normalized_tokens(UNRELATED)
+
+def test_normalized_tokens_fall_back_for_code_that_does_not_parse():
+    assert normalized_tokens("total = = 1  # broken\n") == ["total", "=", "=", "1"]
+
+def test_fingerprint_is_cached_per_code():
+    assert fingerprint_code(ORIGINAL) is fingerprint_code(ORIGINAL)
+    assert fingerprint_code(ORIGINAL)["normalized_hash"] == fingerprint_code(RENAMED)["normalized_hash"]
+
+def test_analyze_cohort_groups_exact_duplicates():
+    result = analyze_cohort({"b.py": RENAMED, "a.py": ORIGINAL, "c.py": UNRELATED})
+    assert result["exact_groups"] == [["a.py", "b.py"]]
+    assert result["near_duplicates"] == []
+
+def test_analyze_cohort_reports_near_duplicates_above_threshold():
+    result = analyze_cohort({"a.py": ORIGINAL, "b.py": EXTENDED, "c.py": UNRELATED}, threshold=0.5)
+    assert result["exact_groups"] == []
+    assert [pair["files"] for pair in result["near_duplicates"]] == [["a.py", "b.py"]]
+    assert 0.5 <= result["near_duplicates"][0]["similarity"] < 1.0
+
+def test_analyze_cohort_respects_threshold():
+    result = analyze_cohort({"a.py": ORIGINAL, "b.py": EXTENDED}, threshold=1.0)
+    assert result["near_duplicates"] == []
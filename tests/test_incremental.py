@@ -0,0 +1,50 @@
+import config
+import incremental
+from incremental import NodeOutputStore, fingerprint
+
+STATE = {
+    "code": "print(1)",
+    "execution_result": {"success": True, "output": "1\n"},
+    "grades": {"requirements": 40}
+}
+
+def test_fingerprint_is_stable_and_ignores_undeclared_inputs():
+    key = fingerprint(STATE, ["code", "execution_result.success"], ["LLM_MODEL"])
+    assert key == fingerprint(dict(STATE), ["code", "execution_result.success"], ["LLM_MODEL"])
+    changed = dict(STATE, grades={"requirements": 0}, execution_result={"success": True, "output": "other"})
+    assert fingerprint(changed, ["code", "execution_result.success"], ["LLM_MODEL"]) == key
+
+def test_fingerprint_changes_with_declared_inputs():
+    key = fingerprint(STATE, ["code", "execution_result.success"], [])
+    assert fingerprint(dict(STATE, code="print(2)"), ["code", "execution_result.success"], []) != key
+    failed = dict(STATE, execution_result={"success": False})
+    assert fingerprint(failed, ["code", "execution_result.success"], []) != key
+
+def test_fingerprint_treats_missing_paths_as_none():
+    assert fingerprint({}, ["code", "execution_result.success"], []) == \
+        fingerprint({"execution_result": "not a dict"}, ["code", "execution_result.success"], [])
+
+def test_fingerprint_changes_with_settings(monkeypatch):
+    key = fingerprint(STATE, ["code"], ["LLM_MODEL"])
+    monkeypatch.setattr(config, "LLM_MODEL", "another-model")
+    assert fingerprint(STATE, ["code"], ["LLM_MODEL"]) != key
+
+def test_fingerprint_changes_with_code_version(monkeypatch):
+    key = fingerprint(STATE, ["code"], [])
+    monkeypatch.setattr(incremental, "_code_version", lambda: "edited")
+    assert fingerprint(STATE, ["code"], []) != key
+
+def test_node_output_store_round_trip(tmp_path):
+    store = NodeOutputStore(str(tmp_path / "outputs.sqlite"))
+    assert store.load("requirements", "abc") is None
+    store.save("requirements", "abc", {"grades": {"requirements": 40}})
+    assert store.load("requirements", "abc") == {"grades": {"requirements": 40}}
+    assert store.load("visualization", "abc") is None
+    assert store.stats() == {"reused": 1, "recomputed": 2, "entries": 1}
+
+def test_code_files_follow_the_evaluator_imports():
+    files = incremental.code_files()
+    for name in ("agents.py", "prompts.py", "static_analysis.py", "static_scoring.py", "llm.py",
+                 "structured_output.py", "criterion_index.py", "prompt_compaction.py"):
+        assert name in files
+    assert "main.py" not in files and "service.py" not in files
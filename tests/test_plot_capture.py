@@ -0,0 +1,46 @@
+import pytest
+plt = pytest.importorskip("matplotlib.pyplot")
+import plot_capture
+from plot_capture import MAX_AXES_PER_FIGURE, MAX_FIGURES, MAX_SERIES_PER_AXES, FigureRecorder, summarize_figure
+
+@pytest.fixture
+def recorder():
+    plt.switch_backend("Agg")
+    recorder = FigureRecorder()
+    recorder.install()
+    yield recorder
+    recorder.finish()
+
+def test_figures_beyond_the_cap_are_counted(recorder):
+    for i in range(MAX_FIGURES + 5):
+        plt.plot([1, 2, i])
+        plt.show()
+    figures = recorder.finish()
+    assert len(figures) == MAX_FIGURES + 1
+    assert figures[-1] == {"note": "5 more figures elided"}
+
+def test_saving_and_showing_one_figure_counts_it_once(recorder, tmp_path):
+    for i in range(MAX_FIGURES + 2):
+        plt.plot([i])
+        plt.savefig(tmp_path / f"{i}.png")
+        plt.show()
+    assert recorder.finish()[-1] == {"note": "2 more figures elided"}
+
+def test_axes_and_series_are_capped():
+    fig, axes = plt.subplots(1, MAX_AXES_PER_FIGURE + 3)
+    for _ in range(MAX_SERIES_PER_AXES + 4):
+        axes[0].plot([1, 2])
+    summary = summarize_figure(fig)
+    plt.close(fig)
+    assert summary["axes_count"] == MAX_AXES_PER_FIGURE + 3
+    assert len(summary["axes"]) == MAX_AXES_PER_FIGURE + 1
+    assert summary["axes"][-1] == {"note": "3 more axes elided"}
+    assert summary["axes"][0]["series"][-1] == {"note": "4 more series elided"}
+
+def test_no_marker_under_the_caps(recorder, monkeypatch):
+    monkeypatch.setattr(plot_capture, "MAX_FIGURES", 2)
+    plt.plot([1])
+    plt.show()
+    figures = recorder.finish()
+    assert len(figures) == 1
+    assert "note" not in figures[0]
@@ -0,0 +1,39 @@
+from prompt_compaction import collapse_repeated_blocks, compact_for_agent
+
+URLS = "\n".join(f'frames.append(pd.read_csv("https://example.com/data/{i}.csv"))' for i in range(5))
+
+def test_collapse_keeps_first_block_and_counts_the_rest():
+    collapsed = collapse_repeated_blocks(URLS)
+    assert collapsed.split("\n") == [
+        'frames.append(pd.read_csv("https://example.com/data/0.csv"))',
+        "# ... 4 more similar block(s) collapsed",
+    ]
+
+def test_collapse_merges_lines_that_differ_only_in_literals():
+    code = "\n".join(f"x = {n}" for n in (1, 2.5, 300))
+    assert collapse_repeated_blocks(code) == "x = 1\n# ... 2 more similar block(s) collapsed"
+
+def test_collapse_handles_multi_line_blocks():
+    code = "\n".join(f"plt.plot(a, {i})\nplt.title('t{i}')" for i in range(3))
+    assert collapse_repeated_blocks(code).split("\n") == [
+        "plt.plot(a, 0)", "plt.title('t0')", "# ... 2 more similar block(s) collapsed"
+    ]
+
+def test_collapse_leaves_short_runs_and_distinct_lines():
+    code = "a = 1\na = 2\nb = f(a)\nprint(b)"
+    assert collapse_repeated_blocks(code) == code
+
+def test_collapse_indents_marker_like_the_block():
+    code = "for i in r:\n" + "\n".join(f"    y = g({n})" for n in range(3))
+    assert collapse_repeated_blocks(code).split("\n")[-1] == "    # ... 2 more similar block(s) collapsed"
+
+def test_requirements_view_keeps_distinct_literals():
+    compact = compact_for_agent(URLS, "requirements", 10_000)
+    for i in range(5):
+        assert f"https://example.com/data/{i}.csv" in compact
+
+def test_syntax_style_view_collapses_repeats():
+    compact = compact_for_agent(URLS, "syntax_style", 10_000)
+    assert "data/0.csv" in compact
+    assert "data/4.csv" not in compact
+    assert "4 more similar block(s) collapsed" in compact
@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+import pytest
+import rate_limiter
+from rate_limiter import LLMUnavailableError, RateLimiter, TokenBucket, _retry_after
+
+class Throttled(Exception):
+    def __init__(self, status_code=429, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+def test_bucket_starts_full_and_reserves_without_waiting():
+    bucket = TokenBucket(60)
+    assert bucket.reserve(60, now=bucket.updated) == 0.0
+    assert bucket.level == 0
+
+def test_bucket_overdraw_waits_for_refill():
+    bucket = TokenBucket(60)
+    start = bucket.updated
+    bucket.reserve(60, now=start)
+    # One per second: the next two units are ready after two seconds
+    assert bucket.reserve(2, now=start) == pytest.approx(2.0)
+    assert bucket.reserve(1, now=start + 1) == pytest.approx(2.0)
+
+def test_bucket_refill_is_capped_at_capacity():
+    bucket = TokenBucket(60)
+    bucket.reserve(30, now=bucket.updated)
+    bucket.reserve(0, now=bucket.updated + 3600)
+    assert bucket.level == 60
+
+def test_bucket_reservation_larger_than_capacity_takes_the_whole_bucket():
+    bucket = TokenBucket(10)
+    assert bucket.reserve(1000, now=bucket.updated) == 0.0
+    assert bucket.level == 0
+
+def test_bucket_adjust_returns_unused_tokens():
+    bucket = TokenBucket(600)
+    start = bucket.updated
+    bucket.reserve(500, now=start)
+    bucket.adjust(500 - 200, now=start)
+    assert bucket.level == pytest.approx(400)
+    bucket.adjust(-1000, now=start)
+    assert bucket.reserve(0, now=start) == pytest.approx(600 / 10)
+
+def test_bucket_scale_slows_refill():
+    bucket = TokenBucket(60)
+    start = bucket.updated
+    bucket.reserve(60, now=start)
+    bucket.scale(0.5)
+    assert bucket.reserve(1, now=start) == pytest.approx(2.0)
+
+def test_retry_after_headers():
+    assert _retry_after(Throttled(headers={"retry-after-ms": "1500"})) == 1.5
+    assert _retry_after(Throttled(headers={"retry-after": "3"})) == 3.0
+    assert _retry_after(Throttled(headers={"retry-after": "soon"})) is None
+    assert _retry_after(Throttled()) is None
+    assert _retry_after(ValueError()) is None
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", slept.append)
+    return slept
+
+def test_rate_limit_backs_off_and_recovers(sleeps):
+    limiter = RateLimiter(600, 100_000, max_retries=3, base_delay=0.01, max_delay=0.01)
+    replies = iter([Throttled(headers={"retry-after": "2"}), "ok"])
+
+    def fn():
+        reply = next(replies)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    assert limiter.call(fn, tokens=100, usage=lambda result: 40) == "ok"
+    assert 2.0 in sleeps
+    metrics = limiter.metrics()
+    assert metrics["rate_limited"] == 1
+    assert metrics["retries"] == 1
+    assert metrics["calls"] == 1
+    assert metrics["tokens_used"] == 40
+    assert metrics["rate_scale"] == pytest.approx(rate_limiter.BACKOFF_FACTOR + rate_limiter.RECOVERY_STEP)
+    assert limiter.requests.rate == pytest.approx(limiter.requests.base_rate * metrics["rate_scale"])
+
+def test_rate_scale_has_a_floor(sleeps):
+    limiter = RateLimiter(600, 100_000, max_retries=0, base_delay=0.01, max_delay=0.01)
+    for _ in range(10):
+        limiter._paused_until = 0.0
+        limiter._backoff(Throttled(), 0)
+    assert limiter.metrics()["rate_scale"] == rate_limiter.MIN_RATE_SCALE
+
+def test_gives_up_after_max_retries(sleeps):
+    limiter = RateLimiter(600, 100_000, max_retries=2, base_delay=0.01, max_delay=0.01)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        raise Throttled(status_code=503)
+
+    with pytest.raises(LLMUnavailableError):
+        limiter.call(fn, tokens=10)
+    assert len(calls) == 3
+    assert limiter.metrics()["failures"] == 1
+    assert limiter.metrics()["rate_scale"] == 1.0
+
+def test_non_retryable_errors_propagate(sleeps):
+    limiter = RateLimiter(600, 100_000, max_retries=3, base_delay=0.01, max_delay=0.01)
+
+    def fn():
+        raise Throttled(status_code=400)
+
+    with pytest.raises(Throttled):
+        limiter.call(fn, tokens=10)
+    assert limiter.metrics()["retries"] == 0
@@ -0,0 +1,81 @@
+import os
+import pytest
+from sandbox import CappedOutput, SandboxPool
+
+needs_fork = pytest.mark.skipif(not hasattr(os, "fork"), reason="jobs run in forked children only where fork exists")
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = SandboxPool(1, 20, limits={"output_bytes": 1000})
+    yield pool
+    pool.close()
+
+def test_capped_output_keeps_the_first_bytes_and_counts_the_rest():
+    sink = CappedOutput(5)
+    for text in ("abc", "def", "ghi"):
+        assert sink.write(text) == 3
+    assert sink._parts == ["abc", "de"]
+    assert sink.getvalue() == "abcde\n[output truncated: 4 more bytes not shown]\n"
+
+def test_capped_output_without_limit_keeps_everything():
+    sink = CappedOutput(0)
+    sink.write("x" * 10_000)
+    assert sink.getvalue() == "x" * 10_000
+
+@needs_fork
+def test_output_written_below_python_is_captured(pool):
+    result = pool.run(
+        'import os, subprocess, sys\n'
+        'print("print")\n'
+        'os.system("echo system")\n'
+        'subprocess.run(["echo", "subprocess"])\n'
+        'os.write(1, b"raw\\n")\n'
+        'os.write(2, b"oops\\n")\n'
+        'sys.exit(1)\n',
+        timeout=20
+    )
+    assert result["output"] == "print\nsystem\nsubprocess\nraw\n"
+    assert result["error"] == "oops\n"
+
+@needs_fork
+def test_output_cap_applies_to_file_descriptors(pool):
+    result = pool.run('import os\nos.write(1, b"x" * 5000)\nos.system("printf %2000s")\n', timeout=20)
+    assert result["output"] == "x" * 1000 + "\n[output truncated: 6000 more bytes not shown]\n"
+
+@needs_fork
+def test_process_exit_keeps_output(pool):
+    result = pool.run('import os\nprint("before", flush=True)\nos._exit(4)\n', timeout=20)
+    assert result == {"success": False, "output": "before\n", "error": "Process exited with code 4", "figures": []}
+
+@needs_fork
+def test_jobs_do_not_see_each_others_changes(pool):
+    first = pool.run(
+        'import builtins, os, sys\n'
+        'builtins.answer = 42\n'
+        'os.environ["LEAKED"] = "1"\n'
+        'sys.path.append("/leaked")\n'
+        'sys.modules["leaked"] = sys\n'
+        'builtins.len = None\n',
+        timeout=20
+    )
+    assert first["success"]
+    second = pool.run(
+        'import builtins, os, sys\n'
+        'print(hasattr(builtins, "answer"), "LEAKED" in os.environ, "/leaked" in sys.path,\n'
+        '      "leaked" in sys.modules, len([1]))\n',
+        timeout=20
+    )
+    assert second["output"] == "False False False False 1\n"
+
+FETCH = 'import urllib.request\ntry:\n    urllib.request.urlopen("http://127.0.0.1:9/data", timeout=2)\nexcept OSError as e:\n    print("failed")\n'
+
+@needs_fork
+@pytest.mark.parametrize("mode, live", [("replay", 0), ("auto", 1), ("record", 1)])
+def test_live_requests_are_counted(pool, tmp_path, mode, live):
+    result = pool.run(FETCH, timeout=20, options={"network": {"mode": mode, "fixtures": str(tmp_path)}})
+    assert result["output"] == "failed\n"
+    assert result["resources"]["live_requests"] == live
+
+@needs_fork
+def test_live_requests_are_unknown_without_interception(pool):
+    assert pool.run(FETCH, timeout=20)["resources"]["live_requests"] is None
@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import pytest
+import config
+import execution_cache
+from service import GradingService, serve
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    # The stub LLM answers every prompt with a fixed evaluation, as with LLM_TUTOR_STUB_LLM=1
+    patch = pytest.MonkeyPatch()
+    patch.setattr(config, "LLM_STUB", True)
+    patch.setattr(execution_cache._cache, "enabled", False)
+    requirements = tmp_path_factory.mktemp("assignment") / "requirements.json"
+    requirements.write_text(json.dumps({
+        "criteria": ["Prints a greeting"],
+        "network": {"mode": "replay", "fixtures": "fixtures"}
+    }))
+    service = GradingService(str(requirements), workers=1, max_jobs=10)
+    httpd = serve("127.0.0.1", 0, service)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield service, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+    patch.undo()
+
+def _call(url, body=None, raw=None):
+    data = raw if raw is not None else (json.dumps(body).encode("utf-8") if body is not None else None)
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data)) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+@pytest.mark.parametrize("raw", [b"[1, 2]", b'"code"', b"null", b"{not json"])
+def test_body_must_be_a_json_object(server, raw):
+    status, body = _call(server[1] + "/jobs", raw=raw)
+    assert status == 400
+    assert "error" in body
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"code": 1},
+    {"code": "print(1)", "priority": "urgent"},
+    {"code": "print(1)", "student_name": ["alice"]},
+    {"code": "print(1)", "file_name": "../../etc/passwd"},
+    {"code": "print(1)", "requirements": ["criterion"]},
+    {"code": "print(1)", "requirements": {"criteria": "one string"}},
+    {"code": "print(1)", "requirements": {"criteria": [1, 2]}},
+    {"code": "print(1)", "requirements": {"criteria": ["x"],
+                                          "network": {"mode": "record", "fixtures": "/tmp/anywhere"}}},
+])
+def test_invalid_jobs_are_rejected(server, body):
+    status, response = _call(server[1] + "/jobs", body)
+    assert status == 400
+    assert "error" in response
+
+def test_custom_criteria_keep_the_servers_network_settings(server, monkeypatch):
+    service, url = server
+    submitted = []
+    monkeypatch.setattr(service, "submit", lambda code, **kwargs: submitted.append(kwargs) or
+                        {"job_id": "recorded", "status": "queued"})
+    status, _ = _call(url + "/jobs", {"code": "print(1)", "requirements": {"criteria": ["Prints one"]}})
+    assert status == 202
+    assert submitted[0]["requirements"] == {**service.requirements, "criteria": ["Prints one"]}
+    assert submitted[0]["requirements"]["network"]["mode"] == "replay"
+
+def test_unknown_routes_and_jobs(server):
+    assert _call(server[1] + "/nowhere")[0] == 404
+    assert _call(server[1] + "/jobs/missing")[0] == 404
+
+def test_health_reports_queue_counters(server):
+    status, health = _call(server[1] + "/health")
+    assert status == 200
+    assert health["status"] == "ok"
+    assert health["workers"] == 1
+
+def test_job_is_graded_with_the_stub_llm(server):
+    pytest.importorskip("langchain.output_parsers")
+    url = server[1]
+    status, job = _call(url + "/jobs", {"code": "print('hello')", "student_name": "alice", "priority": "high"})
+    assert status == 202
+    deadline = time.time() + 120
+    while True:
+        _, snapshot = _call(f"{url}/jobs/{job['job_id']}")
+        if snapshot["status"] in ("done", "failed") or time.time() > deadline:
+            break
+        time.sleep(0.2)
+    assert snapshot["status"] == "done", snapshot["error"]
+    assert snapshot["result"]["student_name"] == "alice"
+    assert isinstance(snapshot["result"]["final_score"], (int, float))
+    assert any(entry["job_id"] == job["job_id"] for entry in _call(url + "/jobs")[1]["jobs"])
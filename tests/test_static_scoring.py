@@ -0,0 +1,63 @@
+from static_scoring import score_syntax_style
+
+CLEAN = '''"""Summarizes sales by region."""
+import pandas as pd
+
+
+def load_sales(path):
+    """Reads the sales table and drops incomplete rows."""
+    # Rows without an amount cannot be totalled
+    return pd.read_csv(path).dropna()
+
+
+class Report:
+    """Holds the per-region totals."""
+
+    def __init__(self, totals):
+        # Keep the totals sorted for printing
+        self.totals = totals.sort_values()
+
+
+sales = load_sales("sales.csv")
+print(Report(sales.groupby("region")["amount"].sum()).totals)
+'''
+
+MESSY = '''import pandas as pd
+def LoadSales(P):
+  D=pd.read_csv(P);return D
+class report_table:
+  pass
+S=LoadSales('sales.csv')\x20\x20
+print(S,S.shape)#done
+'''
+
+def test_clean_code_scores_full_syntax_and_high_style():
+    result = score_syntax_style(CLEAN)
+    assert result["syntax_score"] == 60
+    assert result["syntax_findings"] == []
+    assert result["metrics"]["pep8_violations"] == 0
+    assert result["style_score"] >= 35
+
+def test_syntax_error_is_reported_with_its_line():
+    result = score_syntax_style("x = (1,\nprint(x\n")
+    assert result["syntax_score"] == 20
+    assert result["syntax_findings"][0].startswith("Line ")
+
+def test_syntax_warning_costs_points():
+    result = score_syntax_style('x = 1\nif x is 1:\n    print("one")\n')
+    assert result["syntax_score"] == 55
+    assert len(result["syntax_findings"]) == 1
+
+def test_style_findings_name_the_violations():
+    result = score_syntax_style(MESSY)
+    findings = "\n".join(result["style_findings"])
+    for expected in ("W291", "E702", "E231", "E261", "E262", "E302",
+                     "function 'LoadSales' should be snake_case", "class 'report_table' should use CapWords",
+                     "have no docstring"):
+        assert expected in findings
+    assert result["style_score"] < score_syntax_style(CLEAN)["style_score"]
+
+def test_scores_stay_in_range():
+    result = score_syntax_style("\t" + "x=1;" * 200 + "\n")
+    assert 0 <= result["style_score"] <= 40
+    assert 20 <= result["syntax_score"] <= 60
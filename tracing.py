@@ -0,0 +1,233 @@
+import functools
+import inspect
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+import config
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Dict]] = ContextVar("current_span", default=None)
+
+_exporters: List[Callable[["Trace"], None]] = []
+
+# Graph nodes whose time is dominated by LLM calls
+LLM_NODES = {"syntax_style", "requirements_agent", "visualization", "combined_evaluator"}
+
+class Trace:
+    """Spans recorded while evaluating one submission."""
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.spans: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Dict) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """Times a block as a child of the current span and yields its mutable attribute dict.
+
+    Outside of a trace the block still runs and the attributes are simply dropped.
+    """
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    record = {
+        "trace_id": trace.trace_id if trace else None,
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": parent["span_id"] if parent else None,
+        "name": name,
+        "kind": kind,
+        "start": time.time(),
+        "duration_ms": None,
+        "attributes": dict(attributes)
+    }
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record["attributes"]
+    except BaseException as e:
+        record["attributes"]["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        _current_span.reset(token)
+        if trace is not None:
+            trace.add(record)
+
+@contextmanager
+def trace(name: str, **attributes):
+    """Starts a trace with a root span; spans opened inside it (in any copied context) join it."""
+    current = Trace(name)
+    token = _current_trace.set(current)
+    try:
+        with span(name, kind="evaluation", **attributes):
+            yield current
+    finally:
+        _current_trace.reset(token)
+        for export in _exporters:
+            try:
+                export(current)
+            except Exception as e:
+                print(f"Error exporting trace {current.trace_id}: {str(e)}")
+
+def annotate(**attributes) -> None:
+    """Sets attributes on the current span, if any."""
+    current = _current_span.get()
+    if current is not None:
+        current["attributes"].update(attributes)
+
+def add(key: str, amount: float) -> None:
+    """Adds to a numeric attribute of the current span, if any."""
+    current = _current_span.get()
+    if current is not None:
+        current["attributes"][key] = current["attributes"].get(key, 0) + amount
+
+def traced_node(name: str, fn: Callable) -> Callable:
+    """Wraps a graph node (sync or async) so each run is recorded as a span."""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def run_async(state):
+            with span(name, kind="node"):
+                return await fn(state)
+        return run_async
+
+    @functools.wraps(fn)
+    def run(state):
+        with span(name, kind="node"):
+            return fn(state)
+    return run
+
+def summarize(spans: List[Dict]) -> Dict:
+    """Aggregates spans into per-node timings, LLM token/cost totals and sandbox resource use."""
+    nodes: Dict[str, Dict] = {}
+    llm = {"calls": 0, "cache_hits": 0, "prompt_tokens": 0, "completion_tokens": 0,
+           "total_ms": 0.0, "queue_wait_ms": 0.0}
+    sandbox = {"runs": 0, "cache_hits": 0, "total_ms": 0.0, "queue_wait_ms": 0.0, "cpu_seconds": 0.0,
+               "max_rss_mb": 0.0}
+    wall_ms = 0.0
+    for record in spans:
+        attributes = record["attributes"]
+        if record["kind"] == "evaluation":
+            wall_ms += record["duration_ms"]
+        elif record["kind"] == "node":
+            node = nodes.setdefault(record["name"], {"calls": 0, "reused": 0, "total_ms": 0.0, "max_ms": 0.0})
+            node["calls"] += 1
+            node["reused"] += 1 if attributes.get("reused") else 0
+            node["total_ms"] += record["duration_ms"]
+            node["max_ms"] = max(node["max_ms"], record["duration_ms"])
+        elif record["kind"] == "llm":
+            llm["calls"] += 1
+            llm["cache_hits"] += 1 if attributes.get("cache_hit") else 0
+            llm["prompt_tokens"] += attributes.get("prompt_tokens", 0)
+            llm["completion_tokens"] += attributes.get("completion_tokens", 0)
+            llm["total_ms"] += record["duration_ms"]
+            llm["queue_wait_ms"] += attributes.get("queue_wait_ms", 0)
+        elif record["kind"] == "sandbox" and attributes.get("cache_hit"):
+            sandbox["cache_hits"] += 1
+        elif record["kind"] == "sandbox":
+            sandbox["runs"] += 1
+            sandbox["total_ms"] += record["duration_ms"]
+            sandbox["queue_wait_ms"] += attributes.get("queue_wait_ms", 0)
+            sandbox["cpu_seconds"] += attributes.get("cpu_seconds", 0)
+            sandbox["max_rss_mb"] = max(sandbox["max_rss_mb"], attributes.get("max_rss_mb", 0))
+    return _finish_summary({"wall_ms": wall_ms, "nodes": nodes, "llm": llm, "sandbox": sandbox})
+
+def merge_summaries(summaries: List[Dict]) -> Dict:
+    """Combines per-submission summaries into one for a batch."""
+    merged = {"wall_ms": 0.0, "nodes": {}, "llm": {}, "sandbox": {}}
+    for summary in summaries:
+        merged["wall_ms"] += summary["wall_ms"]
+        for name, node in summary["nodes"].items():
+            total = merged["nodes"].setdefault(name, {"calls": 0, "reused": 0, "total_ms": 0.0, "max_ms": 0.0})
+            total["calls"] += node["calls"]
+            total["reused"] += node["reused"]
+            total["total_ms"] += node["total_ms"]
+            total["max_ms"] = max(total["max_ms"], node["max_ms"])
+        for section in ("llm", "sandbox"):
+            for key, value in summary[section].items():
+                if key == "max_rss_mb":
+                    merged[section][key] = max(merged[section].get(key, 0), value)
+                elif key != "estimated_cost_usd":
+                    merged[section][key] = merged[section].get(key, 0) + value
+    return _finish_summary(merged)
+
+def _finish_summary(summary: Dict) -> Dict:
+    llm = summary["llm"]
+    if llm:
+        llm["estimated_cost_usd"] = round(
+            llm["prompt_tokens"] / 1000 * config.LLM_PROMPT_PRICE_PER_1K +
+            llm["completion_tokens"] / 1000 * config.LLM_COMPLETION_PRICE_PER_1K, 6
+        )
+    # Node time split: LLM-bound evaluators versus sandbox execution
+    execution_ms = summary["nodes"].get("code_execution", {}).get("total_ms", 0.0)
+    llm_ms = sum(node["total_ms"] for name, node in summary["nodes"].items() if name in LLM_NODES)
+    summary["bottleneck"] = None if not (execution_ms or llm_ms) else "llm" if llm_ms >= execution_ms else "execution"
+    for value in [summary, *summary["nodes"].values(), summary["llm"], summary["sandbox"]]:
+        for key, number in value.items():
+            if isinstance(number, float) and key != "estimated_cost_usd":
+                value[key] = round(number, 3)
+    return summary
+
+def jsonl_exporter(path: str) -> Callable[[Trace], None]:
+    """Appends every span of a finished trace to a JSONL file."""
+    lock = threading.Lock()
+
+    def export(current: Trace) -> None:
+        with lock, open(path, "a") as f:
+            for record in current.spans:
+                f.write(json.dumps(record, default=str) + "\n")
+    return export
+
+def otel_exporter() -> Callable[[Trace], None]:
+    """Re-emits finished traces as OpenTelemetry spans (requires opentelemetry-api).
+
+    Uses the globally configured tracer provider; if none is set and the SDK is
+    installed, spans go to an OTLP exporter when available, otherwise the console.
+    """
+    from opentelemetry import trace as otel_trace
+    if type(otel_trace.get_tracer_provider()).__name__ == "ProxyTracerProvider":
+        try:
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+            try:
+                from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+                exporter = OTLPSpanExporter()
+            except ImportError:
+                exporter = ConsoleSpanExporter()
+            provider = TracerProvider()
+            provider.add_span_processor(BatchSpanProcessor(exporter))
+            otel_trace.set_tracer_provider(provider)
+        except ImportError:
+            pass
+    tracer = otel_trace.get_tracer("llm_tutor")
+
+    def export(current: Trace) -> None:
+        opened = {}
+        for record in sorted(current.spans, key=lambda r: r["start"]):
+            parent = opened.get(record["parent_id"])
+            context = otel_trace.set_span_in_context(parent) if parent is not None else None
+            start_ns = int(record["start"] * 1e9)
+            otel_span = tracer.start_span(record["name"], context=context, start_time=start_ns, attributes={
+                "llm_tutor.kind": record["kind"],
+                **{f"llm_tutor.{key}": value for key, value in record["attributes"].items()
+                   if isinstance(value, (str, bool, int, float))}
+            })
+            opened[record["span_id"]] = otel_span
+        for record in current.spans:
+            opened[record["span_id"]].end(end_time=int((record["start"] + record["duration_ms"] / 1000) * 1e9))
+    return export
+
+def configure_exporters(jsonl_path: Optional[str] = None, otel: bool = False) -> None:
+    """Selects where finished traces are sent, in addition to the in-memory summary."""
+    _exporters.clear()
+    if jsonl_path:
+        _exporters.append(jsonl_exporter(jsonl_path))
+    if otel:
+        _exporters.append(otel_exporter())
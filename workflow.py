@@ -1,57 +1,120 @@
 from state import EvaluationState
-from router import code_executed_successfully, has_visualizations
-from agents import input_node, code_execution_node, analyze_errors, syntax_style_agent
+from router import route_evaluations, code_executed_successfully
+from agents import input_node, fingerprint_node, compact_code_node, code_execution_node, analyze_errors, syntax_style_agent
 from agents import requirements_agent, visualization_agent, feedback_agent
+from agents import asyntax_style_agent, arequirements_agent, avisualization_agent
+from agents import combined_evaluator_agent, acombined_evaluator_agent
 from langgraph.graph import StateGraph, START, END
+from tracing import traced_node
+from incremental import incremental_node
+import config
 
-def build_evaluation_workflow() -> StateGraph:
-    """Constructs the full evaluation workflow graph."""
+_LLM_SETTINGS = ["LLM_MODEL", "LLM_TEMPERATURE", "OUTPUT_MODE"]
+_SYNTAX_STYLE_OUTPUTS = ["syntax_score", "style_score", "syntax_feedback", "style_feedback"]
+_REQUIREMENTS_OUTPUTS = ["requirements_score", "requirements_feedback"]
+_VISUALIZATION_OUTPUTS = ["visualization_score", "visualization_feedback"]
+
+# What each evaluator reads (dotted paths into the state) and writes. On a re-grade a node
+# only runs again when one of its inputs or settings changed, e.g. a rubric change re-runs
+# requirements_agent and feedback_agent only. Execution has its own cache keyed by code,
+# data files and environment; the remaining nodes are cheap and always run.
+#
+# Requirements and visualization read the normalized code hash instead of the code itself,
+# so submissions differing only in comments, formatting or names share one evaluation;
+# syntax/style reads the exact code because names and comments are part of its score.
+NODE_DEPENDENCIES = {
+    "syntax_style": {
+        "inputs": ["student_code", "agent_code.syntax_style", "execution_result.success"],
+        "outputs": _SYNTAX_STYLE_OUTPUTS,
+        "settings": _LLM_SETTINGS + ["SYNTAX_STYLE_MODE"]
+    },
+    "requirements_agent": {
+        "inputs": ["normalized_hash", "requirements.criteria", "execution_result.success"],
+        "outputs": _REQUIREMENTS_OUTPUTS,
+        "settings": _LLM_SETTINGS + ["PROMPT_TOKEN_BUDGETS", "REQUIREMENTS_MODE"]
+    },
+    "visualization": {
+        "inputs": ["normalized_hash", "has_visualizations", "viz_imports",
+                   "execution_result.success", "execution_result.figures"],
+        "outputs": _VISUALIZATION_OUTPUTS,
+        "settings": _LLM_SETTINGS + ["PROMPT_TOKEN_BUDGETS"]
+    },
+    "combined_evaluator": {
+        "inputs": ["student_code", "requirements.criteria", "has_visualizations", "viz_imports",
+                   "agent_code.requirements", "execution_result.success", "execution_result.figures"],
+        "outputs": _SYNTAX_STYLE_OUTPUTS + _REQUIREMENTS_OUTPUTS + _VISUALIZATION_OUTPUTS,
+        "settings": _LLM_SETTINGS + ["SYNTAX_STYLE_MODE"]
+    }
+}
+
+def _node(name: str, fn):
+    """Wraps a node with tracing and, for evaluators, reuse of outputs whose inputs are unchanged."""
+    dependencies = NODE_DEPENDENCIES.get(name)
+    if dependencies is not None:
+        fn = incremental_node(name, fn, **dependencies)
+    return traced_node(name, fn)
+
+def build_evaluation_workflow(use_async: bool = False, fused: bool = None) -> StateGraph:
+    """Constructs the full evaluation workflow graph.
+
+    With use_async the LLM evaluators are coroutine nodes, so the compiled graph
+    must be driven with ainvoke. With fused (default: EVALUATION_MODE == "fused")
+    a single combined evaluator replaces the three parallel ones.
+    """
+    if fused is None:
+        fused = config.EVALUATION_MODE == "fused"
 
     workflow = StateGraph(EvaluationState)
     
     # Add all nodes
-    workflow.add_node("input", input_node)
-    workflow.add_node("code_execution", code_execution_node)
-    workflow.add_node("analyze_errors", analyze_errors)
-    workflow.add_node("syntax_style", syntax_style_agent)
-    workflow.add_node("requirements_agent", requirements_agent)
-    workflow.add_node("visualization", visualization_agent)
-    workflow.add_node("feedback_agent", feedback_agent)
+    workflow.add_node("input", _node("input", input_node))
+    workflow.add_node("fingerprint", _node("fingerprint", fingerprint_node))
+    workflow.add_node("compact_code", _node("compact_code", compact_code_node))
+    workflow.add_node("code_execution", _node("code_execution", code_execution_node))
+    workflow.add_node("analyze_errors", _node("analyze_errors", analyze_errors))
+    workflow.add_node("feedback_agent", _node("feedback_agent", feedback_agent))
     
     # Edges (flow)
     workflow.add_edge(START, "input")
-    workflow.add_edge("input", "code_execution")
-    
-    # Conditional check 1
-    workflow.add_conditional_edges(
-        "code_execution",
-        code_executed_successfully,
-        {
-            "success": "syntax_style",  # If success, continue to evaluation
-            "error": "analyze_errors"    # If error, analyze it
-        }
-    )
+    workflow.add_edge("input", "fingerprint")
+    workflow.add_edge("fingerprint", "compact_code")
+    workflow.add_edge("compact_code", "code_execution")
     
     # After error analysis (skipping other evaluations)
     workflow.add_edge("analyze_errors", "feedback_agent")
     
-    # Standard flow
-    workflow.add_edge("syntax_style", "requirements_agent")
+    # END node
+    workflow.add_edge("feedback_agent", END)
+    
+    if fused:
+        workflow.add_node("combined_evaluator", _node("combined_evaluator", acombined_evaluator_agent if use_async else combined_evaluator_agent))
+        
+        # Conditional check: one fused evaluation on success
+        workflow.add_conditional_edges(
+            "code_execution",
+            code_executed_successfully,
+            {
+                "success": "combined_evaluator",
+                "error": "analyze_errors"
+            }
+        )
+        workflow.add_edge("combined_evaluator", "feedback_agent")
+        return workflow
+    
+    workflow.add_node("syntax_style", _node("syntax_style", asyntax_style_agent if use_async else syntax_style_agent))
+    workflow.add_node("requirements_agent", _node("requirements_agent", arequirements_agent if use_async else requirements_agent))
+    workflow.add_node("visualization", _node("visualization", avisualization_agent if use_async else visualization_agent))
     
-    # Conditional check 2
+    # Conditional check: fan out to the evaluators in parallel on success
     workflow.add_conditional_edges(
-        "requirements_agent",
-        has_visualizations,
-        {
-            True: "visualization",  # If has visualizations, evaluate them
-            False: "feedback_agent"       # Otherwise, skip to feedback_agent
-        }
+        "code_execution",
+        route_evaluations,
+        ["analyze_errors", "syntax_style", "requirements_agent", "visualization"]
     )
     
-    # Final edge 
+    # Evaluators run in the same step and join in feedback_agent
+    workflow.add_edge("syntax_style", "feedback_agent")
+    workflow.add_edge("requirements_agent", "feedback_agent")
     workflow.add_edge("visualization", "feedback_agent")
     
-    # END node
-    workflow.add_edge("feedback_agent", END)
-    
     return workflow 